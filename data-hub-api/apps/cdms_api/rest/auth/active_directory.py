@@ -1,5 +1,6 @@
 import json
 import logging
+import threading
 
 import requests
 from django.conf import settings
@@ -42,6 +43,7 @@ class ActiveDirectoryAuth:
                 raise ImproperlyConfigured('{} setting required'.format(setting_name))
 
         self.cookie_storage = CookieStorage()
+        self.session_lock = threading.Lock()  # so that concurrent requests re-authenticate only once
         self.setup_session()
 
     def setup_session(self, force=False):
@@ -152,11 +154,15 @@ class ActiveDirectoryAuth:
         """
         if data is None:
             data = {}
+        session = self.session
         try:
             return self._make_request(verb, url, data=data)
         except CDMSUnauthorizedException:
-            logger.debug('Session expired, reauthenticating and trying again')
-            self.setup_session(force=True)
+            with self.session_lock:
+                # another thread might have already reauthenticated while waiting for the lock
+                if self.session is session:
+                    logger.debug('Session expired, reauthenticating and trying again')
+                    self.setup_session(force=True)
         return self._make_request(verb, url, data=data)
 
     def _make_request(self, verb, url, data=None):
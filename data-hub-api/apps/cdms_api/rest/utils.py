@@ -1,9 +1,37 @@
-import re
-import time
 import datetime
+from functools import lru_cache
 
 
-DATETIME_RE = re.compile('/Date\(([-+]?\d+)\)/')
+CDMS_DATETIME_PREFIX = '/Date('
+CDMS_DATETIME_SUFFIX = ')/'
+CDMS_DATETIME_CACHE_SIZE = 4096
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+@lru_cache(maxsize=CDMS_DATETIME_CACHE_SIZE)
+def _parse_cdms_datetime(value):
+    """
+    Parses '/Date(<millisecs>)/' using plain string slicing and integer maths.
+    Results are cached as the same values (e.g. ModifiedOn of records created in bulk)
+    tend to appear many times in the same CDMS response.
+    """
+    if not value.startswith(CDMS_DATETIME_PREFIX):
+        return None
+
+    end = value.find(CDMS_DATETIME_SUFFIX, len(CDMS_DATETIME_PREFIX))
+    if end == -1:
+        return None
+
+    millisecs = value[len(CDMS_DATETIME_PREFIX):end]
+    digits = millisecs[1:] if millisecs[:1] in ('-', '+') else millisecs
+    if not digits.isdigit():
+        return None
+
+    try:
+        return EPOCH + datetime.timedelta(milliseconds=int(millisecs))
+    except (ValueError, OverflowError):
+        return None
 
 
 def cdms_datetime_to_datetime(value):
@@ -11,19 +39,33 @@ def cdms_datetime_to_datetime(value):
     Parses a cdms datetime as string and returns the equivalent datetime value.
     Dates in CDMS are always UTC.
     """
-    match = DATETIME_RE.match(value or '')
-    if match:
-        parsed_val = int(match.group(1))
-        parsed_val = datetime.datetime.utcfromtimestamp(parsed_val / 1000)
-        return parsed_val.replace(tzinfo=datetime.timezone.utc)
+    if not value:
+        return None
+    return _parse_cdms_datetime(value)
+
+
+def cdms_datetimes_to_datetimes(values):
+    """
+    Batched version of `cdms_datetime_to_datetime`, returns the list of datetime values
+    equivalent to the cdms datetime strings in `values`.
+    """
+    parse = _parse_cdms_datetime
+    return [parse(value) if value else None for value in values]
 
 
 def datetime_to_cdms_datetime(value):
     """
     Returns the cdms string equivalent of the datetime value.
+    Naive datetimes are considered UTC as dates in CDMS are always UTC.
     """
     if not value:
         return value
-    return '/Date({0})/'.format(
-        int(time.mktime(value.timetuple()) * 1000)
-    )
+
+    if not isinstance(value, datetime.datetime):  # date
+        value = datetime.datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+
+    delta = value - EPOCH
+    millisecs = (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000
+    return '{0}{1}{2}'.format(CDMS_DATETIME_PREFIX, millisecs, CDMS_DATETIME_SUFFIX)
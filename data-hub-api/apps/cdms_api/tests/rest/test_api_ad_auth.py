@@ -1,6 +1,8 @@
 import os
 import responses
 import json
+import threading
+from unittest import mock
 from urllib.parse import urlparse
 
 from django.template import Engine, Context
@@ -275,6 +277,38 @@ class MakeRequestTestCase(MockedResponseMixin, CookieStorageTestCase):
         )
         self.assertEqual(len(responses.calls), 6)
 
+    def test_setup_session_once_if_concurrent_requests_expired(self):
+        """
+        If the cookie expires while making concurrent requests, only the first one to fail should reauthenticate.
+        """
+        api = CDMSRestApi()
+        expired_session = api.auth.session
+        barrier = threading.Barrier(2)
+
+        def _make_request(verb, url, data=None):
+            if api.auth.session is expired_session:
+                barrier.wait(timeout=5)  # so that both requests fail before reauthenticating
+                raise CDMSUnauthorizedException('expired', status_code=401)
+            return 'success'
+
+        def setup_session(force=False):
+            api.auth.session = mock.Mock()
+
+        with mock.patch.object(api.auth, '_make_request', side_effect=_make_request), \
+                mock.patch.object(api.auth, 'setup_session', side_effect=setup_session) as mocked_setup_session:
+            results = []
+            threads = [
+                threading.Thread(target=lambda: results.append(api.make_request('get', 'https://test/')))
+                for index in range(2)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(results, ['success', 'success'])
+        mocked_setup_session.assert_called_once_with(force=True)
+
     @responses.activate
     def test_404(self):
         """
@@ -2,7 +2,8 @@ import datetime
 
 from django.test.testcases import TestCase
 
-from cdms_api.rest.utils import cdms_datetime_to_datetime, datetime_to_cdms_datetime
+from cdms_api.rest.utils import cdms_datetime_to_datetime, datetime_to_cdms_datetime, \
+    cdms_datetimes_to_datetimes
 
 
 class CdmsDatetimeToDatetimeTestCase(TestCase):
@@ -14,13 +15,47 @@ class CdmsDatetimeToDatetimeTestCase(TestCase):
             dt
         )
 
+    def test_with_millisecs(self):
+        dt = datetime.datetime(2016, 1, 1, microsecond=123000).replace(tzinfo=datetime.timezone.utc)
+
+        self.assertEqual(
+            cdms_datetime_to_datetime('/Date(1451606400123)/'),
+            dt
+        )
+
+    def test_negative(self):
+        dt = datetime.datetime(1969, 12, 31, 23, 59, 59).replace(tzinfo=datetime.timezone.utc)
+
+        self.assertEqual(
+            cdms_datetime_to_datetime('/Date(-1000)/'),
+            dt
+        )
+
     def test_invalid(self):
         self.assertEqual(cdms_datetime_to_datetime('invalid'), None)
 
+    def test_invalid_millisecs(self):
+        self.assertEqual(cdms_datetime_to_datetime('/Date(1451606400000+0000)/'), None)
+        self.assertEqual(cdms_datetime_to_datetime('/Date()/'), None)
+        self.assertEqual(cdms_datetime_to_datetime('/Date(1451606400000'), None)
+
     def test_None(self):
         self.assertEqual(cdms_datetime_to_datetime(None), None)
 
 
+class CdmsDatetimesToDatetimesTestCase(TestCase):
+    def test_values(self):
+        dt = datetime.datetime(2016, 1, 1).replace(tzinfo=datetime.timezone.utc)
+
+        self.assertEqual(
+            cdms_datetimes_to_datetimes(['/Date(1451606400000)/', None, 'invalid', '/Date(1451606400000)/']),
+            [dt, None, None, dt]
+        )
+
+    def test_empty(self):
+        self.assertEqual(cdms_datetimes_to_datetimes([]), [])
+
+
 class DatetimeToCdmsDatetimeTestCase(TestCase):
     def test_valid(self):
         dt = datetime.datetime(2016, 1, 1).replace(tzinfo=datetime.timezone.utc)
@@ -30,5 +65,34 @@ class DatetimeToCdmsDatetimeTestCase(TestCase):
             '/Date(1451606400000)/'
         )
 
+    def test_non_utc(self):
+        """
+        The value is converted to UTC before being formatted.
+        """
+        tz = datetime.timezone(datetime.timedelta(hours=1))
+        dt = datetime.datetime(2016, 1, 1, 1).replace(tzinfo=tz)
+
+        self.assertEqual(
+            datetime_to_cdms_datetime(dt),
+            '/Date(1451606400000)/'
+        )
+
+    def test_naive(self):
+        """
+        Naive values are considered UTC.
+        """
+        self.assertEqual(
+            datetime_to_cdms_datetime(datetime.datetime(2016, 1, 1)),
+            '/Date(1451606400000)/'
+        )
+
+    def test_round_trip(self):
+        dt = datetime.datetime(2016, 2, 28, 10, 11, 12, 345000).replace(tzinfo=datetime.timezone.utc)
+
+        self.assertEqual(
+            cdms_datetime_to_datetime(datetime_to_cdms_datetime(dt)),
+            dt
+        )
+
     def test_None(self):
         self.assertEqual(datetime_to_cdms_datetime(None), None)
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from companieshouse.sources.db.names import CompanyNameIndex
+
+
+class Command(BaseCommand):
+    """
+    Builds the in-memory index of the company name tokens used by the ChIndexMatcher
+    (see `companieshouse.sources.db.names.CompanyNameIndex`).
+
+    Run it after each import so that the index includes the new companies.
+    The index is loaded once per process so running processes need to be restarted to pick it up.
+    """
+    help = 'Builds the index of the company name tokens used to find the matching candidates in memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=settings.NAME_INDEX_PATH,
+            help='File the index is written to (defaults to the NAME_INDEX_PATH setting).'
+        )
+
+    def handle(self, *args, **options):
+        if not options['path']:
+            raise CommandError('No index file, pass --path or set the DJANGO__NAME_INDEX_PATH env var')
+
+        start = time.time()
+        companies = CompanyNameIndex.build(options['path'])
+        self.stdout.write(
+            'Indexed {} companies in {} in {:.1f}s'.format(companies, options['path'], time.time() - start)
+        )
@@ -1,62 +1,370 @@
-import csv
 import os
 import glob
+import time
+import queue
+import tempfile
+from collections import namedtuple, defaultdict, Counter
 from multiprocessing import Pool
 
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Sum
+from django.utils.timezone import now
 
-from companieshouse.sources.db.importers import CSVImporter
-from companieshouse.models import Company
+from companieshouse.models import ImportRun, ImportCheckpoint
+from companieshouse.sources.db.hashes import RowHashIndex, get_row_hash
+from companieshouse.sources.db.importers import CSVImporter, warnings_aggregator
+from companieshouse.sources.db.loaders import CompanyBulkLoader
+from companieshouse.sources.db.readers import get_chunks, STDIN
 
 
-def import_csv(path):
-    importer = CSVImporter()
-    with open(path, 'r') as f:
-        reader = csv.reader(f)
-        next(reader)  # headers
+BATCH_SIZE = 5000
+CHUNK_SIZE = 64  # MB
 
-        for row in reader:
-            if not row:
-                continue
+ChunkResult = namedtuple(
+    'ChunkResult', ['pid', 'chunk', 'imported', 'unchanged', 'errors', 'warnings', 'seconds']
+)
 
+# index of the row hashes of the companies in the db, set up in each worker by `init_worker`
+row_hash_index = RowHashIndex()
+
+
+def init_worker(index):
+    """
+    Sets up a worker process.
+    The db connections are closed by the parent before forking so each worker opens its own.
+    """
+    global row_hash_index
+    row_hash_index = index
+
+
+def load_batch(loader, batch):
+    """
+    Loads the batch of (raw row, row hash, parsed data) tuples.
+    If the batch fails, the rows are loaded one by one so that only the faulty ones get skipped.
+    Returns the number of rows skipped because of errors.
+    """
+    try:
+        loader.load(
+            [data for raw_row, row_hash, data in batch],
+            row_hashes=[row_hash for raw_row, row_hash, data in batch]
+        )
+    except Exception:
+        errors = 0
+        for raw_row, row_hash, data in batch:
             try:
-                raw_row = list(row)
-                data = importer.parse(iter(row))
-                Company.objects.update_from_CH_data(data)
+                loader.load([data], row_hashes=[row_hash])
             except Exception as e:
+                errors += 1
                 print(
                     "Skipping. Row {} triggered the following error {}".format(
                         raw_row, e
                     )
                 )
+        return errors
+    return 0
+
+
+class ChunkImporter(object):
+    """
+    Imports the rows of `chunk` (FileChunk or StreamChunk) in batches skipping the ones which haven't changed
+    since the last import.
+
+    After each batch, the ImportCheckpoint of the chunk is updated in the same transaction so that,
+    if the import gets interrupted, it can be resumed right after the last batch loaded.
+    """
+    def __init__(self, chunk, run_id):
+        self.chunk = chunk
+        self.checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+            run_id=run_id, chunk=chunk.key,
+            defaults={'offset': chunk.start}
+        )
+        self.importer = CSVImporter()
+        self.loader = CompanyBulkLoader()
+
+        self.imported = self.unchanged = self.errors = 0
+        self._reset_batch()
+
+    def _reset_batch(self):
+        self.batch = []
+        self.batch_rows = self.batch_unchanged = self.batch_errors = 0
+
+    def import_row(self, row):
+        if not row:
+            return
+
+        row_hash = get_row_hash(row)
+        if row_hash in row_hash_index:
+            self.batch_unchanged += 1
+            return
+
+        try:
+            raw_row = list(row)
+            data = self.importer.parse(row)
+        except Exception as e:
+            self.batch_errors += 1
+            print(
+                "Skipping. Row {} triggered the following error {}".format(
+                    raw_row, e
+                )
+            )
+            return
+
+        self.batch.append((raw_row, row_hash, data))
+
+    def flush(self, completed=False):
+        """
+        Loads the current batch and saves the checkpoint in the same transaction.
+        """
+        with transaction.atomic():
+            load_errors = load_batch(self.loader, self.batch) if self.batch else 0
+
+            imported = len(self.batch) - load_errors
+            errors = self.batch_errors + load_errors
+
+            checkpoint = self.checkpoint
+            checkpoint.offset = self.chunk.offset
+            checkpoint.completed = completed
+            checkpoint.rows_imported += imported
+            checkpoint.rows_unchanged += self.batch_unchanged
+            checkpoint.errors += errors
+            checkpoint.save()
+
+        self.imported += imported
+        self.unchanged += self.batch_unchanged
+        self.errors += errors
+        self._reset_batch()
+
+    def run(self):
+        """
+        Returns the tuple (rows imported, unchanged rows skipped, rows skipped because of errors).
+        """
+        if self.checkpoint.completed:
+            return 0, 0, 0
+
+        for row in self.chunk.read_rows(offset=self.checkpoint.offset):
+            self.import_row(row)
+
+            self.batch_rows += 1
+            if self.batch_rows >= BATCH_SIZE:
+                self.flush()
+
+        self.flush(completed=True)
+        return self.imported, self.unchanged, self.errors
+
+
+def import_chunk(args):
+    """
+    Imports the chunk in `args` = (chunk, ImportRun id), returns a ChunkResult.
+    """
+    chunk, run_id = args
+
+    start = time.time()
+    imported, unchanged, errors = ChunkImporter(chunk, run_id).run()
+    chunk.discard()
+    return ChunkResult(
+        pid=os.getpid(), chunk=repr(chunk),
+        imported=imported, unchanged=unchanged, errors=errors,
+        warnings=warnings_aggregator.pop(),
+        seconds=time.time() - start
+    )
 
 
 class Command(BaseCommand):
     """
-    This could be optimised quite a lot by generating sha1 hashes of the csv row, saving them in the db and
-    checking the two hashes during the next import. If they are the same, skip the line.
+    Each csv file is split into chunks of about --chunk-size MB which are imported in parallel
+    by a pool of --workers processes so that big files don't end up being processed by one worker only.
+
+    Zip files (e.g. the BasicCompanyData archives) and stdin are streamed instead: their content is decompressed
+    and decoded incrementally by the main process and spooled to temporary files in chunks which the workers
+    read like the ones of csv files, so no extracted copy is needed and the import starts straightaway.
+    Only a few chunks are read ahead and each spooled file is deleted once imported to keep the disk usage
+    bounded; the chunks are never held in memory.
+
+    The sha1 hash of each csv row is saved in the db together with the company so that
+    the rows which haven't changed since the last import can be skipped without being parsed or loaded.
+    The hashes of all the companies are loaded once at the beginning and shared with the worker processes.
+
+    Each run is recorded as ImportRun and the progress of each chunk as ImportCheckpoint, updated after each batch.
+    If a run gets interrupted, --resume continues the last unfinished run of the same paths skipping
+    the chunks already imported and the imported part of the others.
     """
     help = 'Imports csv files of companies house data by creating/updating db records'
 
     def add_arguments(self, parser):
         parser.add_argument(
-            'folder', type=str,
+            'paths', nargs='+', type=str,
             help=(
-                'Path to directory containing csv files. '
-                'Download them here: http://download.companieshouse.gov.uk/en_output.html'
+                'Paths to csv files, zip files containing csv files or directories containing any of them. '
+                'Use {} to read csv data from stdin. '
+                'Download them here: http://download.companieshouse.gov.uk/en_output.html'.format(STDIN)
             )
         )
+        parser.add_argument(
+            '--full', action='store_true', default=False,
+            help='Import all the rows, including the ones which have not changed since the last import.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Number of worker processes (defaults to the number of CPUs).'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Size in MB of the chunks the csv files are split into (defaults to {}).'.format(CHUNK_SIZE)
+        )
+        parser.add_argument(
+            '--resume', action='store_true', default=False,
+            help='Resume the last unfinished import of the same paths.'
+        )
+
+    def _get_filepaths(self, paths):
+        filepaths = []
+        for path in paths:
+            if path == STDIN or os.path.isfile(path):
+                filepaths.append(path)
+            elif os.path.isdir(path):
+                folder_paths = sorted(
+                    glob.glob(os.path.join(glob.escape(path), '*.csv')) +
+                    glob.glob(os.path.join(glob.escape(path), '*.zip'))
+                )
+                if not folder_paths:
+                    raise CommandError('Folder {} does not contain any csv or zip files'.format(path))
+                filepaths.extend(folder_paths)
+            else:
+                raise CommandError('{} does not exist'.format(path))
+        return filepaths
+
+    def _get_run(self, paths, options):
+        if options['resume']:
+            run = ImportRun.objects.filter(paths=paths, finished_on=None).order_by('-created').first()
+            if not run:
+                raise CommandError('No unfinished import of {} to resume'.format(', '.join(paths)))
+            self.stdout.write('Resuming {}'.format(run))
+            return run
+
+        return ImportRun.objects.create(
+            paths=paths,
+            chunk_size=options['chunk_size'] * 1024 * 1024,
+            full=options['full']
+        )
 
-    def _get_filepaths(self, folder):
-        os.chdir(folder)
-        paths = [os.path.join(folder, path) for path in glob.glob("*.csv")]
+    def _get_chunks(self, run, completed, spool_dir):
+        """
+        Yields the (chunk, run id) of the chunks of `run` which haven't been `completed` yet.
+        The streamed chunks are spooled to `spool_dir`.
+        """
+        for path in run.paths:
+            for chunk in get_chunks(path, run.chunk_size, spool_dir=spool_dir):
+                if chunk.key in completed:
+                    chunk.discard()
+                    continue
+                yield chunk, run.id
 
-        if not paths:
-            raise CommandError('Folder {} does not contain any csv files'.format(folder))
-        return paths
+    def _import_chunks(self, pool, chunks, max_in_flight):
+        """
+        Submits the `chunks` to `pool` and yields the ChunkResults as they are completed.
+
+        The chunks are read and submitted by the calling thread with at most `max_in_flight` of them
+        submitted but not completed so that streams are not spooled faster than they get imported.
+        Nothing blocks the pool's own threads so, if a chunk fails or the import is interrupted,
+        the pool can always be terminated.
+        """
+        results = queue.Queue()
+        chunks = iter(chunks)
+        in_flight = 0
+        exhausted = False
+        while True:
+            while not exhausted and in_flight < max_in_flight:
+                try:
+                    args = next(chunks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pool.apply_async(import_chunk, (args,), callback=results.put, error_callback=results.put)
+                in_flight += 1
+
+            if not in_flight:
+                return
+
+            result = results.get()
+            in_flight -= 1
+            if isinstance(result, BaseException):
+                raise result
+            yield result
+
+    def _update_run(self, run, seconds, finished):
+        totals = run.importcheckpoint_set.aggregate(
+            rows_imported=Sum('rows_imported'),
+            rows_unchanged=Sum('rows_unchanged'),
+            errors=Sum('errors')
+        )
+        run.rows_imported = totals['rows_imported'] or 0
+        run.rows_unchanged = totals['rows_unchanged'] or 0
+        run.errors = totals['errors'] or 0
+        run.duration += seconds
+        if run.duration:
+            run.throughput = (run.rows_imported + run.rows_unchanged) / run.duration
+        if finished:
+            run.finished_on = now()
+        run.save()
+
+    def _format_throughput(self, rows, seconds):
+        return '{} rows in {:.1f}s ({:.0f} rows/s)'.format(rows, seconds, rows / seconds if seconds else 0)
 
     def handle(self, *args, **options):
-        paths = self._get_filepaths(options['folder'])
+        paths = self._get_filepaths(options['paths'])
+        run = self._get_run(paths, options)
+        completed = set(run.importcheckpoint_set.filter(completed=True).values_list('chunk', flat=True))
+
+        index = RowHashIndex() if run.full else RowHashIndex.load()
+        self.stdout.write('Loaded {} row hashes'.format(len(index)))
+
+        # so that the workers don't inherit the connection
+        connections.close_all()
+
+        start = time.time()
+        workers = defaultdict(lambda: {'rows': 0, 'seconds': 0})
+        warnings = Counter()
+        finished = False
 
-        p = Pool(maxtasksperchild=4)
-        p.map(import_csv, paths)
+        # the chunks not imported because of errors are deleted with the directory
+        spool_dir = tempfile.TemporaryDirectory(prefix='import_csv-')
+        chunks = self._get_chunks(run, completed, spool_dir.name)
+
+        p = Pool(options['workers'], initializer=init_worker, initargs=(index,))
+        try:
+            for done, result in enumerate(self._import_chunks(p, chunks, options['workers'] * 2), start=1):
+                rows = result.imported + result.unchanged
+                workers[result.pid]['rows'] += rows
+                workers[result.pid]['seconds'] += result.seconds
+                warnings.update(result.warnings)
+
+                self.stdout.write(
+                    '[{}] Worker {}: {} {}'.format(
+                        done, result.pid, result.chunk,
+                        self._format_throughput(rows, result.seconds)
+                    )
+                )
+            finished = True
+        finally:
+            try:
+                if finished:
+                    p.close()
+                else:
+                    p.terminate()
+                p.join()
+            finally:
+                spool_dir.cleanup()
+                # failed and interrupted runs are recorded as well so that they can be resumed
+                self._update_run(run, time.time() - start, finished)
+
+        for message, count in warnings.most_common():
+            self.stdout.write('{} ({} rows)'.format(message, count))
+        for pid, stats in sorted(workers.items()):
+            self.stdout.write('Worker {}: {}'.format(pid, self._format_throughput(stats['rows'], stats['seconds'])))
+        self.stdout.write(
+            'Total: {}. {} rows imported, {} unchanged rows skipped, {} errors'.format(
+                self._format_throughput(run.rows_imported + run.rows_unchanged, run.duration),
+                run.rows_imported, run.rows_unchanged, run.errors
+            )
+        )
@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from companieshouse.models import Company, NameToken
+
+
+class Command(BaseCommand):
+    """
+    Counts the companies containing each token of `Company.name_normalised` in one set-based query
+    and replaces the NameToken stats with the result.
+
+    Run it after each import so that the name similarity keeps reflecting how common each token is.
+    The weights are loaded once per process so running processes need to be restarted to pick them up.
+    """
+    help = 'Rebuilds the name token stats used to weight the tokens when matching company names'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-frequency', type=int, default=settings.NAME_TOKEN_MIN_FREQUENCY,
+            help='Min number of companies containing a token for it to be stored (defaults to {}).'.format(
+                settings.NAME_TOKEN_MIN_FREQUENCY
+            )
+        )
+
+    def handle(self, *args, **options):
+        start = time.time()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('DELETE FROM {}'.format(NameToken._meta.db_table))
+            cursor.execute(
+                'INSERT INTO {name_token_table} (token, frequency) '
+                'SELECT token, count(*) FROM ('
+                "    SELECT DISTINCT number, unnest(string_to_array(name_normalised, ' ')) AS token "
+                '    FROM {company_table}'
+                ') AS tokens '
+                "WHERE token <> '' "
+                'GROUP BY token '
+                'HAVING count(*) >= %s'.format(
+                    name_token_table=NameToken._meta.db_table,
+                    company_table=Company._meta.db_table
+                ),
+                [options['min_frequency']]
+            )
+            tokens = cursor.rowcount
+
+        self.stdout.write('Stored {} name tokens in {:.1f}s'.format(tokens, time.time() - start))
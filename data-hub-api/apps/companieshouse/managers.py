@@ -1,13 +1,121 @@
+from collections import Counter
+
+from django.apps import apps
 from django.db import models
 from companieshouse.utils import clean_country
+from companieshouse.sources.similarity import get_normalised_values
+
+
+class CompanyChildManager(models.Manager):
+    """
+    Manager of the models related to Company (e.g. sic codes) identified by the values of `FIELDS`.
+    """
+    FIELDS = []
+
+    def sync(self, children_by_company):
+        """
+        Makes the children of each company in `children_by_company` match the values in it.
+        `children_by_company` is a dict {company number: list of tuples with the values of `FIELDS`}.
+
+        The existing children of all the companies are loaded with one query and compared in memory,
+        then the missing ones are created with one bulk insert and the stale ones deleted with one query.
+        Unchanged children are left untouched.
+
+        Returns the tuple (number of children created, number of children deleted).
+        """
+        if not children_by_company:
+            return 0, 0
+
+        model_fields = [self.model._meta.get_field(field_name) for field_name in self.FIELDS]
+        wanted = {
+            number: Counter(
+                tuple(field.to_python(value) for field, value in zip(model_fields, values))
+                for values in children
+            )
+            for number, children in children_by_company.items()
+        }
+
+        to_delete = []
+        existing = self.filter(company_id__in=list(wanted)).values_list('id', 'company_id', *self.FIELDS)
+        for child_id, number, *values in existing:
+            remaining = wanted[number]
+            values = tuple(values)
+            if remaining[values] > 0:
+                remaining[values] -= 1
+            else:
+                to_delete.append(child_id)
+
+        to_create = [
+            self.model(company_id=number, **dict(zip(self.FIELDS, values)))
+            for number, remaining in wanted.items()
+            for values in remaining.elements()
+        ]
+
+        if to_delete:
+            self.filter(id__in=to_delete).delete()
+        if to_create:
+            self.bulk_create(to_create)
+        return len(to_create), len(to_delete)
+
+
+class CompanySicCodeManager(CompanyChildManager):
+    FIELDS = ['code']
+
+
+class CompanyPreviousNameManager(CompanyChildManager):
+    FIELDS = ['change_date', 'name']
 
 
 class CompanyManager(models.Manager):
-    def update_from_CH_data(self, ch_data, company=None):
+    def get_values_from_CH_data(self, ch_data, row_hash=None):
+        """
+        Returns the dict of company field values from the CH record represented by `ch_data`
+        (excluding the sic codes and previous names).
+
+        `row_hash` is the hash of the csv row `ch_data` was parsed from, if any.
+        """
+        registered_office_address = ch_data.get('registered_office_address', {})
+        postcode = registered_office_address.get('postal_code', '')
+        values = {
+            'number': ch_data['company_number'],
+            'name': ch_data['company_name'],
+            'address_line1': registered_office_address.get('address_line_1', ''),
+            'address_line2': registered_office_address.get('address_line_2', ''),
+            'postcode': postcode,
+            'region': registered_office_address.get('region', ''),
+            'locality': registered_office_address.get('locality', ''),
+            'country': clean_country(ch_data.get('country_of_origin')) or '',
+            'company_type': ch_data['type'],
+            'status': ch_data['company_status'],
+            'date_of_creation': ch_data.get('date_of_creation'),
+            'date_of_dissolution': ch_data.get('date_of_dissolution'),
+            'raw': ch_data,
+            'row_hash': row_hash,
+        }
+        values.update(get_normalised_values(ch_data['company_name'], postcode))
+        return values
+
+    def get_children_from_CH_data(self, ch_data):
+        """
+        Returns the tuple (sic codes, previous names) from the CH record represented by `ch_data`,
+        each one as the list of tuples expected by CompanyChildManager.sync.
+        """
+        sic_codes = [(code,) for code in (ch_data.get('sic_codes') or [])]
+        previous_names = [
+            (name_data['date'], name_data['company_name'])
+            for name_data in (ch_data.get('previous_names') or [])
+            if name_data.get('date') and name_data.get('company_name')
+        ]
+        return sic_codes, previous_names
+
+    def update_from_CH_data(self, ch_data, company=None, row_hash=None):
         """
         Updates the `company` object from the CH record represented by `ch_data`.
         If `company` is None, it'll get the object from the db if it exists or create a fresh one otherwise.
 
+        `row_hash` is the hash of the csv row `ch_data` was parsed from. When updating from other sources,
+        it's reset so that the next csv import doesn't skip the company.
+
         The format of `ch_data` should be as similar as the official one as possible:
         https://developer.companieshouse.gov.uk/api/docs/company/company_number/companyProfile-resource.html
         """
@@ -18,47 +126,13 @@ class CompanyManager(models.Manager):
                 company = self.model()
         to_create = not company.name  # this optimises the query a bit
 
-        company.number = ch_data['company_number']
-        company.name = ch_data['company_name']
-
-        registered_office_address = ch_data.get('registered_office_address', {})
-        company.address_line1 = registered_office_address.get('address_line_1', '')
-        company.address_line2 = registered_office_address.get('address_line_2', '')
-        company.postcode = registered_office_address.get('postal_code', '')
-        company.region = registered_office_address.get('region', '')
-        company.locality = registered_office_address.get('locality', '')
-        company.country = clean_country(ch_data.get('country_of_origin')) or ''
-
-        company.company_type = ch_data['type']
-        company.status = ch_data['company_status']
-
-        company.date_of_creation = ch_data.get('date_of_creation')
-        company.date_of_dissolution = ch_data.get('date_of_dissolution')
-
-        company.raw = ch_data
+        for field_name, value in self.get_values_from_CH_data(ch_data, row_hash=row_hash).items():
+            setattr(company, field_name, value)
 
         company.save(force_insert=to_create, force_update=(not to_create))
 
-        # sic codes
-        existing_sic_codes = sorted(list(company.companysiccode_set.values_list('code', flat=True)))
-        sic_codes = sorted(ch_data.get('sic_codes') or [])
-
-        if existing_sic_codes != sic_codes:  # different => delete and re-add
-            company.companysiccode_set.all().delete()
-            for sic_code in sic_codes:
-                company.companysiccode_set.create(code=sic_code)
-
-        # previous names
-        existing_previous_names = sorted(list(company.companypreviousname_set.values_list('name', flat=True)))
-        previous_names = sorted([name_data['company_name'] for name_data in (ch_data.get('previous_names', ) or [])])
-
-        # different => delete and re-add
-        if existing_previous_names != previous_names:
-            company.companypreviousname_set.all().delete()
-            for name_data in (ch_data.get('previous_names') or []):
-                company.companypreviousname_set.create(
-                    change_date=name_data['date'],
-                    name=name_data['company_name']
-                )
+        sic_codes, previous_names = self.get_children_from_CH_data(ch_data)
+        apps.get_model('companieshouse', 'CompanySicCode').objects.sync({company.number: sic_codes})
+        apps.get_model('companieshouse', 'CompanyPreviousName').objects.sync({company.number: previous_names})
 
         return company
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.4 on 2016-06-20 10:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companieshouse', '0003_auto_20160603_1505'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='row_hash',
+            field=models.BigIntegerField(null=True),
+        ),
+    ]
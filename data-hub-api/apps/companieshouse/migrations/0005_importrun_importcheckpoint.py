@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.4 on 2016-06-22 16:41
+from __future__ import unicode_literals
+
+import core.fields
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companieshouse', '0004_company_row_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', core.fields.AutoCreatedField(default=core.fields.now_without_millisecs, editable=False)),
+                ('modified', core.fields.AutoLastModifiedField(default=core.fields.now_without_millisecs, editable=False)),
+                ('chunk', models.CharField(max_length=500)),
+                ('offset', models.BigIntegerField()),
+                ('completed', models.BooleanField(default=False)),
+                ('rows_imported', models.BigIntegerField(default=0)),
+                ('rows_unchanged', models.BigIntegerField(default=0)),
+                ('errors', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ImportRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', core.fields.AutoCreatedField(default=core.fields.now_without_millisecs, editable=False)),
+                ('modified', core.fields.AutoLastModifiedField(default=core.fields.now_without_millisecs, editable=False)),
+                ('paths', django.contrib.postgres.fields.jsonb.JSONField()),
+                ('chunk_size', models.BigIntegerField()),
+                ('full', models.BooleanField(default=False)),
+                ('finished_on', models.DateTimeField(null=True)),
+                ('duration', models.FloatField(default=0)),
+                ('throughput', models.FloatField(null=True)),
+                ('rows_imported', models.BigIntegerField(default=0)),
+                ('rows_unchanged', models.BigIntegerField(default=0)),
+                ('errors', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='importcheckpoint',
+            name='run',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='companieshouse.ImportRun'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='importcheckpoint',
+            unique_together=set([('run', 'chunk')]),
+        ),
+    ]
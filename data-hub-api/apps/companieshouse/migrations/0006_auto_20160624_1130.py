@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.4 on 2016-06-24 11:30
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+INDEX_NAME = 'ch_company_name_trgm_gist_idx'
+
+
+class Migration(migrations.Migration):
+    """
+    GiST trigram index, needed (on top of the GIN one) for the KNN ordering `name <-> 'something'`.
+    """
+
+    dependencies = [
+        ('companieshouse', '0005_importrun_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS {} ON companieshouse_company USING GIST (name gist_trgm_ops)".format(
+                INDEX_NAME
+            ),
+            "DROP INDEX IF EXISTS {}".format(INDEX_NAME)
+        ),
+    ]
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.4 on 2016-06-27 09:45
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+OLD_INDEX_NAME = 'ch_company_name_trgm_gist_idx'
+INDEX_NAME = 'ch_company_name_normalised_trgm_gist_idx'
+
+# frozen SQL version of `clean_name` and `clean_postcode` (companieshouse.sources.similarity)
+# as they were when the columns were added, so that the migration doesn't change with them
+POPULATE_SQL = r"""
+UPDATE companieshouse_company SET
+    name_normalised = btrim(
+        regexp_replace(
+            regexp_replace(lower(coalesce(name, '')), '\m(ltd|limited|inc|llc|the)\M|\.', '', 'g'),
+            '\s+', ' ', 'g'
+        )
+    ),
+    postcode_normalised = btrim(replace(lower(coalesce(postcode, '')), ' ', ''), E'\t\n\r\f')
+"""
+
+
+class Migration(migrations.Migration):
+    """
+    Normalised name and postcode so that the matchers can compare them without cleaning each candidate.
+    The trigram index used by ChDBMatcher is moved from `name` to `name_normalised`.
+    """
+
+    dependencies = [
+        ('companieshouse', '0006_auto_20160624_1130'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='name_normalised',
+            field=models.CharField(blank=True, db_index=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='postcode_normalised',
+            field=models.CharField(blank=True, db_index=True, max_length=20),
+        ),
+        migrations.RunSQL(POPULATE_SQL, migrations.RunSQL.noop),
+        migrations.RunSQL(
+            "DROP INDEX IF EXISTS {}".format(OLD_INDEX_NAME),
+            "CREATE INDEX IF NOT EXISTS {} ON companieshouse_company USING GIST (name gist_trgm_ops)".format(
+                OLD_INDEX_NAME
+            )
+        ),
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS {} ON companieshouse_company USING GIST (name_normalised gist_trgm_ops)".format(
+                INDEX_NAME
+            ),
+            "DROP INDEX IF EXISTS {}".format(INDEX_NAME)
+        ),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.4 on 2016-06-28 14:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+# frozen SQL version of `get_postcode_district` (companieshouse.sources.similarity) as it was when
+# the column was added, derived from the `postcode_normalised` column populated by 0007
+POPULATE_SQL = """
+UPDATE companieshouse_company SET
+    postcode_district = CASE
+        WHEN length(postcode_normalised) BETWEEN 5 AND 7
+            THEN left(postcode_normalised, length(postcode_normalised) - 3)
+        ELSE ''
+    END
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companieshouse', '0007_auto_20160627_0945'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='postcode_district',
+            field=models.CharField(blank=True, db_index=True, max_length=4),
+        ),
+        migrations.RunSQL(POPULATE_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.4 on 2016-07-04 10:05
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companieshouse', '0008_company_postcode_district'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NameToken',
+            fields=[
+                ('token', models.CharField(max_length=200, primary_key=True, serialize=False)),
+                ('frequency', models.IntegerField()),
+            ],
+        ),
+    ]
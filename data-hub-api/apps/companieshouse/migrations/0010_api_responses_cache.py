@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.4 on 2016-07-05 09:30
+from __future__ import unicode_literals
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+API_RESPONSES_CACHE_TABLE = 'companieshouse_api_responses'
+
+
+def create_api_responses_cache_table(apps, schema_editor):
+    call_command(
+        'createcachetable', API_RESPONSES_CACHE_TABLE,
+        database=schema_editor.connection.alias, verbosity=0
+    )
+
+
+def drop_api_responses_cache_table(apps, schema_editor):
+    schema_editor.execute(
+        'DROP TABLE IF EXISTS {}'.format(schema_editor.quote_name(API_RESPONSES_CACHE_TABLE))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companieshouse', '0009_nametoken'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_api_responses_cache_table, drop_api_responses_cache_table),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.4 on 2016-07-06 10:15
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# GIN index on `name` created by 0003, the matcher searches `name_normalised` (see 0007)
+INDEX_NAME = 'ch_company_name_trgm_idx'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companieshouse', '0010_api_responses_cache'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "DROP INDEX IF EXISTS {}".format(INDEX_NAME),
+            "CREATE INDEX IF NOT EXISTS {} ON companieshouse_company USING GIN (name gin_trgm_ops)".format(
+                INDEX_NAME
+            )
+        ),
+    ]
@@ -6,7 +6,8 @@ from django_countries.fields import CountryField
 from core.lib_models import TimeStampedModel
 
 from . import constants
-from .managers import CompanyManager
+from .managers import CompanyManager, CompanySicCodeManager, CompanyPreviousNameManager
+from .sources.similarity import get_normalised_values
 
 
 class Company(TimeStampedModel):
@@ -31,17 +32,47 @@ class Company(TimeStampedModel):
     date_of_dissolution = models.DateField(null=True)
 
     raw = JSONField()
+    row_hash = models.BigIntegerField(null=True)
+
+    # `name` and `postcode` as returned by `clean_name` and `clean_postcode`, used by the matchers
+    # (all the normalised fields are set from `get_normalised_values`)
+    name_normalised = models.CharField(max_length=200, blank=True, db_index=True)
+    postcode_normalised = models.CharField(max_length=20, blank=True, db_index=True)
+    # outward code of `postcode` (see `get_postcode_district`), used to restrict the candidates of the matchers
+    postcode_district = models.CharField(max_length=4, blank=True, db_index=True)
 
     objects = CompanyManager()
 
     def __str__(self):
         return '#{} - {}'.format(self.number, self.name)
 
+    def save(self, *args, **kwargs):
+        for field_name, value in get_normalised_values(self.name, self.postcode).items():
+            setattr(self, field_name, value)
+        super(Company, self).save(*args, **kwargs)
+
+
+class NameToken(models.Model):
+    """
+    Number of companies with `token` in their `name_normalised`, used to weight the tokens when
+    comparing names (see `companieshouse.sources.similarity.NameTokenWeights`).
+
+    Rebuilt by the `update_name_tokens` command; only the tokens of at least `NAME_TOKEN_MIN_FREQUENCY`
+    companies are stored as all the rarer ones get the same (max) weight.
+    """
+    token = models.CharField(max_length=200, primary_key=True)
+    frequency = models.IntegerField()
+
+    def __str__(self):
+        return '{} ({} companies)'.format(self.token, self.frequency)
+
 
 class CompanySicCode(TimeStampedModel):
     code = models.CharField(max_length=10)
     company = models.ForeignKey(Company)
 
+    objects = CompanySicCodeManager()
+
     def __str__(self):
         return 'Sic code {} for company {}'.format(self.code, self.company)
 
@@ -51,5 +82,49 @@ class CompanyPreviousName(TimeStampedModel):
     name = models.CharField(max_length=200)
     company = models.ForeignKey(Company)
 
+    objects = CompanyPreviousNameManager()
+
     def __str__(self):
         return 'Previous name {} for company {}'.format(self.name, self.company)
+
+
+class ImportRun(TimeStampedModel):
+    """
+    Run of the import_csv command. Interrupted runs (finished_on == None) can be resumed.
+    `duration` (seconds) and `throughput` (rows/s) cover all the attempts of the run.
+    """
+    paths = JSONField()
+    chunk_size = models.BigIntegerField()
+    full = models.BooleanField(default=False)
+
+    finished_on = models.DateTimeField(null=True)
+    duration = models.FloatField(default=0)
+    throughput = models.FloatField(null=True)
+
+    rows_imported = models.BigIntegerField(default=0)
+    rows_unchanged = models.BigIntegerField(default=0)
+    errors = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return 'Import run {} of {}'.format(self.pk, ', '.join(self.paths))
+
+
+class ImportCheckpoint(TimeStampedModel):
+    """
+    Progress of the import of one chunk of a file.
+    `offset` is where the next row starts: byte offset in the csv file or in the spooled chunk for streams.
+    """
+    run = models.ForeignKey(ImportRun)
+    chunk = models.CharField(max_length=500)
+    offset = models.BigIntegerField()
+    completed = models.BooleanField(default=False)
+
+    rows_imported = models.BigIntegerField(default=0)
+    rows_unchanged = models.BigIntegerField(default=0)
+    errors = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('run', 'chunk')
+
+    def __str__(self):
+        return 'Checkpoint {} of {}'.format(self.chunk, self.run)
@@ -2,12 +2,22 @@ import slumber
 
 from django.conf import settings
 
+from ..cache import CachedResource
+from ..ratelimit import RateLimiter, ThrottledSession
+
 COMPANIES_HOUSE_BASE_URL = "https://api.companieshouse.gov.uk/"
 
-api = slumber.API(
+session = ThrottledSession(
+    RateLimiter(settings.COMPANIES_HOUSE_API_RATE_LIMIT, processes=settings.API_RATE_LIMIT_PROCESSES),
+    max_retries=settings.API_MAX_RETRIES,
+    backoff=settings.API_RETRY_BACKOFF
+)
+
+api = CachedResource(slumber.API(
     COMPANIES_HOUSE_BASE_URL,
     auth=(
         settings.COMPANIES_HOUSE_TOKEN, ""
     ),
-    append_slash=False
-)
+    append_slash=False,
+    session=session
+), 'companieshouse')
@@ -12,20 +12,22 @@ class ChAPIMatcher(BaseMatcher):
         matcher.findings  # if you want the full list considered internally for debug purposes
     """
 
+    CONCURRENT = True
+
     def _build_findings(self):
         results = api.search.companies.get(q=self.name)['items']
 
+        candidates = [(result['title'], self._get_ch_postcode(result)) for result in results]
+        proximities = self._get_similarity_proximities(candidates)
+
         self.findings = []
-        for result in results:
-            ch_name = result['title']
-            ch_postcode = self._get_ch_postcode(result)
+        for result, (ch_name, ch_postcode), proximity in zip(results, candidates, proximities):
             company_number = result['company_number']
-            proximity = self._get_similarity_proximity(ch_name, ch_postcode)
 
             self.findings.append(
                 FindingResult(
                     name=ch_name, postcode=ch_postcode,
-                    proximity=proximity, company_number=company_number,
+                    proximity=float(proximity), company_number=company_number,
                     raw=result
                 )
             )
@@ -0,0 +1,80 @@
+import hashlib
+import json
+
+from requests import Response
+from slumber.exceptions import HttpNotFoundError
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+# cached instead of the response body when the api returns 404
+NOT_FOUND = 'companieshouse.sources.cache.NOT_FOUND'
+
+
+def normalise_key_part(value):
+    """
+    Returns `value` lowercase without extra spaces so that e.g. searches for 'My  Company' and 'my company'
+    share the same cached response.
+    """
+    return ' '.join(str(value).lower().split())
+
+
+class CachedResource(object):
+    """
+    Wraps a slumber API object (or any of its resources) so that the responses of GET requests are cached
+    in the `API_CACHE` Django cache, which takes care of expiring (TIMEOUT) and evicting (MAX_ENTRIES) them.
+
+    The cache key is made of the normalised resource path (e.g. company number) and query params
+    (e.g. search query). 404 responses are cached as well (for `API_CACHE_NOT_FOUND_TIMEOUT` seconds)
+    and re-raised as HttpNotFoundError.
+
+    e.g.
+        api = CachedResource(slumber.API(...), 'companieshouse')
+        api.search.companies.get(q='my company')  # requested
+        api.search.companies.get(q='My Company')  # from the cache
+    """
+    def __init__(self, resource, name, path=()):
+        self._resource = resource
+        self._name = name
+        self._path = path
+
+    def __getattr__(self, item):
+        resource = getattr(self._resource, item)
+        if not hasattr(resource, '_store'):
+            return resource  # not a resource (e.g. post, put...) so nothing to cache
+        return CachedResource(resource, self._name, self._path + (item,))
+
+    def __call__(self, id=None, **kwargs):
+        path = self._path + ((id,) if id is not None else ())
+        return CachedResource(self._resource(id, **kwargs), self._name, path)
+
+    def get_cache_key(self, params):
+        key = json.dumps(
+            [
+                [normalise_key_part(part) for part in self._path],
+                sorted([key, normalise_key_part(value)] for key, value in params.items())
+            ]
+        )
+        return 'api:{}:{}'.format(self._name, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def get(self, **kwargs):
+        cache = caches[settings.API_CACHE]
+        key = self.get_cache_key(kwargs)
+
+        cached = cache.get(key)
+        if cached == NOT_FOUND:
+            response = Response()
+            response.status_code = 404
+            raise HttpNotFoundError('Client Error 404 (cached)', response=response, content=b'')
+        if cached is not None:
+            return cached
+
+        try:
+            data = self._resource.get(**kwargs)
+        except HttpNotFoundError:
+            cache.set(key, NOT_FOUND, timeout=settings.API_CACHE_NOT_FOUND_TIMEOUT)
+            raise
+
+        cache.set(key, data)
+        return data
@@ -0,0 +1,64 @@
+import hashlib
+from array import array
+from bisect import bisect_left
+
+from django.db import connection, transaction
+
+from companieshouse.models import Company
+
+
+ROW_HASH_SEPARATOR = '\x1f'
+
+
+def get_row_hash(row):
+    """
+    Returns the content hash of the raw csv `row` (list of values) as signed 64 bit int
+    (first 8 bytes of its sha1) so that it can be stored in a bigint column.
+    """
+    digest = hashlib.sha1(ROW_HASH_SEPARATOR.join(row).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], byteorder='big', signed=True)
+
+
+class RowHashIndex(object):
+    """
+    Set-like index of the row hashes of the companies in the db, used to skip the csv rows
+    that haven't changed since the last import.
+
+    As the hash of a row already depends on the company number, there's no need to keep track of
+    which company each hash belongs to: if the hash of a csv row is in the index, the company is up-to-date.
+
+    The hashes are kept in a sorted array of 64 bit ints (8 bytes per company) and looked up with a
+    binary search so that the whole CH dataset fits in a few tens of MB.
+
+    e.g.
+        index = RowHashIndex.load()
+        get_row_hash(row) in index
+    """
+    def __init__(self, hashes=()):
+        """
+        `hashes` must be sorted.
+        """
+        self.hashes = array('q', hashes)
+
+    @classmethod
+    def load(cls):
+        """
+        Returns the index of all the row hashes in the db, streamed using a server-side cursor.
+        """
+        with transaction.atomic():
+            connection.ensure_connection()
+            with connection.connection.cursor(name='ch_row_hash_index') as cursor:
+                cursor.itersize = 100000
+                cursor.execute(
+                    'SELECT row_hash FROM {} WHERE row_hash IS NOT NULL ORDER BY row_hash'.format(
+                        Company._meta.db_table
+                    )
+                )
+                return cls(row_hash for row_hash, in cursor)
+
+    def __contains__(self, row_hash):
+        index = bisect_left(self.hashes, row_hash)
+        return index != len(self.hashes) and self.hashes[index] == row_hash
+
+    def __len__(self):
+        return len(self.hashes)
@@ -1,15 +1,99 @@
 import re
 import datetime
+from collections import Counter
+from functools import lru_cache
 
 from companieshouse import constants
 
 SIC_CODE_RE = re.compile(r"^(\d+)")
+CONVERTERS_CACHE_SIZE = 8192
+
+
+class WarningsAggregator(object):
+    """
+    Counts the warnings raised while parsing (e.g. unknown company types) so that they can be
+    reported once at the end instead of being printed for each row.
+    """
+    def __init__(self):
+        self.counts = Counter()
+
+    def add(self, message):
+        self.counts[message] += 1
+
+    def pop(self):
+        """
+        Returns the Counter of the warnings collected so far and resets it.
+        """
+        counts, self.counts = self.counts, Counter()
+        return counts
+warnings_aggregator = WarningsAggregator()
+
+
+class ParserCompiler(object):
+    """
+    Compiles a tree of parsers into one flat python function which reads each value of the row
+    by column index and applies its converter directly, without going through the
+    nested parse() calls for each row.
+
+    e.g.
+        parse = ParserCompiler().compile(DictParser([...]))
+        data = parse(row)
+    """
+    def __init__(self):
+        self.lines = []
+        self.namespace = {}
+        self.columns = 0
+        self.variables = 0
+
+    def new_variable(self):
+        self.variables += 1
+        return 'v{}'.format(self.variables)
+
+    def next_column(self):
+        self.columns += 1
+        return self.columns - 1
+
+    def add_converter(self, converter):
+        name = 'convert{}'.format(len(self.namespace))
+        self.namespace[name] = converter
+        return name
+
+    def emit(self, line):
+        self.lines.append('    {}'.format(line))
+
+    def compile(self, parser):
+        result = parser.compile(self)
+        source = '\n'.join(
+            [
+                'def parse(row):',
+                '    if len(row) < {0}:'.format(self.columns),
+                '        raise ValueError("Expected {0} values, got {{}}".format(len(row)))'.format(self.columns),
+            ] + self.lines + [
+                '    return {}'.format(result)
+            ]
+        )
+        exec(compile(source, '<compiled {}>'.format(parser.__class__.__name__), 'exec'), self.namespace)
+        return self.namespace['parse']
 
 
 class Parser(object):
     def parse(self, row):
         raise NotImplementedError()
 
+    def compile(self, compiler):
+        """
+        Emits the code which parses the next values of the row using `compiler`
+        and returns the name of the variable holding the result.
+        """
+        raise NotImplementedError('{} cannot be compiled'.format(self.__class__.__name__))
+
+    def compile_into(self, compiler, target):
+        """
+        Emits the code which updates the dict `target` with the result of this parser.
+        """
+        result = self.compile(compiler)
+        compiler.emit('if {0}: {1}.update({0})'.format(result, target))
+
 
 class SimpleParser(Parser):
     def _parse(self, val):
@@ -20,12 +104,27 @@ class SimpleParser(Parser):
         if not val:
             return val
         return self._parse(val)
+
+    def compile(self, compiler):
+        result = compiler.new_variable()
+        compiler.emit('{} = row[{}]'.format(result, compiler.next_column()))
+        if type(self)._parse is not SimpleParser._parse:
+            compiler.emit('if {0}: {0} = {1}({0})'.format(result, compiler.add_converter(self._parse)))
+        return result
 simple_parser = SimpleParser()
 
 
 class DateParser(SimpleParser):
+    """
+    Parses dd/mm/yyyy dates (day and month can be non-zero-padded) into isoformat strings.
+    The conversions are memoised as the same dates repeat a lot across the rows.
+    """
+    @lru_cache(maxsize=CONVERTERS_CACHE_SIZE)
     def _parse(self, val):
-        return datetime.datetime.strptime(val, '%d/%m/%Y').date().isoformat()
+        day, month, year = val.split('/')
+        if len(year) != 4:
+            raise ValueError("time data '{}' does not match format dd/mm/yyyy".format(val))
+        return datetime.date(int(year), int(month), int(day)).isoformat()
 date_parser = DateParser()
 
 
@@ -51,7 +150,46 @@ class SicCodeParser(SimpleParser):
 siccode_parser = SicCodeParser()
 
 
-class CompanyTypeParser(SimpleParser):
+class ChoicesParser(SimpleParser):
+    """
+    Maps the values to the `CHOICES` with matching display value (after applying `SUBSTITUTES`),
+    falling back to `DEFAULT` for unknown values.
+
+    The conversions are memoised as only a few distinct values appear in all the rows and
+    unknown values are counted by the `warnings_aggregator` instead of being printed for each row.
+    """
+    NAME = None
+    SUBSTITUTES = {}
+    CHOICES = None
+    DEFAULT = None
+
+    def _normalise(self, val):
+        return val
+
+    @lru_cache(maxsize=CONVERTERS_CACHE_SIZE)
+    def _lookup(self, val):
+        """
+        Returns the tuple (value, warning message or None).
+        """
+        key = self._normalise(val)
+        key = self.SUBSTITUTES.get(key, key)
+
+        try:
+            return self.CHOICES.displays[key].value, None
+        except KeyError:
+            return self.DEFAULT, "Warning {} '{}' not found, using the default '{}' instead".format(
+                self.NAME, key, self.DEFAULT
+            )
+
+    def _parse(self, val):
+        value, warning = self._lookup(val)
+        if warning:
+            warnings_aggregator.add(warning)
+        return value
+
+
+class CompanyTypeParser(ChoicesParser):
+    NAME = 'COMPANY_TYPE'
     SUBSTITUTES = {
         'European public limited-liability company (se)': 'European public limited liability company (SE)',
         'Pri/ltd by guar/nsc (private, limited by guarantee, no share capital)': 'Private limited by guarantee without share capital',  # noqa
@@ -64,25 +202,15 @@ class CompanyTypeParser(SimpleParser):
         'Priv ltd sect. 30 (private limited company, section 30 of the companies act)': 'Private limited company',
     }
     CHOICES = constants.COMPANY_TYPES
+    DEFAULT = CHOICES.OTHER
 
-    def _parse(self, val):
-        val = sentence_parser._parse(val)
-
-        key = self.SUBSTITUTES.get(val, val)
-
-        try:
-            return self.CHOICES.displays[key].value
-        except KeyError:
-            print(
-                "Warning COMPANY_TYPE '{}' not found, using the default '{}' instead".format(
-                    key, self.CHOICES.OTHER
-                )
-            )
-            return self.CHOICES.OTHER
+    def _normalise(self, val):
+        return sentence_parser._parse(val)
 company_type_parser = CompanyTypeParser()
 
 
-class CompanyStatusParser(SimpleParser):
+class CompanyStatusParser(ChoicesParser):
+    NAME = 'COMPANY_STATUS'
     SUBSTITUTES = {
         'Active - Proposal to Strike off': 'Active',
         'ADMINISTRATION ORDER': 'In Administration',
@@ -96,20 +224,7 @@ class CompanyStatusParser(SimpleParser):
         'VOLUNTARY ARRANGEMENT / RECEIVER MANAGER': 'Voluntary Arrangement',
     }
     CHOICES = constants.COMPANY_STATUSES
-
-    def _parse(self, val):
-        status_key = self.SUBSTITUTES.get(val, val)
-
-        try:
-            status = self.CHOICES.displays[status_key].value
-        except KeyError:
-            print(
-                "Warning COMPANY_STATUS '{}' not found, using the default '{}' instead".format(
-                    status_key, self.CHOICES.ACTIVE
-                )
-            )
-            status = self.CHOICES.ACTIVE
-        return status
+    DEFAULT = CHOICES.ACTIVE
 company_status_parser = CompanyStatusParser()
 
 
@@ -126,6 +241,16 @@ class PropertyParser(Parser):
             self.prop: val
         }
 
+    def compile(self, compiler):
+        val = self.parser.compile(compiler)
+        result = compiler.new_variable()
+        compiler.emit('{0} = {{{1!r}: {2}}} if {2} else {{}}'.format(result, self.prop, val))
+        return result
+
+    def compile_into(self, compiler, target):
+        val = self.parser.compile(compiler)
+        compiler.emit('if {0}: {1}[{2!r}] = {0}'.format(val, target, self.prop))
+
 
 class DictParser(Parser):
     def __init__(self, property_parsers):
@@ -139,6 +264,13 @@ class DictParser(Parser):
                 data.update(val)
         return data
 
+    def compile(self, compiler):
+        result = compiler.new_variable()
+        compiler.emit('{} = {{}}'.format(result))
+        for parser in self.parsers:
+            parser.compile_into(compiler, result)
+        return result
+
 
 class ListParser(Parser):
     def __init__(self, parser, number):
@@ -153,14 +285,25 @@ class ListParser(Parser):
                 data.append(val)
         return data
 
+    def compile(self, compiler):
+        result = compiler.new_variable()
+        compiler.emit('{} = []'.format(result))
+        for index in range(self.number):
+            val = self.parser.compile(compiler)
+            compiler.emit('if {0}: {1}.append({0})'.format(val, result))
+        return result
+
 
 class CSVImporter(DictParser):
     """
     Used to import a CSV row (representing a company) from the Companies House dataset.
 
+    The parsers tree is compiled once per class into a flat function (see ParserCompiler)
+    which is then used to parse each row.
+
     e.g.
         importer = CSVImporter()
-        data = importer.parse(iter(row))
+        data = importer.parse(row)
     """
     PARSERS = [
         PropertyParser('company_name'),
@@ -238,5 +381,22 @@ class CSVImporter(DictParser):
         )
     ]
 
+    _compiled_parsers = {}
+
     def __init__(self):
         super(CSVImporter, self).__init__(self.PARSERS)
+        self._parse_row = self.get_compiled_parser()
+
+    @classmethod
+    def get_compiled_parser(cls):
+        if cls not in cls._compiled_parsers:
+            cls._compiled_parsers[cls] = ParserCompiler().compile(DictParser(cls.PARSERS))
+        return cls._compiled_parsers[cls]
+
+    def parse(self, row):
+        """
+        `row` can be a list or any other iterable of values.
+        """
+        if not isinstance(row, (list, tuple)):
+            row = list(row)
+        return self._parse_row(row)
@@ -0,0 +1,146 @@
+import io
+import json
+from collections import OrderedDict
+
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from companieshouse.models import Company, CompanySicCode, CompanyPreviousName
+
+
+COPY_NULL = '\\N'
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+})
+
+
+def to_copy_value(value):
+    """
+    Returns `value` formatted for the text format of the PostgreSQL COPY command.
+    """
+    if value is None:
+        return COPY_NULL
+    return str(value).translate(COPY_ESCAPES)
+
+
+class CompanyBulkLoader(object):
+    """
+    Loads batches of CH records (in the format returned by the CSVImporter) into the db in a set-based way.
+
+    For each batch, the companies are staged into a temporary table using COPY and upserted with one
+    INSERT ... ON CONFLICT statement, then the sic codes and previous names of the companies in the batch
+    are synced with a constant number of queries per table (see CompanyChildManager.sync), so the number
+    of queries does not depend on the number of rows.
+
+    e.g.
+        loader = CompanyBulkLoader()
+        loader.load(ch_data_list)
+    """
+    COMPANY_STAGING_TABLE = 'tmp_ch_company'
+
+    COMPANY_FIELDS = [
+        'number', 'name',
+        'address_line1', 'address_line2', 'postcode', 'region', 'locality', 'country',
+        'company_type', 'status', 'date_of_creation', 'date_of_dissolution',
+        'raw', 'row_hash', 'name_normalised', 'postcode_normalised', 'postcode_district',
+    ]
+
+    def get_company_values(self, ch_data, row_hash=None):
+        """
+        Returns the dict of company field values from `ch_data`.
+        """
+        values = Company.objects.get_values_from_CH_data(ch_data, row_hash=row_hash)
+        values['raw'] = json.dumps(values['raw'])
+        return values
+
+    def _copy(self, cursor, table, columns, rows):
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join([to_copy_value(value) for value in row]))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        cursor.copy_expert(
+            'COPY {} ({}) FROM STDIN'.format(table, ', '.join(columns)),
+            buffer
+        )
+
+    def _create_staging_table(self, cursor):
+        cursor.execute('DROP TABLE IF EXISTS {}'.format(self.COMPANY_STAGING_TABLE))
+        cursor.execute(
+            'CREATE TEMPORARY TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP'.format(
+                self.COMPANY_STAGING_TABLE, Company._meta.db_table
+            )
+        )
+
+    def _stage(self, cursor, records, timestamp):
+        company_rows = []
+        for ch_data, row_hash in records:
+            values = self.get_company_values(ch_data, row_hash=row_hash)
+            company_rows.append(
+                [values[field_name] for field_name in self.COMPANY_FIELDS] + [timestamp, timestamp]
+            )
+
+        self._copy(
+            cursor, self.COMPANY_STAGING_TABLE,
+            self.COMPANY_FIELDS + ['created', 'modified'], company_rows
+        )
+
+    def _sync_children(self, records):
+        """
+        Makes the sic codes and previous names of the companies in `records` match the ones in their CH data.
+        """
+        sic_codes = {}
+        previous_names = {}
+        for ch_data, row_hash in records:
+            number = ch_data['company_number']
+            sic_codes[number], previous_names[number] = Company.objects.get_children_from_CH_data(ch_data)
+
+        CompanySicCode.objects.sync(sic_codes)
+        CompanyPreviousName.objects.sync(previous_names)
+
+    def _upsert_companies(self, cursor):
+        columns = self.COMPANY_FIELDS + ['created', 'modified']
+        updates = [column for column in columns if column not in ('number', 'created')]
+
+        cursor.execute(
+            'INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging_table} '
+            'ON CONFLICT (number) DO UPDATE SET {updates}'.format(
+                table=Company._meta.db_table,
+                staging_table=self.COMPANY_STAGING_TABLE,
+                columns=', '.join(columns),
+                updates=', '.join('{0} = EXCLUDED.{0}'.format(column) for column in updates)
+            )
+        )
+
+    def load(self, ch_data_list, row_hashes=None):
+        """
+        Creates or updates the companies (and related sic codes and previous names) in `ch_data_list`.
+        If the same company number appears more than once, the last record wins.
+
+        `row_hashes` is the optional list of the hashes of the csv rows the items in `ch_data_list`
+        were parsed from.
+        """
+        if row_hashes is None:
+            row_hashes = [None] * len(ch_data_list)
+
+        records = list(
+            OrderedDict(
+                (ch_data['company_number'], (ch_data, row_hash))
+                for ch_data, row_hash in zip(ch_data_list, row_hashes)
+            ).values()
+        )
+        if not records:
+            return 0
+
+        timestamp = now().replace(microsecond=0)
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._create_staging_table(cursor)
+            self._stage(cursor, records, timestamp)
+            self._upsert_companies(cursor)
+
+            self._sync_children(records)
+        return len(records)
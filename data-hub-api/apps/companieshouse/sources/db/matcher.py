@@ -1,9 +1,18 @@
 from collections import namedtuple
 
-from django.db import connection
+from django.conf import settings
+from django.db import connection, transaction
 
-from ..similarity import clean_name
+from companieshouse.models import Company
+
+from ..similarity import (
+    clean_name, clean_postcode, get_postcode_district, SimilarityCalculator, BatchSimilarityCalculator
+)
 from ..matcher import BaseMatcher, FindingResult
+from .names import get_name_index
+
+
+DBQuery = namedtuple('DBQuery', ['index', 'name', 'postcode', 'district'])
 
 
 def namedtuplefetchall(cursor):
@@ -17,50 +26,312 @@ class ChDBMatcher(BaseMatcher):
     """
     DB Matcher which uses the Database to find the best match.
 
-    It uses the ILIKE postgres operation on 'name' and if that doesn't find anything, it tries with the
-    similarity operator %.
+    It gets the `DB_MATCHER_MAX_CANDIDATES` * `CANDIDATES_POOL_FACTOR` companies with the most similar names
+    in one query using the postgres similarity operator % (with `DB_MATCHER_SIMILARITY_THRESHOLD` as limit) and
+    the KNN ordering <->, so the number of rows considered is bounded regardless of how common the name is.
+    Of those, the `DB_MATCHER_MAX_CANDIDATES` with the best name similarity boosted when the postcode matches
+    are kept and then scored (names and postcodes) by the SimilarityCalculator.
+    The threshold is set with SET LOCAL in a transaction so it doesn't leak to the rest of the session.
+
+    Names and postcodes are compared using the pre-normalised `name_normalised` and `postcode_normalised`
+    columns; if a company with the exact same normalised name and postcode exists, it's found with
+    an index lookup and the similarity search is skipped as nothing can be closer.
 
-    In oder for it to work, you must have the 'pg_trgm' extension and a 'gin_trgm_ops' index (included
+    When the postcode is valid, the similarity search is first restricted to the companies in the same
+    postcode district (indexed `postcode_district` column) so that common names don't pull in candidates
+    from all over the country. If the postcode is missing or no company in the district is close enough to be
+    accepted (`MATCHER_ACCEPTANCE_PROXIMITY`), the search falls back to names only, e.g. to find the company
+    with the exact name registered somewhere else.
+
+    In order for it to work, you must have the 'pg_trgm' extension and a 'gist_trgm_ops' index (included
     in the Django migrations).
 
+    `find_many` does the same for many (name, postcode) pairs together using VALUES lists so that
+    the number of queries doesn't depend on the number of pairs.
+
     e.g.
         matcher = ChDBMatcher(name, postcode)
         best_match = matcher.find()  # returns the best match, an instance of FindingResult
-        matcher.findings  # if you want the full list considered internally for debug purposes
+        matcher.findings  # if you want the full list considered internally for debug purposes
     """
+    EXACT_COMPANIES_SQL = (
+        "SELECT query.query_index, company.number, company.name, company.postcode, company.raw, "
+        "    company.name_normalised, company.postcode_normalised "
+        "FROM (VALUES {values}) AS query (query_index, name, postcode) "
+        "JOIN companieshouse_company AS company "
+        "    ON company.name_normalised = query.name AND company.postcode_normalised = query.postcode"
+    )
 
-    def _get_similar_companies(self, name):
-        cursor = connection.cursor()
-        cursor.execute(
-            "SELECT number, name, postcode, raw "
-            "FROM companieshouse_company "
-            "WHERE name ILIKE %s", ['%{}%'.format(name)]
+    SIMILAR_COMPANIES_SQL = (
+        "SELECT query.query_index, candidate.number, candidate.name, candidate.postcode, candidate.raw, "
+        "    candidate.name_normalised, candidate.postcode_normalised "
+        "FROM (VALUES {values}) AS query (query_index, name, postcode, district) "
+        "CROSS JOIN LATERAL ("
+        "    SELECT nearest.*, nearest.name_similarity + ("
+        "        CASE "
+        "            WHEN query.postcode = '' THEN 0 "
+        "            WHEN nearest.postcode_normalised = query.postcode THEN %s "
+        "            WHEN left(nearest.postcode_normalised, 3) = left(query.postcode, 3) THEN %s "
+        "            ELSE 0 "
+        "        END"
+        "    ) AS score "
+        "    FROM ("
+        "        SELECT company.number, company.name, company.postcode, company.raw, "
+        "            company.name_normalised, company.postcode_normalised, "
+        "            similarity(company.name_normalised, query.name) AS name_similarity "
+        "        FROM companieshouse_company AS company "
+        "        WHERE company.name_normalised %% query.name {district_filter}"
+        "        ORDER BY company.name_normalised <-> query.name "
+        "        LIMIT %s"
+        "    ) AS nearest "
+        "    ORDER BY score DESC "
+        "    LIMIT %s"
+        ") AS candidate "
+        "ORDER BY query.query_index, candidate.score DESC"
+    )
+
+    # how many more candidates than DB_MATCHER_MAX_CANDIDATES the KNN search gets before the postcode boost
+    CANDIDATES_POOL_FACTOR = 5
+
+    DISTRICT_FILTER_SQL = "AND company.postcode_district = query.district "
+
+    @classmethod
+    def _get_query(cls, index, name, postcode):
+        postcode = clean_postcode(postcode) or ''
+        return DBQuery(
+            index=index,
+            name=clean_name(name) or '',
+            postcode=postcode,
+            district=get_postcode_district(postcode)
         )
-        return namedtuplefetchall(cursor)
 
-    def _slowget_similar_companies(self, name):
+    @classmethod
+    def _execute(cls, sql, rows, params, **sql_kwargs):
+        """
+        Executes `sql` with the VALUES list made of `rows` and returns the results grouped by query index.
+        """
+        values_sql = ', '.join(['({})'.format(', '.join(['%s'] * len(rows[0])))] * len(rows))
+        values_params = [value for row in rows for value in row]
+
         cursor = connection.cursor()
-        cursor.execute(
-            "SELECT number, name, postcode, raw "
-            "FROM companieshouse_company "
-            "WHERE name %% %s", [name]
+        cursor.execute(sql.format(values=values_sql, **sql_kwargs), values_params + params)
+
+        results = {}
+        for result in namedtuplefetchall(cursor):
+            results.setdefault(result.query_index, []).append(result)
+        return results
+
+    @classmethod
+    def _get_exact_companies(cls, queries):
+        """
+        Returns {query index: companies with the same normalised name and postcode}.
+        """
+        if not queries:
+            return {}
+
+        return cls._execute(
+            cls.EXACT_COMPANIES_SQL,
+            [(query.index, query.name, query.postcode) for query in queries],
+            []
         )
-        return namedtuplefetchall(cursor)
 
-    def _build_findings(self):
-        cleaned_name = clean_name(self.name)
-        results = self._get_similar_companies(cleaned_name)
-        if not results:
-            results = self._slowget_similar_companies(cleaned_name)
+    @classmethod
+    def _get_similar_companies(cls, queries, by_district=False):
+        """
+        Returns {query index: companies with names similar to the query one ranked by name similarity
+        boosted when the postcode matches}, only the ones in the same postcode district if `by_district` == True.
 
-        self.findings = []
-        for result in results:
-            proximity = self._get_similarity_proximity(result.name, result.postcode)
+        The similarity threshold has to be set beforehand (see `_find_companies`).
+        """
+        if not queries:
+            return {}
+
+        return cls._execute(
+            cls.SIMILAR_COMPANIES_SQL,
+            [(query.index, query.name, query.postcode, query.district) for query in queries],
+            [
+                SimilarityCalculator.POSTCODE_WEIGHT,
+                SimilarityCalculator.POSTCODE_WEIGHT / 2,
+                settings.DB_MATCHER_MAX_CANDIDATES * cls.CANDIDATES_POOL_FACTOR,
+                settings.DB_MATCHER_MAX_CANDIDATES
+            ],
+            district_filter=cls.DISTRICT_FILTER_SQL if by_district else ''
+        )
+
+    @classmethod
+    def _has_acceptable_company(cls, query, companies):
+        """
+        Returns True if any of `companies` is close enough to `query` to be accepted as a match.
+        """
+        if not companies:
+            return False
+
+        proximities = BatchSimilarityCalculator(query.name, query.postcode).get_proximities(
+            [(company.name_normalised, company.postcode_normalised) for company in companies],
+            normalised=True
+        )
+        return max(proximities) >= settings.MATCHER_ACCEPTANCE_PROXIMITY
+
+    @classmethod
+    def _find_companies(cls, queries):
+        """
+        Returns {query index: candidate companies} for all the `queries` using one query per step:
+            1. exact matches
+            2. similar names in the same postcode district for the queries without exact matches
+            3. similar names for the queries still without acceptable candidates, added to the ones of step 2
+        """
+        pending = [query for query in queries if query.name]
+
+        results = cls._get_exact_companies([query for query in pending if query.postcode])
+        pending = [query for query in pending if query.index not in results]
+        if not pending:
+            return results
+
+        with transaction.atomic():
+            cursor = connection.cursor()
+            cursor.execute(
+                "SET LOCAL pg_trgm.similarity_threshold = %s", [settings.DB_MATCHER_SIMILARITY_THRESHOLD]
+            )
+
+            results.update(
+                cls._get_similar_companies([query for query in pending if query.district], by_district=True)
+            )
+            pending = [
+                query for query in pending
+                if not cls._has_acceptable_company(query, results.get(query.index))
+            ]
+
+            for index, companies in cls._get_similar_companies(pending).items():
+                district_companies = results.setdefault(index, [])
+                district_numbers = {company.number for company in district_companies}
+                district_companies.extend(
+                    company for company in companies if company.number not in district_numbers
+                )
+        return results
+
+    def _set_findings(self, results):
+        proximities = self._get_similarity_proximities(
+            [(result.name_normalised, result.postcode_normalised) for result in results],
+            normalised=True
+        )
 
+        self.findings = []
+        for result, proximity in zip(results, proximities):
             self.findings.append(
                 FindingResult(
                     name=result.name, postcode=result.postcode,
-                    proximity=proximity, company_number=result.number,
+                    proximity=float(proximity), company_number=result.number,
                     raw=result.raw
                 )
             )
+
+    def _build_findings(self):
+        results = self._find_companies([self._get_query(0, self.name, self.postcode)])
+        self._set_findings(results.get(0, []))
+
+    @classmethod
+    def find_many(cls, pairs):
+        """
+        Finds the candidates of all the `pairs` together with a constant number of queries
+        (VALUES lists joined against the indexes).
+        """
+        if not pairs:
+            return []
+
+        results = cls._find_companies(
+            [cls._get_query(index, name, postcode) for index, (name, postcode) in enumerate(pairs)]
+        )
+
+        best_matches = []
+        for index, (name, postcode) in enumerate(pairs):
+            matcher = cls(name, postcode)
+            matcher._set_findings(results.get(index, []))
+            best_matches.append(matcher._choose_best_finding())
+        return best_matches
+
+
+class ChIndexMatcher(BaseMatcher):
+    """
+    DB Matcher which generates the candidates in memory using the CompanyNameIndex (built by the
+    `build_name_index` command from the companies in the db) instead of querying the db for each name.
+
+    The index is loaded lazily the first time it's needed and memory-mapped so it's shared between
+    the processes on the same machine. The candidates are the `NAME_INDEX_MAX_CANDIDATES` companies sharing
+    the most distinctive tokens with the name and they are scored like in the other matchers.
+
+    The index doesn't include the raw CH data so only the raw data of the best matches is fetched from the db,
+    with one query for `find` as well as for `find_many`. The other findings have raw == None.
+    Companies deleted since the index was built are skipped.
+
+    To use it, set NAME_INDEX_PATH (env var DJANGO__NAME_INDEX_PATH), add
+    'companieshouse.sources.db.matcher.ChIndexMatcher' to MATCHER_CLASSES, e.g. instead of ChDBMatcher,
+    and rebuild the index after each import.
+    """
+    def _build_findings(self):
+        index = get_name_index()
+        company_ids = index.get_candidates(
+            clean_name(self.name) or '', settings.NAME_INDEX_MAX_CANDIDATES, settings.NAME_INDEX_MAX_POSTINGS
+        )
+        records = [index.get_record(company_id) for company_id in company_ids]
+
+        proximities = self._get_similarity_proximities(
+            [(record.name_normalised, record.postcode_normalised) for record in records],
+            normalised=True
+        )
+
+        self.findings = []
+        for record, proximity in zip(records, proximities):
+            self.findings.append(
+                FindingResult(
+                    name=record.name, postcode=record.postcode,
+                    proximity=float(proximity), company_number=record.number,
+                    raw=None
+                )
+            )
+
+    @classmethod
+    def _choose_best_findings(cls, matchers):
+        """
+        Returns the best findings of `matchers` with their raw data fetched from the db in one query.
+        If the company of a best finding is no longer in the db, the finding is discarded and the next best used.
+        """
+        best_findings = [None] * len(matchers)
+        pending = list(range(len(matchers)))
+        while pending:
+            for index in pending:
+                best_findings[index] = matchers[index]._choose_best_finding()
+            pending = [index for index in pending if best_findings[index]]
+
+            raws = dict(
+                Company.objects.filter(
+                    number__in={best_findings[index].company_number for index in pending}
+                ).values_list('number', 'raw')
+            ) if pending else {}
+
+            missing = []
+            for index in pending:
+                finding = best_findings[index]
+                if finding.company_number in raws:
+                    best_findings[index] = finding._replace(raw=raws[finding.company_number])
+                else:
+                    matchers[index].findings.remove(finding)
+                    missing.append(index)
+            pending = missing
+        return best_findings
+
+    def find(self):
+        self._build_findings()
+        return self._choose_best_findings([self])[0]
+
+    @classmethod
+    def find_many(cls, pairs):
+        """
+        Finds the candidates of all the `pairs` in memory and fetches the raw data of the best matches
+        with one query.
+        """
+        matchers = []
+        for name, postcode in pairs:
+            matcher = cls(name, postcode)
+            matcher._build_findings()
+            matchers.append(matcher)
+        return cls._choose_best_findings(matchers)
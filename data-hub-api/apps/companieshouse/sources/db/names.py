@@ -0,0 +1,262 @@
+import os
+import math
+import mmap
+import heapq
+import bisect
+import struct
+import threading
+from array import array
+from collections import namedtuple, defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+
+from companieshouse.models import Company
+
+
+NAME_INDEX_MAGIC = b'CHNAMES1'
+# magic, number of companies, tokens and postings, size of the companies and tokens blobs
+NAME_INDEX_HEADER = struct.Struct('=8s5Q')
+RECORD_SEPARATOR = '\x1f'
+
+CompanyRecord = namedtuple(
+    'CompanyRecord',
+    ['number', 'name', 'postcode', 'name_normalised', 'postcode_normalised']
+)
+
+
+def get_padding(size):
+    """
+    Returns the bytes needed after a section of `size` bytes so that the next one is 8 bytes aligned.
+    """
+    return b'\0' * (-size % 8)
+
+
+def contains(postings, company_id):
+    """
+    Returns True if `company_id` is in the sorted `postings`.
+    """
+    position = bisect.bisect_left(postings, company_id)
+    return position < len(postings) and postings[position] == company_id
+
+
+class CompanyNameIndex(object):
+    """
+    Inverted index of the `name_normalised` tokens of the companies in the db (token => ids of the companies
+    with that token), used to generate the matching candidates in memory.
+
+    The index is stored in a file (see the `build_name_index` command) made of flat arrays:
+        - the companies as one blob of records (number, name, postcode and normalised fields) with their offsets
+        - the sorted tokens as one blob with their offsets, looked up with a binary search
+        - the company ids of each token (postings) as one array of 32 bit ints with their offsets
+
+    `load` memory-maps the file so the OS loads only the pages actually used and shares them
+    between all the processes using the same index.
+
+    e.g.
+        CompanyNameIndex.build(path)
+        index = CompanyNameIndex.load(path)
+        for company_id in index.get_candidates('my company', max_candidates=20, max_postings=10000):
+            index.get_record(company_id)
+    """
+    def __init__(self, buffer):
+        (
+            magic, tot_companies, tot_tokens, tot_postings, companies_size, tokens_size
+        ) = NAME_INDEX_HEADER.unpack_from(buffer)
+        if magic != NAME_INDEX_MAGIC:
+            raise ValueError('Not a company name index')
+
+        self.buffer = buffer
+        self._offset = NAME_INDEX_HEADER.size
+        self.company_offsets = self._get_section(8 * (tot_companies + 1)).cast('Q')
+        self.companies = self._get_section(companies_size)
+        self.token_offsets = self._get_section(8 * (tot_tokens + 1)).cast('Q')
+        self.tokens = self._get_section(tokens_size)
+        self.posting_offsets = self._get_section(8 * (tot_tokens + 1)).cast('Q')
+        self.postings = self._get_section(4 * tot_postings).cast('I')
+
+    def _get_section(self, size):
+        section = memoryview(self.buffer)[self._offset:self._offset + size]
+        self._offset += size + len(get_padding(size))
+        return section
+
+    @classmethod
+    def write(cls, path, companies):
+        """
+        Writes the index of `companies`, iterable of (number, name, postcode, name_normalised, postcode_normalised),
+        to `path`, replacing any existing index only when complete.
+        Returns the number of companies indexed.
+        """
+        company_offsets = array('Q', [0])
+        companies_blob = bytearray()
+        postings_by_token = defaultdict(lambda: array('I'))
+
+        for company_id, company in enumerate(companies):
+            companies_blob += RECORD_SEPARATOR.join([value or '' for value in company]).encode('utf-8')
+            company_offsets.append(len(companies_blob))
+            for token in set((company[3] or '').split()):
+                postings_by_token[token.encode('utf-8')].append(company_id)
+
+        token_offsets = array('Q', [0])
+        tokens_blob = bytearray()
+        posting_offsets = array('Q', [0])
+        postings = array('I')
+        for token in sorted(postings_by_token):
+            tokens_blob += token
+            token_offsets.append(len(tokens_blob))
+            postings.extend(postings_by_token[token])
+            posting_offsets.append(len(postings))
+
+        tmp_path = '{}.tmp'.format(path)
+        with open(tmp_path, 'wb') as f:
+            f.write(
+                NAME_INDEX_HEADER.pack(
+                    NAME_INDEX_MAGIC, len(company_offsets) - 1, len(token_offsets) - 1, len(postings),
+                    len(companies_blob), len(tokens_blob)
+                )
+            )
+            for section in [company_offsets, companies_blob, token_offsets, tokens_blob, posting_offsets, postings]:
+                data = bytes(section) if isinstance(section, bytearray) else section.tobytes()
+                f.write(data)
+                f.write(get_padding(len(data)))
+        os.replace(tmp_path, path)
+
+        return len(company_offsets) - 1
+
+    @classmethod
+    def build(cls, path):
+        """
+        Writes the index of all the companies in the db to `path`, streamed using a server-side cursor.
+        Returns the number of companies indexed.
+        """
+        with transaction.atomic():
+            connection.ensure_connection()
+            with connection.connection.cursor(name='ch_name_index') as cursor:
+                cursor.itersize = 100000
+                cursor.execute(
+                    'SELECT number, name, postcode, name_normalised, postcode_normalised '
+                    'FROM {} ORDER BY number'.format(Company._meta.db_table)
+                )
+                return cls.write(path, cursor)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Returns the index in `path` memory-mapped read-only.
+        """
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self):
+        return len(self.company_offsets) - 1
+
+    def get_record(self, company_id):
+        """
+        Returns the CompanyRecord of the company with id `company_id`.
+        """
+        record = self.companies[self.company_offsets[company_id]:self.company_offsets[company_id + 1]]
+        return CompanyRecord(*bytes(record).decode('utf-8').split(RECORD_SEPARATOR))
+
+    def _find_token(self, token):
+        """
+        Returns the position of the utf-8 encoded `token` in the sorted tokens or None if not indexed.
+        """
+        low, high = 0, len(self.token_offsets) - 1
+        while low < high:
+            middle = (low + high) // 2
+            middle_token = bytes(self.tokens[self.token_offsets[middle]:self.token_offsets[middle + 1]])
+            if middle_token < token:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < len(self.token_offsets) - 1 and \
+                self.tokens[self.token_offsets[low]:self.token_offsets[low + 1]] == token:
+            return low
+        return None
+
+    def get_postings(self, token):
+        """
+        Returns the ids of the companies with `token` in their normalised name.
+        """
+        position = self._find_token(token.encode('utf-8'))
+        if position is None:
+            return self.postings[0:0]
+        return self.postings[self.posting_offsets[position]:self.posting_offsets[position + 1]]
+
+    def get_candidates(self, name_normalised, max_candidates, max_postings):
+        """
+        Returns the ids of up to `max_candidates` companies sharing the most tokens with `name_normalised`,
+        each token weighted by how rare it is (IDF).
+
+        Tokens found in more than `max_postings` companies are only used if the name has no rarer ones
+        and then only a sample of `max_postings` companies is considered (see `_get_common_candidates`)
+        so that the time spent per name is bounded regardless of how common its tokens are.
+        """
+        all_postings = [self.get_postings(token) for token in set(name_normalised.split())]
+        all_postings = [postings for postings in all_postings if len(postings)]
+        if not all_postings:
+            return []
+
+        selected_postings = [postings for postings in all_postings if len(postings) <= max_postings]
+        if not selected_postings:
+            return self._get_common_candidates(all_postings, max_candidates, max_postings)
+
+        scores = defaultdict(float)
+        for postings in selected_postings:
+            weight = self._get_weight(postings)
+            for company_id in postings:
+                scores[company_id] += weight
+
+        return heapq.nlargest(max_candidates, scores, key=scores.__getitem__)
+
+    def _get_weight(self, postings):
+        return math.log((len(self) + 1) / (len(postings) + 1)) + 1
+
+    def _get_common_candidates(self, all_postings, max_candidates, max_postings):
+        """
+        Like `get_candidates` when all the `all_postings` are longer than `max_postings`.
+
+        Only `max_postings` companies evenly spread over the rarest token postings are scored, each looked up
+        in the other postings with a binary search, so the work is capped at
+        `max_postings` * (number of tokens - 1) lookups however many companies have those tokens.
+        """
+        rarest_postings, *other_postings = sorted(all_postings, key=len)
+        step = math.ceil(len(rarest_postings) / max(max_postings, 1))
+        sample = rarest_postings[::step]
+
+        weights = [self._get_weight(postings) for postings in other_postings]
+        scores = {
+            company_id: sum(
+                weight for postings, weight in zip(other_postings, weights) if contains(postings, company_id)
+            )
+            for company_id in sample
+        }
+        return heapq.nlargest(max_candidates, sample, key=scores.__getitem__)
+
+
+_name_indexes = {}
+_name_indexes_lock = threading.Lock()
+
+
+def get_name_index(path=None):
+    """
+    Returns the CompanyNameIndex in `path` (defaults to NAME_INDEX_PATH), loaded the first time it's needed
+    and then kept for the lifetime of the process.
+    Processes need to be restarted to pick up a rebuilt index.
+    """
+    path = path or settings.NAME_INDEX_PATH
+    if not path:
+        raise ImproperlyConfigured(
+            'NAME_INDEX_PATH not set, set the DJANGO__NAME_INDEX_PATH env var to the file of the company name index'
+        )
+
+    with _name_indexes_lock:
+        if path not in _name_indexes:
+            if not os.path.exists(path):
+                raise ImproperlyConfigured(
+                    'Company name index {} not found, build it with `./manage.py build_name_index`'.format(path)
+                )
+            _name_indexes[path] = CompanyNameIndex.load(path)
+        return _name_indexes[path]
@@ -0,0 +1,195 @@
+import io
+import os
+import csv
+import sys
+import zipfile
+import tempfile
+
+
+CSV_ENCODING = 'utf-8'
+STDIN = '-'
+
+
+class FileChunk(object):
+    """
+    Byte range [start, end) of a csv file, aligned to record boundaries so that
+    different chunks of the same file can be read and imported independently (e.g. by different processes).
+
+    While reading, `offset` is the byte offset right after the last row read so that
+    the import can be resumed from there.
+
+    NOTE: this assumes that records don't span multiple lines, which is the case
+    with the CH csv files.
+    """
+    def __init__(self, path, start, end):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.offset = start
+
+    def __repr__(self):
+        return '{}[{}:{}]'.format(self.path, self.start, self.end)
+
+    def __eq__(self, other):
+        return (self.path, self.start, self.end) == (other.path, other.start, other.end)
+
+    def __len__(self):
+        return self.end - self.start
+
+    @property
+    def key(self):
+        """
+        Identifies the chunk across runs.
+        """
+        return '{}:{}'.format(self.path, self.start)
+
+    def read_lines(self, offset=None):
+        self.offset = self.start if offset is None else offset
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            while self.offset < self.end:
+                line = f.readline()
+                if not line:
+                    break
+                self.offset += len(line)
+                yield line.decode(CSV_ENCODING)
+
+    def read_rows(self, offset=None):
+        """
+        Yields the csv rows (lists of values) in the chunk, starting from the byte `offset` if specified.
+        """
+        return csv.reader(self.read_lines(offset))
+
+    def discard(self):
+        """
+        Called once the chunk has been imported, nothing to clean up for the chunks of csv files.
+        """
+        pass
+
+
+def split_file(path, chunk_size, skip_header=True):
+    """
+    Returns the list of FileChunks of about `chunk_size` bytes each that make up the csv file `path`.
+    Each chunk ends at the end of a line so no record is split between two chunks.
+    """
+    size = os.path.getsize(path)
+    chunks = []
+    with open(path, 'rb') as f:
+        start = len(f.readline()) if skip_header else 0
+        while start < size:
+            f.seek(max(start, start + chunk_size - 1))
+            f.readline()  # move to the end of the current line
+            end = min(f.tell(), size)
+
+            chunks.append(FileChunk(path, start, end))
+            start = end
+    return chunks
+
+
+class StreamChunk(FileChunk):
+    """
+    Consecutive lines read from a stream which can't be split by byte ranges (e.g. a csv member
+    of a zip file or stdin), spooled to a temporary file by `split_stream` so that only the path of the file
+    has to be sent to the process importing the chunk and the lines don't need to be kept in memory.
+    `line` is the index of the first line in the stream (excluding the header) and `tot_lines`
+    the number of lines in the chunk.
+
+    It's read like a FileChunk of the whole spooled file (`offset` is a byte offset in it)
+    and the file gets deleted by `discard`.
+    """
+    def __init__(self, source, line, tot_lines, path, size):
+        super(StreamChunk, self).__init__(path, 0, size)
+        self.source = source
+        self.line = line
+        self.tot_lines = tot_lines
+
+    def __repr__(self):
+        return '{}[rows {}:{}]'.format(self.source, self.line, self.line + self.tot_lines)
+
+    @property
+    def key(self):
+        """
+        Identifies the chunk across runs.
+        """
+        return '{}:{}'.format(self.source, self.line)
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def split_stream(source, stream, chunk_size, spool_dir=None, skip_header=True):
+    """
+    Yields the StreamChunks of about `chunk_size` bytes each read incrementally from the text `stream`
+    and spooled to temporary files in `spool_dir` (the default temp dir if None) so that the whole content
+    never needs to be in memory.
+
+    The chunks yielded should be discarded once imported.
+    """
+    if skip_header:
+        next(stream, None)
+
+    line = tot_lines = 0
+    spool = None
+    try:
+        for text in stream:
+            if spool is None:
+                spool = tempfile.NamedTemporaryFile(
+                    mode='wb', prefix='chunk-', suffix='.csv', dir=spool_dir, delete=False
+                )
+            spool.write(text.encode(CSV_ENCODING))
+            tot_lines += 1
+
+            size = spool.tell()
+            if size >= chunk_size:
+                spool.close()
+                chunk, spool = StreamChunk(source, line, tot_lines, spool.name, size), None
+                yield chunk
+                line += tot_lines
+                tot_lines = 0
+
+        if spool is not None:
+            size = spool.tell()
+            spool.close()
+            chunk, spool = StreamChunk(source, line, tot_lines, spool.name, size), None
+            yield chunk
+    finally:
+        if spool is not None:  # stream failed in the middle of a chunk
+            spool.close()
+            os.remove(spool.name)
+
+
+def open_zip(path):
+    """
+    Yields the tuples (source name, text stream) of the csv members of the zip file `path`.
+    The members are decompressed and decoded incrementally while being read, without being extracted.
+    """
+    with zipfile.ZipFile(path) as zip_file:
+        for info in zip_file.infolist():
+            if not info.filename.lower().endswith('.csv'):
+                continue
+
+            with zip_file.open(info) as member:
+                yield (
+                    '{}/{}'.format(path, info.filename),
+                    io.TextIOWrapper(member, encoding=CSV_ENCODING, newline='')
+                )
+
+
+def get_chunks(path, chunk_size, spool_dir=None):
+    """
+    Yields the chunks of about `chunk_size` bytes of the csv data in `path` which can be:
+        - a csv file => split into FileChunks by byte ranges
+        - a zip file => each csv member streamed and split into StreamChunks spooled to `spool_dir`
+        - STDIN => csv data streamed from stdin and split into StreamChunks spooled to `spool_dir`
+    """
+    if path == STDIN:
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding=CSV_ENCODING, newline='')
+        yield from split_stream('<stdin>', stream, chunk_size, spool_dir=spool_dir)
+    elif zipfile.is_zipfile(path):
+        for source, stream in open_zip(path):
+            yield from split_stream(source, stream, chunk_size, spool_dir=spool_dir)
+    else:
+        yield from split_file(path, chunk_size)
@@ -4,6 +4,9 @@ from django.conf import settings
 
 from requests.auth import AuthBase
 
+from ..cache import CachedResource
+from ..ratelimit import RateLimiter, ThrottledSession
+
 
 DUEDIL_BASE_URL = "http://api.duedil.com/open/"
 
@@ -22,8 +25,15 @@ class DueDilApikeyAuth(AuthBase):
         return r
 
 
-api = slumber.API(
+session = ThrottledSession(
+    RateLimiter(settings.DUEDIL_API_RATE_LIMIT, processes=settings.API_RATE_LIMIT_PROCESSES),
+    max_retries=settings.API_MAX_RETRIES,
+    backoff=settings.API_RETRY_BACKOFF
+)
+
+api = CachedResource(slumber.API(
     DUEDIL_BASE_URL,
     auth=DueDilApikeyAuth(settings.DUEDIL_TOKEN),
-    append_slash=False
-)
+    append_slash=False,
+    session=session
+), 'duedil')
@@ -1,5 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from slumber.exceptions import HttpNotFoundError
 
+from django.conf import settings
+from django.db import connections
+
+from companieshouse.models import Company
+
 from ..api import api as companieshouse_api
 
 from ..matcher import BaseMatcher, FindingResult
@@ -11,13 +18,16 @@ class DueDilMatcher(BaseMatcher):
     DueDil API Matcher which uses the DueDil API to find the best match.
 
     As the free Duedil account only returns company name and number, the algorithm
-    uses the Companies House dataset to get the full record.
+    uses the Companies House dataset to get the full record: the companies already in the db
+    are fetched with one query and only the missing ones are requested from the CH API,
+    concurrently by up to `MATCHER_MAX_CONCURRENT_REQUESTS` threads.
 
     e.g.
         matcher = DueDilMatcher(name, postcode)
         best_match = matcher.find()  # returns the best match, an instance of FindingResult
         matcher.findings  # if you want the full list considered internally for debug purposes
     """
+    CONCURRENT = True
 
     def _get_ch_record(self, company_number):
         """
@@ -29,6 +39,30 @@ class DueDilMatcher(BaseMatcher):
             pass
         return None
 
+    def _get_ch_record_in_thread(self, company_number):
+        try:
+            return self._get_ch_record(company_number)
+        finally:
+            # db connections are per thread so close the ones opened by this task (e.g. by the api cache)
+            connections.close_all()
+
+    def _get_ch_records(self, company_numbers):
+        """
+        Returns the dict {company number: CH record or None} of the companies with numbers in `company_numbers`.
+        """
+        ch_records = dict(
+            Company.objects.filter(number__in=company_numbers).values_list('number', 'raw')
+        )
+
+        missing_numbers = [number for number in set(company_numbers) if number not in ch_records]
+        if missing_numbers:
+            max_workers = min(len(missing_numbers), settings.MATCHER_MAX_CONCURRENT_REQUESTS)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                ch_records.update(
+                    zip(missing_numbers, executor.map(self._get_ch_record_in_thread, missing_numbers))
+                )
+        return ch_records
+
     def _to_ch_raw(self, dd_record):
         """
         Translates DueDil json record into a CompaniesHouse-like json record so that we have a unified format.
@@ -48,20 +82,26 @@ class DueDilMatcher(BaseMatcher):
                 return
             raise e  # otherwise it's a different problem...
 
-        for dd_result in dd_results:
+        ch_records = self._get_ch_records([dd_result['company_number'] for dd_result in dd_results])
+
+        ch_postcodes = [
+            self._get_ch_postcode(ch_records[dd_result['company_number']] or {}) for dd_result in dd_results
+        ]
+        proximities = self._get_similarity_proximities(
+            [(dd_result['name'], ch_postcode) for dd_result, ch_postcode in zip(dd_results, ch_postcodes)]
+        )
+
+        for dd_result, ch_postcode, proximity in zip(dd_results, ch_postcodes, proximities):
             dd_name = dd_result['name']
             company_number = dd_result['company_number']
 
-            ch_result = self._get_ch_record(company_number)
-            ch_postcode = self._get_ch_postcode(ch_result or {})
-
-            proximity = self._get_similarity_proximity(dd_name, ch_postcode)
+            ch_result = ch_records[company_number]
             raw = ch_result or self._to_ch_raw(dd_result)
 
             self.findings.append(
                 FindingResult(
                     name=dd_name, postcode=ch_postcode,
-                    proximity=proximity, company_number=company_number,
+                    proximity=float(proximity), company_number=company_number,
                     raw=raw
                 )
             )
@@ -1,10 +1,12 @@
 from django.utils.module_loading import import_string
 from django.utils.functional import cached_property
 from django.conf import settings
+from django.db import connections
 
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
-from .similarity import SimilarityCalculator
+from .similarity import BatchSimilarityCalculator
 
 
 FindingResult = namedtuple(
@@ -21,18 +23,31 @@ class BaseMatcher(object):
         matcher = MyMatcher(name, postcode)
         best_match = matcher.find()  # returns the best match, an instance of FindingResult
         matcher.findings  # if you want the full list considered internally for debug purposes
+
+    To match many (name, postcode) pairs at once:
+        best_matches = MyMatcher.find_many(pairs)
     """
+    # if True, `find_many` runs the matchers concurrently (e.g. when they wait on external APIs)
+    CONCURRENT = False
+
     def __init__(self, name, postcode):
         super(BaseMatcher, self).__init__()
         self.name = name
         self.postcode = postcode
         self.findings = None
 
+    @cached_property
+    def similarity_calculator(self):
+        return BatchSimilarityCalculator(self.name, self.postcode)
+
     def _get_similarity_proximity(self, other_name, other_postcode):
-        similarity_calc = SimilarityCalculator()
-        similarity_calc.analyse_names(self.name, other_name)
-        similarity_calc.analyse_postcodes(self.postcode, other_postcode)
-        return similarity_calc.get_proximity()
+        return self.similarity_calculator.get_proximity(other_name, other_postcode)
+
+    def _get_similarity_proximities(self, candidates, normalised=False):
+        """
+        Returns the proximities of all the (name, postcode) `candidates` computed in one pass.
+        """
+        return self.similarity_calculator.get_proximities(candidates, normalised=normalised)
 
     def _choose_best_finding(self):
         assert self.findings is not None
@@ -61,6 +76,29 @@ class BaseMatcher(object):
         self._build_findings()
         return self._choose_best_finding()
 
+    @classmethod
+    def find_many(cls, pairs):
+        """
+        Returns the list of best matches (see `find`) of the (name, postcode) `pairs`, in the same order.
+
+        The pairs are matched one by one or, if CONCURRENT, by up to `MATCHER_MAX_CONCURRENT_REQUESTS` threads.
+        Subclasses can override it to match all the pairs together in a more efficient way.
+        """
+        def find(pair):
+            return cls(*pair).find()
+
+        def find_in_thread(pair):
+            try:
+                return find(pair)
+            finally:
+                # db connections are per thread so close the ones opened by this task
+                connections.close_all()
+
+        if cls.CONCURRENT and len(pairs) > 1:
+            with ThreadPoolExecutor(max_workers=settings.MATCHER_MAX_CONCURRENT_REQUESTS) as executor:
+                return list(executor.map(find_in_thread, pairs))
+        return [find(pair) for pair in pairs]
+
 
 class MatcherHelper(object):
     """
@@ -73,7 +111,60 @@ class MatcherHelper(object):
             _matcher_classes.append(import_string(matcher_path))
         return _matcher_classes
 
-    def find_match(self, company_name, company_postcode):
+    @cached_property
+    def executor(self):
+        """
+        Thread pool used by the concurrent mode of `find_match`, shared between calls.
+        """
+        return ThreadPoolExecutor(max_workers=settings.MATCHER_MAX_CONCURRENT_REQUESTS)
+
+    def _find_acceptable_match(self, matcher_class, company_name, company_postcode):
+        matcher = matcher_class(company_name, company_postcode)
+        best_match = matcher.find()
+        if best_match and best_match.proximity >= settings.MATCHER_ACCEPTANCE_PROXIMITY:
+            return best_match
+        return None
+
+    def _find_acceptable_match_in_thread(self, *args):
+        try:
+            return self._find_acceptable_match(*args)
+        finally:
+            # db connections are per thread so close the ones opened by this task
+            connections.close_all()
+
+    def _find_match_concurrently(self, company_name, company_postcode):
+        """
+        Runs the first matcher class in the current thread and the others in the thread pool at the same time,
+        then checks the results in MATCHER_CLASSES order returning the first acceptable one as soon as
+        all the previous matchers have finished without one. The matchers not started yet are cancelled and
+        the ones still running are not waited for.
+
+        Note that `Future.cancel` can't stop a matcher which is already running: it keeps its pool thread
+        (and its api requests) going until it finishes and its result is then discarded.
+        """
+        first_matcher_class, *other_matcher_classes = self.matcher_classes
+        futures = [
+            self.executor.submit(
+                self._find_acceptable_match_in_thread, matcher_class, company_name, company_postcode
+            )
+            for matcher_class in other_matcher_classes
+        ]
+
+        try:
+            best_match = self._find_acceptable_match(first_matcher_class, company_name, company_postcode)
+            if best_match:
+                return best_match
+
+            for future in futures:
+                best_match = future.result()
+                if best_match:
+                    return best_match
+            return None
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def find_match(self, company_name, company_postcode, concurrent=None):
         """
         Returns the first match (not the best one as that can be time/computational expensive) if found or None
         otherwise. The match is of type `FindingResult`.
@@ -81,12 +172,62 @@ class MatcherHelper(object):
         It goes through the list of MATCHER_CLASSES in order and uses the matcher classes one by one
         until one acceptable match is found.
 
+        If `concurrent` is True (defaults to the settings `MATCHER_CONCURRENT`), all the matcher classes
+        are used at the same time so that the latencies of the ones missing don't add up;
+        the match returned is the same as in the sequential mode.
+
         The acceptance level can be set using the settings `MATCHER_ACCEPTANCE_PROXIMITY`.
         """
+        if concurrent is None:
+            concurrent = settings.MATCHER_CONCURRENT
+
+        if concurrent and len(self.matcher_classes) > 1:
+            return self._find_match_concurrently(company_name, company_postcode)
+
         for matcher_class in self.matcher_classes:
-            matcher = matcher_class(company_name, company_postcode)
-            best_match = matcher.find()
-            if best_match and best_match.proximity >= settings.MATCHER_ACCEPTANCE_PROXIMITY:
+            best_match = self._find_acceptable_match(matcher_class, company_name, company_postcode)
+            if best_match:
                 return best_match
         return None
+
+    def _find_matches_batch(self, pairs):
+        """
+        Returns the list of matches (see `find_match`) of the (name, postcode) `pairs`, in the same order.
+        Each matcher class only gets the pairs not matched by the previous ones.
+        """
+        matches = [None] * len(pairs)
+        pending = list(range(len(pairs)))
+        for matcher_class in self.matcher_classes:
+            if not pending:
+                break
+
+            best_matches = matcher_class.find_many([pairs[index] for index in pending])
+
+            not_matched = []
+            for index, best_match in zip(pending, best_matches):
+                if best_match and best_match.proximity >= settings.MATCHER_ACCEPTANCE_PROXIMITY:
+                    matches[index] = best_match
+                else:
+                    not_matched.append(index)
+            pending = not_matched
+        return matches
+
+    def find_matches(self, pairs):
+        """
+        Like `find_match` but for an iterable of (company name, company postcode) `pairs`.
+        Yields the match (or None) of each pair in the same order as `pairs`.
+
+        The pairs are matched in batches of `MATCHER_BATCH_SIZE` so that the matchers can process
+        them together (e.g. with one db query or concurrent api requests) and the results can be
+        consumed while the rest of `pairs` is still being processed.
+        """
+        batch = []
+        for pair in pairs:
+            batch.append(pair)
+            if len(batch) >= settings.MATCHER_BATCH_SIZE:
+                yield from self._find_matches_batch(batch)
+                batch = []
+
+        if batch:
+            yield from self._find_matches_batch(batch)
 matcher_helper = MatcherHelper()
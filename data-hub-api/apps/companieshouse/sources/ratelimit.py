@@ -0,0 +1,112 @@
+import time
+import threading
+from collections import Counter
+
+import requests
+
+
+class RateLimiter(object):
+    """
+    Thread-safe token bucket allowing on average `rate` calls per second with bursts of up to `burst` calls.
+    Used to keep the concurrent requests to external APIs within their quotas.
+
+    The bucket lives in the process memory so it only limits the threads of the current process:
+    if `processes` (e.g. web workers) share the same quota, each one gets `rate / processes`.
+
+    e.g.
+        limiter = RateLimiter(2)
+        limiter.wait()  # blocks until the next call is allowed
+        api.search.get(...)
+    """
+    def __init__(self, rate, burst=1, processes=1):
+        """
+        `rate` == None means no limit.
+        """
+        self.rate = rate / processes if rate else rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Takes a token and returns the seconds the caller has to wait before it can make its call.
+        Tokens are taken in order so concurrent callers get consecutive slots.
+        """
+        if not self.rate:
+            return 0
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0
+
+    def wait(self):
+        """
+        Blocks until the next call is allowed, returns the seconds waited.
+        """
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+class ThrottledSession(requests.Session):
+    """
+    requests Session (to be passed to slumber.API) which keeps the requests within the provider's quota
+    using `rate_limiter` and retries the ones failing because of throttling (429) or server errors (5xx)
+    with exponential backoff (honouring the Retry-After header if present).
+
+    It can be shared between threads; the time spent waiting is tracked in `stats`.
+
+    e.g.
+        session = ThrottledSession(RateLimiter(2), max_retries=3, backoff=1)
+        api = slumber.API(base_url, session=session)
+        ...
+        session.stats  # {'requests': ..., 'retries': ..., 'throttled_seconds': ..., 'backoff_seconds': ...}
+    """
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(self, rate_limiter, max_retries=3, backoff=1):
+        super(ThrottledSession, self).__init__()
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self._stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _add_stats(self, **values):
+        with self._stats_lock:
+            self._stats.update(values)
+
+    def get_retry_delay(self, response, attempt):
+        """
+        Returns the seconds to wait before retrying after `response` (the `attempt`-th, starting from 0).
+        """
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return int(retry_after)
+        return self.backoff * 2 ** attempt
+
+    def request(self, method, url, *args, **kwargs):
+        attempt = 0
+        while True:
+            throttled = self.rate_limiter.wait()
+            response = super(ThrottledSession, self).request(method, url, *args, **kwargs)
+            self._add_stats(requests=1, throttled_seconds=throttled)
+
+            if response.status_code not in self.RETRY_STATUS_CODES or attempt >= self.max_retries:
+                return response
+
+            delay = self.get_retry_delay(response, attempt)
+            self._add_stats(retries=1, backoff_seconds=delay)
+            time.sleep(delay)
+            attempt += 1
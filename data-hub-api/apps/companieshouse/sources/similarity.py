@@ -1,4 +1,9 @@
 import re
+import math
+import threading
+from array import array
+
+from django.conf import settings
 
 EXCLUDE_NAME_PARTS = re.compile(r"(?i)\bltd\b|\blimited\b|\binc\b|\bllc\b|\bthe\b|\.")
 
@@ -12,6 +17,18 @@ def clean_postcode(postcode):
     return postcode.lower().replace(' ', '').strip()
 
 
+def get_postcode_district(postcode):
+    """
+    Returns the outward code (district, e.g. 'sw1a' for 'SW1A 1AA') of `postcode` in the same format as
+    `clean_postcode` or '' if `postcode` doesn't look like a full UK postcode.
+    The inward code is always 3 characters long so the district is whatever precedes it.
+    """
+    cleaned_postcode = clean_postcode(postcode) or ''
+    if not 5 <= len(cleaned_postcode) <= 7:
+        return ''
+    return cleaned_postcode[:-3]
+
+
 def clean_name(name):
     """
     Returns `name` lowercase without common parts and extra spaces so that it can be used for comparisons.
@@ -24,6 +41,106 @@ def clean_name(name):
     return ' '.join(cleaned_name.split())  # remove unnecessary spaces
 
 
+def get_normalised_values(name, postcode):
+    """
+    Returns the dict of the normalised Company fields derived from `name` and `postcode`.
+    It's the only place defining them so that saving, bulk loading and migrating companies stay consistent.
+    """
+    return {
+        'name_normalised': clean_name(name) or '',
+        'postcode_normalised': clean_postcode(postcode) or '',
+        'postcode_district': get_postcode_district(postcode),
+    }
+
+
+class NameTokenWeights(object):
+    """
+    IDF weights of the name tokens, used to grade the similarity between names: tokens found in many company
+    names (e.g. 'services', 'uk') weigh less than distinctive ones.
+
+    The frequencies come from the NameToken stats (see the `update_name_tokens` command) and are loaded
+    lazily the first time they are needed, so each comparison only costs a dict lookup per token.
+    Tokens without stats are considered rare (found in just 1 company).
+    If NAME_TOKEN_WEIGHTS == False or the stats are empty, all tokens weigh the same.
+
+    e.g.
+        weights = NameTokenWeights()
+        weights.get_proximity({'acme', 'services'}, {'acme', 'trading'})
+    """
+    def __init__(self, frequencies=None, total=None):
+        self.frequencies = frequencies
+        self.total = total
+        self.lock = threading.Lock()
+
+    def load(self):
+        from companieshouse.models import Company, NameToken
+
+        with self.lock:
+            if self.frequencies is not None:
+                return
+
+            if settings.NAME_TOKEN_WEIGHTS:
+                frequencies = dict(NameToken.objects.values_list('token', 'frequency'))
+                self.total = Company.objects.count() if frequencies else 0
+            else:
+                frequencies = {}
+                self.total = 0
+            self.frequencies = frequencies
+
+    def get_weight(self, token):
+        if self.frequencies is None:
+            self.load()
+
+        frequency = self.frequencies.get(token, 1)
+        return math.log((self.total + 1) / (frequency + 1)) + 1
+
+    def get_weights(self, tokens):
+        return {token: self.get_weight(token) for token in tokens}
+
+    def get_proximity(self, tokens1, tokens2, weights1=None):
+        """
+        Returns the weighted Jaccard similarity (between 0 and 1) of the sets `tokens1` and `tokens2`.
+        `weights1` can be passed if the weights of `tokens1` have already been calculated.
+        """
+        if weights1 is None:
+            weights1 = self.get_weights(tokens1)
+
+        intersection = 0
+        tot_weights2 = 0
+        for token in tokens2:
+            if token in weights1:
+                weight = weights1[token]
+                intersection += weight
+            else:
+                weight = self.get_weight(token)
+            tot_weights2 += weight
+
+        union = sum(weights1.values()) + tot_weights2 - intersection
+        if not union:
+            return 0
+        return intersection / union
+
+
+name_token_weights = NameTokenWeights()
+
+# min proximity of 2 different names sharing at least one token
+PARTIAL_NAME_MIN_PROXIMITY = 0.5
+
+
+def scale_partial_name_proximity(token_proximity):
+    """
+    Maps the token similarity (see NameTokenWeights.get_proximity) of 2 different names to
+    [PARTIAL_NAME_MIN_PROXIMITY, 1] if they share at least one token or 0 otherwise.
+
+    Before the names were graded, sharing any token scored 0.5, so this keeps the meaning of
+    MATCHER_ACCEPTANCE_PROXIMITY: the names accepted before still are and the grading only
+    ranks them between each other.
+    """
+    if not token_proximity:
+        return 0
+    return PARTIAL_NAME_MIN_PROXIMITY + (1 - PARTIAL_NAME_MIN_PROXIMITY) * token_proximity
+
+
 class SimilarityCalculator(object):
     """
     Used to calculate the similarity proximity between 2 records.
@@ -53,8 +170,9 @@ class SimilarityCalculator(object):
     POSTCODE_WEIGHT = 0.9
     POSTCODE_STEP_NAME = 'postcode'
 
-    def __init__(self):
+    def __init__(self, token_weights=None):
         self.data = {}
+        self.token_weights = token_weights or name_token_weights
 
     def analyse(self, what, weight, part1, part2, func):
         """
@@ -104,8 +222,8 @@ class SimilarityCalculator(object):
 
     def _get_names_proximity(self, name1, name2):
         """
-        Quite basic comparison function returning 1 if the names are exactly the same and 0.5 if they are somewhat
-        similar. Could be improved but not needed atm so we're trying to keep things simple.
+        Returns 1 if the names are exactly the same or the similarity of their tokens weighted by
+        how distinctive they are otherwise (see NameTokenWeights and `scale_partial_name_proximity`).
         """
         cleaned_name1 = clean_name(name1)
         cleaned_name2 = clean_name(name2)
@@ -113,11 +231,11 @@ class SimilarityCalculator(object):
         if cleaned_name1 == cleaned_name2:
             return 1
 
-        # if at least one of the parts between the 2 strings are the same...
-        if set(cleaned_name1.split()).intersection(set(cleaned_name2.split())):
-            return 0.5
-
-        return 0
+        return scale_partial_name_proximity(
+            self.token_weights.get_proximity(
+                set((cleaned_name1 or '').split()), set((cleaned_name2 or '').split())
+            )
+        )
 
     def _get_postcode_proximity(self, postcode1, postcode2):
         """
@@ -134,3 +252,80 @@ class SimilarityCalculator(object):
             return 0.5
 
         return 0
+
+
+class BatchSimilarityCalculator(object):
+    """
+    Calculates the same proximity as SimilarityCalculator (names and postcodes only) between one record
+    and many candidates in one pass: the record is cleaned and tokenised once and each candidate once,
+    without building the intermediate steps data.
+
+    The scores are returned as an array('d') of the same length as the candidates.
+
+    e.g.
+
+        calc = BatchSimilarityCalculator(name, postcode)
+        proximities = calc.get_proximities([(name1, postcode1), (name2, postcode2)])
+
+    If the candidates come from `Company.name_normalised` and `Company.postcode_normalised`,
+    pass `normalised=True` to skip the cleaning.
+    """
+    NAME_WEIGHT = SimilarityCalculator.NAME_WEIGHT
+    POSTCODE_WEIGHT = SimilarityCalculator.POSTCODE_WEIGHT
+
+    def __init__(self, name, postcode, token_weights=None):
+        self.name = clean_name(name) or ''
+        self.name_tokens = frozenset(self.name.split())
+        self.postcode = clean_postcode(postcode) or ''
+        self.token_weights = token_weights or name_token_weights
+        self._name_token_weights = None
+
+    def _get_name_proximity(self, name):
+        if name == self.name:
+            return 1
+        if self._name_token_weights is None:
+            self._name_token_weights = self.token_weights.get_weights(self.name_tokens)
+        return scale_partial_name_proximity(
+            self.token_weights.get_proximity(
+                self.name_tokens, set(name.split()), weights1=self._name_token_weights
+            )
+        )
+
+    def _get_postcode_proximity(self, postcode):
+        if not self.postcode:
+            return 0
+        if postcode == self.postcode:
+            return 1
+        if postcode[:3] == self.postcode[:3]:
+            return 0.5
+        return 0
+
+    def get_proximities(self, candidates, normalised=False):
+        """
+        Returns the proximities of the (name, postcode) `candidates`, in the same order.
+        """
+        if normalised:
+            candidates = [(name or '', postcode or '') for name, postcode in candidates]
+        else:
+            candidates = [
+                (clean_name(name) or '', clean_postcode(postcode) or '') for name, postcode in candidates
+            ]
+
+        tot_weights = self.NAME_WEIGHT + self.POSTCODE_WEIGHT
+        name_booster = self.NAME_WEIGHT / tot_weights
+        postcode_booster = self.POSTCODE_WEIGHT / tot_weights
+
+        return array('d', (
+            round(
+                self._get_name_proximity(name) * name_booster +
+                self._get_postcode_proximity(postcode) * postcode_booster,
+                2
+            )
+            for name, postcode in candidates
+        ))
+
+    def get_proximity(self, name, postcode, normalised=False):
+        """
+        Returns the proximity of one candidate.
+        """
+        return float(self.get_proximities([(name, postcode)], normalised=normalised)[0])
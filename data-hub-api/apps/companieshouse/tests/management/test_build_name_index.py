@@ -0,0 +1,35 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test.testcases import TestCase
+
+from companieshouse.models import Company
+from companieshouse.sources.db.names import CompanyNameIndex
+
+
+class BuildNameIndexTestCase(TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_build(self):
+        Company.objects.create(number='001', name='My Company Ltd', raw={})
+        Company.objects.create(number='002', name='Other Company', raw={})
+
+        out = StringIO()
+        call_command('build_name_index', path=self.path, stdout=out)
+
+        index = CompanyNameIndex.load(self.path)
+        self.assertEqual(len(index), 2)
+        self.assertEqual(list(index.get_postings('company')), [0, 1])
+        self.assertIn('Indexed 2 companies', out.getvalue())
+
+    def test_path_not_set(self):
+        with self.assertRaises(CommandError):
+            call_command('build_name_index', path='', stdout=StringIO())
@@ -0,0 +1,211 @@
+import os
+import csv
+import zipfile
+import tempfile
+from io import StringIO
+from unittest import mock
+from multiprocessing.pool import ThreadPool
+
+from django.core.management import call_command
+from django.test.testcases import TestCase, TransactionTestCase
+
+from companieshouse.management.commands.import_csv import ChunkImporter, Command, init_worker
+from companieshouse.models import Company, ImportRun, ImportCheckpoint
+from companieshouse.sources.db.hashes import RowHashIndex, get_row_hash
+from companieshouse.sources.db.readers import split_file
+from companieshouse.tests.sources.db.test_importers import FULL_DATA, MINIMAL_DATA
+
+
+class ChunkImporterTestCase(TestCase):
+    def setUp(self):
+        self.rows = []
+        for index, data in enumerate([FULL_DATA, MINIMAL_DATA, FULL_DATA]):
+            row = list(data)
+            row[1] = '{:08}'.format(index)
+            self.rows.append(row)
+
+        fd, self.path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(['header'] * len(FULL_DATA))
+            writer.writerows(self.rows)
+
+        self.run_obj = ImportRun.objects.create(paths=[self.path], chunk_size=1024 * 1024)
+        self.chunk, = split_file(self.path, self.run_obj.chunk_size)
+        init_worker(RowHashIndex())
+
+    def tearDown(self):
+        os.remove(self.path)
+        init_worker(RowHashIndex())
+
+    def test_import(self):
+        result = ChunkImporter(self.chunk, self.run_obj.id).run()
+
+        self.assertEqual(result, (3, 0, 0))
+        self.assertEqual(
+            sorted(Company.objects.values_list('number', flat=True)),
+            ['00000000', '00000001', '00000002']
+        )
+
+        checkpoint = ImportCheckpoint.objects.get(run=self.run_obj)
+        self.assertEqual(checkpoint.chunk, self.chunk.key)
+        self.assertTrue(checkpoint.completed)
+        self.assertEqual(checkpoint.offset, self.chunk.end)
+        self.assertEqual(checkpoint.rows_imported, 3)
+
+    @mock.patch('companieshouse.management.commands.import_csv.BATCH_SIZE', 2)
+    def test_checkpoint_after_each_batch(self):
+        importer = ChunkImporter(self.chunk, self.run_obj.id)
+        saved_offsets = []
+        original_flush = importer.flush
+
+        def flush(*args, **kwargs):
+            original_flush(*args, **kwargs)
+            saved_offsets.append(ImportCheckpoint.objects.get(run=self.run_obj).offset)
+        importer.flush = flush
+
+        importer.run()
+
+        self.assertEqual(len(saved_offsets), 2)
+        self.assertTrue(self.chunk.start < saved_offsets[0] < self.chunk.end)
+        self.assertEqual(saved_offsets[1], self.chunk.end)
+
+    def test_resume(self):
+        """
+        If the chunk was partially imported, the import restarts from the checkpoint.
+        """
+        with open(self.path, 'rb') as f:
+            f.seek(self.chunk.start)
+            f.readline()
+            offset = f.tell()
+        ImportCheckpoint.objects.create(
+            run=self.run_obj, chunk=self.chunk.key, offset=offset, rows_imported=1
+        )
+
+        result = ChunkImporter(self.chunk, self.run_obj.id).run()
+
+        self.assertEqual(result, (2, 0, 0))
+        self.assertEqual(
+            sorted(Company.objects.values_list('number', flat=True)),
+            ['00000001', '00000002']
+        )
+        self.assertEqual(ImportCheckpoint.objects.get(run=self.run_obj).rows_imported, 3)
+
+    def test_completed(self):
+        ImportCheckpoint.objects.create(
+            run=self.run_obj, chunk=self.chunk.key, offset=self.chunk.end, completed=True
+        )
+
+        self.assertEqual(ChunkImporter(self.chunk, self.run_obj.id).run(), (0, 0, 0))
+        self.assertEqual(Company.objects.count(), 0)
+
+    def test_unchanged_rows_skipped(self):
+        init_worker(RowHashIndex(sorted([get_row_hash(self.rows[0]), get_row_hash(self.rows[2])])))
+
+        result = ChunkImporter(self.chunk, self.run_obj.id).run()
+
+        self.assertEqual(result, (1, 2, 0))
+        self.assertEqual(list(Company.objects.values_list('number', flat=True)), ['00000001'])
+        self.assertEqual(Company.objects.get().row_hash, get_row_hash(self.rows[1]))
+
+
+def failing_import_chunk(args):
+    raise ValueError('Chunk failed')
+
+
+class ImportChunksTestCase(TestCase):
+    @mock.patch('companieshouse.management.commands.import_csv.import_chunk', lambda args: args)
+    def test_max_in_flight(self):
+        """
+        No more than `max_in_flight` chunks should be read ahead of the completed ones.
+        """
+        consumed = []
+
+        def get_chunks():
+            for index in range(20):
+                consumed.append(index)
+                yield index
+
+        with ThreadPool(2) as pool:
+            results = []
+            for result in Command()._import_chunks(pool, get_chunks(), 4):
+                results.append(result)
+                self.assertLess(len(consumed) - len(results), 4)
+
+        self.assertEqual(sorted(results), list(range(20)))
+
+
+class ImportCSVCommandTestCase(TransactionTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(['header'] * len(FULL_DATA))
+            writer.writerow(FULL_DATA)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def get_content(self):
+        content = StringIO()
+        writer = csv.writer(content)
+        writer.writerow(['header'] * len(FULL_DATA))
+        for index, data in enumerate([FULL_DATA, MINIMAL_DATA, FULL_DATA]):
+            row = list(data)
+            row[1] = '{:08}'.format(index)
+            writer.writerow(row)
+        return content.getvalue()
+
+    def assertImported(self, run, rows_imported, rows_unchanged):
+        self.assertEqual(
+            sorted(Company.objects.values_list('number', flat=True)),
+            ['00000000', '00000001', '00000002']
+        )
+        self.assertNotEqual(run.finished_on, None)
+        self.assertEqual((run.rows_imported, run.rows_unchanged, run.errors), (rows_imported, rows_unchanged, 0))
+        self.assertTrue(all(run.importcheckpoint_set.values_list('completed', flat=True)))
+
+    def test_import(self):
+        """
+        The rows should be imported by the workers and the totals recorded in the ImportRun,
+        the rows which haven't changed should be skipped by the next import.
+        """
+        with open(self.path, 'w') as f:
+            f.write(self.get_content())
+
+        call_command('import_csv', self.path, workers=2, stdout=StringIO())
+        self.assertImported(ImportRun.objects.get(), 3, 0)
+
+        call_command('import_csv', self.path, workers=2, stdout=StringIO())
+        self.assertImported(ImportRun.objects.latest('id'), 0, 3)
+
+    def test_import_zip(self):
+        """
+        The csv members of zip files should be spooled to temporary files and imported by the workers.
+        """
+        with zipfile.ZipFile(self.path, 'w') as zip_file:
+            zip_file.writestr('companies.csv', self.get_content())
+
+        call_command('import_csv', self.path, workers=2, stdout=StringIO())
+        self.assertImported(ImportRun.objects.get(), 3, 0)
+
+    @mock.patch('companieshouse.management.commands.import_csv.import_chunk', failing_import_chunk)
+    def test_failing_chunk(self):
+        """
+        If a chunk fails, the command should stop the workers and re-raise instead of hanging.
+        """
+        with self.assertRaises(ValueError):
+            call_command('import_csv', self.path, full=True, workers=2, stdout=StringIO())
+
+    @mock.patch('companieshouse.management.commands.import_csv.import_chunk', failing_import_chunk)
+    def test_failing_chunk_updates_run(self):
+        """
+        If a chunk fails, the run should still be updated and left unfinished so that it can be resumed.
+        """
+        with self.assertRaises(ValueError):
+            call_command('import_csv', self.path, full=True, workers=2, stdout=StringIO())
+
+        run = ImportRun.objects.get()
+        self.assertEqual(run.finished_on, None)
+        self.assertGreater(run.duration, 0)
+        self.assertEqual((run.rows_imported, run.rows_unchanged, run.errors), (0, 0, 0))
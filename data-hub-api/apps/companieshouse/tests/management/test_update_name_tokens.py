@@ -0,0 +1,37 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test.testcases import TestCase
+
+from companieshouse.models import Company, NameToken
+
+
+class UpdateNameTokensTestCase(TestCase):
+    def setUp(self):
+        for number, name in [
+            ('001', 'Acme Services Ltd'),
+            ('002', 'Other Services Limited'),
+            ('003', 'Services Services'),
+            ('004', 'Acme'),
+        ]:
+            Company.objects.create(number=number, name=name, raw={})
+
+    def test_update(self):
+        NameToken.objects.create(token='old', frequency=100)
+
+        out = StringIO()
+        call_command('update_name_tokens', min_frequency=2, stdout=out)
+
+        self.assertEqual(
+            dict(NameToken.objects.values_list('token', 'frequency')),
+            {'services': 3, 'acme': 2}
+        )
+        self.assertIn('Stored 2 name tokens', out.getvalue())
+
+    def test_min_frequency(self):
+        call_command('update_name_tokens', min_frequency=1, stdout=StringIO())
+
+        self.assertEqual(
+            dict(NameToken.objects.values_list('token', 'frequency')),
+            {'services': 3, 'acme': 2, 'other': 1}
+        )
@@ -0,0 +1,54 @@
+from django.test.testcases import TestCase, SimpleTestCase
+
+from companieshouse.models import Company
+from companieshouse.sources.db.hashes import RowHashIndex, get_row_hash
+
+
+class GetRowHashTestCase(SimpleTestCase):
+    def test_same_row(self):
+        self.assertEqual(
+            get_row_hash(['MY COMPANY NAME', '00000001']),
+            get_row_hash(['MY COMPANY NAME', '00000001'])
+        )
+
+    def test_different_rows(self):
+        self.assertNotEqual(
+            get_row_hash(['MY COMPANY NAME', '00000001']),
+            get_row_hash(['MY COMPANY NAME', '00000002'])
+        )
+
+    def test_values_boundaries(self):
+        self.assertNotEqual(
+            get_row_hash(['MY COMPANY', 'NAME']),
+            get_row_hash(['MY', 'COMPANY NAME'])
+        )
+
+    def test_fits_bigint(self):
+        row_hash = get_row_hash(['MY COMPANY NAME', '00000001'])
+        self.assertTrue(-2 ** 63 <= row_hash < 2 ** 63)
+
+
+class RowHashIndexTestCase(TestCase):
+    def test_contains(self):
+        index = RowHashIndex([-10, 1, 5, 20])
+
+        self.assertEqual(len(index), 4)
+        for row_hash in [-10, 1, 5, 20]:
+            self.assertTrue(row_hash in index)
+        for row_hash in [-11, 0, 2, 21]:
+            self.assertFalse(row_hash in index)
+
+    def test_empty(self):
+        index = RowHashIndex()
+
+        self.assertEqual(len(index), 0)
+        self.assertFalse(1 in index)
+
+    def test_load(self):
+        Company.objects.create(number='00000001', name='company 1', raw={}, row_hash=5)
+        Company.objects.create(number='00000002', name='company 2', raw={}, row_hash=-3)
+        Company.objects.create(number='00000003', name='company 3', raw={})
+
+        index = RowHashIndex.load()
+
+        self.assertEqual(list(index.hashes), [-3, 5])
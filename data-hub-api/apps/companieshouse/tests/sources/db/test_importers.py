@@ -2,7 +2,8 @@ import datetime
 
 from django.test.testcases import TestCase
 
-from companieshouse.sources.db.importers import CSVImporter
+from companieshouse.sources.db.importers import CSVImporter, DictParser, ListParser, Parser, PropertyParser, \
+    ParserCompiler, int_parser, date_parser, warnings_aggregator
 from companieshouse import constants
 
 
@@ -32,6 +33,7 @@ MINIMAL_DATA = [
 class CSVImporterBaseTestCase(TestCase):
     def setUp(self):
         self.importer = CSVImporter()
+        warnings_aggregator.pop()
 
     def assert_date(self, csv_value, value):
         if not csv_value or not value:
@@ -171,6 +173,19 @@ class CompanyStatusTestCase(CSVImporterBaseTestCase):
         data = self.importer.parse(iter(csv_data))
         self.assertEqual(data['company_status'], 'active')
 
+    def test_unknown_warnings_aggregated(self):
+        csv_data = list(MINIMAL_DATA)
+        csv_data[11] = 'some unknown status'
+
+        for index in range(3):
+            self.importer.parse(csv_data)
+
+        self.assertEqual(
+            warnings_aggregator.pop(),
+            {"Warning COMPANY_STATUS 'some unknown status' not found, using the default 'active' instead": 3}
+        )
+        self.assertEqual(warnings_aggregator.pop(), {})
+
 
 class CompanyTypeTestCase(CSVImporterBaseTestCase):
     def test_known_substitute(self):
@@ -186,6 +201,21 @@ class CompanyTypeTestCase(CSVImporterBaseTestCase):
 
         data = self.importer.parse(iter(csv_data))
         self.assertEqual(data['type'], 'other')
+        self.assertEqual(
+            warnings_aggregator.pop(),
+            {"Warning COMPANY_TYPE 'Some unknown types' not found, using the default 'other' instead": 1}
+        )
+
+
+class DateParserTestCase(TestCase):
+    def test_valid(self):
+        self.assertEqual(date_parser._parse('01/02/2016'), '2016-02-01')
+        self.assertEqual(date_parser._parse('1/2/2016'), '2016-02-01')
+
+    def test_invalid(self):
+        for val in ['32/01/2016', '01/13/2016', '01/01/16', '01-01-2016', '01/01/2016/01', 'invalid']:
+            with self.assertRaises(ValueError):
+                date_parser._parse(val)
 
 
 class SicCodeTestCase(CSVImporterBaseTestCase):
@@ -209,3 +239,51 @@ class SicCodeTestCase(CSVImporterBaseTestCase):
 
         data = self.importer.parse(iter(csv_data))
         self.assertFalse('sic_codes' in data)
+
+
+class ParserCompilerTestCase(TestCase):
+    def test_same_as_parsers_tree(self):
+        importer = CSVImporter()
+        for csv_row in [FULL_DATA, MINIMAL_DATA]:
+            self.assertEqual(
+                importer.parse(csv_row),
+                DictParser.parse(importer, iter(csv_row))
+            )
+
+    def test_iterator(self):
+        importer = CSVImporter()
+        self.assertEqual(importer.parse(iter(FULL_DATA)), importer.parse(FULL_DATA))
+
+    def test_too_few_values(self):
+        with self.assertRaises(ValueError):
+            CSVImporter().parse(FULL_DATA[:-1])
+
+    def test_nested(self):
+        parse = ParserCompiler().compile(
+            DictParser([
+                PropertyParser('a', int_parser),
+                PropertyParser(
+                    'b',
+                    ListParser(
+                        DictParser([
+                            PropertyParser('c'),
+                            PropertyParser('d'),
+                        ]),
+                        2
+                    )
+                ),
+            ])
+        )
+
+        self.assertEqual(
+            parse(['1', 'c1', '', '', 'd2']),
+            {'a': 1, 'b': [{'c': 'c1'}, {'d': 'd2'}]}
+        )
+        self.assertEqual(parse(['', '', '', '', '']), {})
+
+    def test_not_compilable(self):
+        with self.assertRaises(NotImplementedError):
+            ParserCompiler().compile(DictParser([Parser()]))
+
+    def test_compiled_once(self):
+        self.assertIs(CSVImporter()._parse_row, CSVImporter()._parse_row)
@@ -0,0 +1,142 @@
+import datetime
+
+from django.test.testcases import SimpleTestCase
+
+from companieshouse.models import Company, CompanySicCode, CompanyPreviousName
+from companieshouse.sources.db.loaders import CompanyBulkLoader, to_copy_value
+from companieshouse.tests.test_managers import BaseFromCHTestCasea, FULL_DATA, MINIMAL_DATA
+
+
+class ToCopyValueTestCase(SimpleTestCase):
+    def test_None(self):
+        self.assertEqual(to_copy_value(None), '\\N')
+
+    def test_empty(self):
+        self.assertEqual(to_copy_value(''), '')
+
+    def test_escapes(self):
+        self.assertEqual(
+            to_copy_value('a\\b\tc\nd\re'),
+            'a\\\\b\\tc\\nd\\re'
+        )
+
+    def test_non_str(self):
+        self.assertEqual(to_copy_value(1), '1')
+
+
+class CompanyBulkLoaderTestCase(BaseFromCHTestCasea):
+    def setUp(self):
+        self.loader = CompanyBulkLoader()
+
+    def get_data(self, base, number, **kwargs):
+        data = dict(base)
+        data['company_number'] = number
+        data.update(kwargs)
+        return data
+
+    def test_create(self):
+        data_list = [
+            self.get_data(FULL_DATA, '00000001'),
+            self.get_data(MINIMAL_DATA, '00000002'),
+        ]
+
+        self.assertEqual(self.loader.load(data_list), 2)
+
+        self.assertEqual(Company.objects.count(), 2)
+        for data in data_list:
+            company = Company.objects.get(number=data['company_number'])
+
+            self.assert_company(company, data)
+            self.assert_sic_codes(company, data.get('sic_codes', []))
+            self.assert_previous_names(company, data.get('previous_names', []))
+        self.assertEqual(Company.objects.get(number='00000001').raw, data_list[0])
+
+    def test_update(self):
+        company = Company.objects.create(
+            number='00000001',
+            name='My OLD COMPANY NAME',
+            postcode='W1 1BB',
+            country='FR',
+            company_type='llp',
+            status='dismissed',
+            date_of_creation=datetime.date(year=1999, month=2, day=2),
+            raw={'something': 'something-else'}
+        )
+        company.companysiccode_set.create(code='19100')
+        company.companypreviousname_set.create(
+            name='something-else', change_date=datetime.date(year=1980, month=1, day=1)
+        )
+        other_company = Company.objects.create(number='00000002', name='Other', raw={})
+        other_company.companysiccode_set.create(code='19100')
+
+        data = self.get_data(FULL_DATA, '00000001')
+        self.loader.load([data])
+
+        self.assertEqual(Company.objects.count(), 2)
+        company = Company.objects.get(number='00000001')
+        self.assert_company(company, data)
+        self.assert_sic_codes(company, data['sic_codes'])
+        self.assert_previous_names(company, data['previous_names'])
+
+        # other companies are not touched
+        self.assert_sic_codes(other_company, ['19100'])
+
+    def test_children_diff(self):
+        """
+        Unchanged children are kept, stale ones deleted and missing ones created, duplicates included.
+        """
+        company = Company.objects.create(number='00000001', name='My OLD COMPANY NAME', raw={})
+        kept = company.companysiccode_set.create(code='19100')
+        company.companysiccode_set.create(code='99999')
+        company.companysiccode_set.create(code='20000')
+        company.companysiccode_set.create(code='20000')
+
+        self.loader.load([self.get_data(MINIMAL_DATA, '00000001', sic_codes=['19100', '19100', '20000'])])
+
+        self.assert_sic_codes(company, ['19100', '19100', '20000'])
+        self.assertTrue(CompanySicCode.objects.filter(id=kept.id).exists())
+
+    def test_unchanged_children_kept(self):
+        data = self.get_data(FULL_DATA, '00000001')
+        self.loader.load([data])
+        sic_code_ids = sorted(CompanySicCode.objects.values_list('id', flat=True))
+        previous_name_ids = sorted(CompanyPreviousName.objects.values_list('id', flat=True))
+
+        self.loader.load([data])
+
+        self.assertEqual(sorted(CompanySicCode.objects.values_list('id', flat=True)), sic_code_ids)
+        self.assertEqual(sorted(CompanyPreviousName.objects.values_list('id', flat=True)), previous_name_ids)
+
+    def test_duplicated_numbers(self):
+        """
+        If the same company appears more than once in the batch, the last record wins.
+        """
+        self.loader.load([
+            self.get_data(MINIMAL_DATA, '00000001', company_name='first'),
+            self.get_data(MINIMAL_DATA, '00000001', company_name='second'),
+        ])
+
+        self.assertEqual(Company.objects.count(), 1)
+        self.assertEqual(Company.objects.get().name, 'second')
+
+    def test_special_chars(self):
+        data = self.get_data(MINIMAL_DATA, '00000001', company_name='MY\tCOMPANY \\ NAME\n')
+        self.loader.load([data])
+
+        self.assertEqual(Company.objects.get().name, data['company_name'])
+
+    def test_row_hashes(self):
+        self.loader.load(
+            [self.get_data(MINIMAL_DATA, '00000001'), self.get_data(MINIMAL_DATA, '00000002')],
+            row_hashes=[10, None]
+        )
+
+        self.assertEqual(Company.objects.get(number='00000001').row_hash, 10)
+        self.assertEqual(Company.objects.get(number='00000002').row_hash, None)
+
+    def test_empty(self):
+        self.assertEqual(self.loader.load([]), 0)
+
+        self.assertEqual(Company.objects.count(), 0)
+        self.assertEqual(CompanySicCode.objects.count(), 0)
+        self.assertEqual(CompanyPreviousName.objects.count(), 0)
@@ -1,25 +1,44 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import override_settings
 from django.test.testcases import TestCase
 
-from companieshouse.models import Company
-from companieshouse.sources.db.matcher import ChDBMatcher
+from companieshouse.models import Company, NameToken
+from companieshouse.sources.db.matcher import ChDBMatcher, ChIndexMatcher
+from companieshouse.sources.db.names import CompanyNameIndex
+from companieshouse.sources.similarity import NameTokenWeights
+
+
+def use_fresh_name_token_weights(test_case):
+    """
+    Replaces the name token weights shared by the calculators with new ones loaded from the
+    current NameToken stats so that the assertNumQueries don't depend on the order of the tests.
+    """
+    patcher = mock.patch(
+        'companieshouse.sources.similarity.name_token_weights', NameTokenWeights()
+    )
+    weights = patcher.start()
+    test_case.addCleanup(patcher.stop)
+    weights.load()
 
 
 class ChDBMatcherTestCase(TestCase):
     def setUp(self):
-        Company.objects.bulk_create([
-            Company(
-                number='001', name='MY COMPANY LIMITED',
-                postcode='SW1A1AA', raw={}
-            ),
-            Company(
-                number='002', name='The little white corporation',
-                postcode='SW1A1AA', raw={}
-            )
-        ])
+        use_fresh_name_token_weights(self)
+        Company.objects.create(
+            number='001', name='MY COMPANY LIMITED',
+            postcode='SW1A1AA', raw={}
+        )
+        Company.objects.create(
+            number='002', name='The little white corporation',
+            postcode='SW1A1AA', raw={}
+        )
 
     def test_with_substring_match(self):
         """
-        The matcher should find company 001 as its name is ILIKE 'my company'.
+        The matcher should find company 001 as its name contains 'my company'.
         """
         name = 'MY COMPANY LTD.'
         postcode = 'SW1A 1AA'
@@ -56,3 +75,261 @@ class ChDBMatcherTestCase(TestCase):
         best_match = matcher.find()
 
         self.assertEqual(best_match, None)
+
+    @override_settings(DB_MATCHER_MAX_CANDIDATES=1)
+    def test_max_candidates(self):
+        """
+        Only the DB_MATCHER_MAX_CANDIDATES companies with the most similar names should be considered.
+        """
+        Company.objects.create(
+            number='003', name='MY COMPANY HOLDINGS LIMITED',
+            postcode='SW1A1AA', raw={}
+        )
+        name = 'MY COMPANY LTD.'
+        postcode = 'SW1A 1AA'
+
+        matcher = ChDBMatcher(name=name, postcode=postcode)
+        best_match = matcher.find()
+
+        self.assertEqual(best_match.company_number, '001')
+        self.assertEqual(len(matcher.findings), 1)
+
+    @override_settings(DB_MATCHER_MAX_CANDIDATES=1)
+    def test_postcode_boost(self):
+        """
+        Among companies with similar names, the ones with the same postcode should be considered first.
+        """
+        Company.objects.create(
+            number='003', name='MY COMPANY HOLDINGS LIMITED',
+            postcode='SW1A2AA', raw={}
+        )
+        name = 'MY COMPANY HOLDING LTD.'
+        postcode = 'SW1A 1AA'
+
+        matcher = ChDBMatcher(name=name, postcode=postcode)
+        best_match = matcher.find()
+
+        self.assertEqual(best_match.company_number, '001')
+        self.assertEqual(len(matcher.findings), 1)
+
+    @override_settings(DB_MATCHER_SIMILARITY_THRESHOLD=0.9)
+    def test_similarity_threshold(self):
+        """
+        Companies with names less similar than DB_MATCHER_SIMILARITY_THRESHOLD should not be considered.
+        """
+        name = 'little corporation'
+        postcode = 'SW1A1AA'
+
+        matcher = ChDBMatcher(name=name, postcode=postcode)
+        best_match = matcher.find()
+
+        self.assertEqual(best_match, None)
+        self.assertEqual(len(matcher.findings), 0)
+
+    def test_exact_match(self):
+        """
+        If a company with the same normalised name and postcode exists, it should be found
+        with one query skipping the similarity search.
+        """
+        Company.objects.create(
+            number='003', name='MY COMPANY HOLDINGS LIMITED',
+            postcode='SW1A1AA', raw={}
+        )
+        name = 'my company ltd'
+        postcode = 'sw1a 1aa'
+
+        matcher = ChDBMatcher(name=name, postcode=postcode)
+        with self.assertNumQueries(1):
+            best_match = matcher.find()
+
+        self.assertEqual(best_match.company_number, '001')
+        self.assertEqual(best_match.proximity, 1)
+        self.assertEqual(len(matcher.findings), 1)
+
+    def test_postcode_district_blocking(self):
+        """
+        When the postcode is valid, only the companies in the same postcode district should be considered.
+        """
+        Company.objects.create(
+            number='003', name='MY COMPANY SERVICES LIMITED',
+            postcode='E1 6AN', raw={}
+        )
+        name = 'MY COMPANY SERVICES'
+        postcode = 'SW1A 2AA'
+
+        matcher = ChDBMatcher(name=name, postcode=postcode)
+        best_match = matcher.find()
+
+        self.assertEqual(best_match.company_number, '001')
+        self.assertEqual(len(matcher.findings), 1)
+
+    def test_postcode_district_fallback(self):
+        """
+        If no company in the postcode district has a similar name, the matcher should search by name only.
+        """
+        name = 'MY COMPANY LTD.'
+        postcode = 'E1 6AN'
+
+        matcher = ChDBMatcher(name=name, postcode=postcode)
+        best_match = matcher.find()
+
+        self.assertEqual(best_match.company_number, '001')
+
+    def test_postcode_district_weak_candidates_fallback(self):
+        """
+        If no company in the postcode district is close enough to be accepted, the matcher should
+        also search by name only and find the company with the same name registered somewhere else.
+        """
+        Company.objects.create(
+            number='003', name='ACME WIDGETS LIMITED',
+            postcode='E1 6AN', raw={}
+        )
+        Company.objects.create(
+            number='004', name='ACMEWIDGETS',
+            postcode='SW1A 2BB', raw={}
+        )
+        name = 'ACME WIDGETS'
+        postcode = 'SW1A 2AA'
+
+        matcher = ChDBMatcher(name=name, postcode=postcode)
+        best_match = matcher.find()
+
+        self.assertEqual(best_match.company_number, '003')
+        self.assertEqual(
+            sorted(finding.company_number for finding in matcher.findings),
+            ['003', '004']
+        )
+
+    def test_without_postcode(self):
+        """
+        If the postcode is missing, the matcher should search by name only.
+        """
+        name = 'little corporation'
+
+        matcher = ChDBMatcher(name=name, postcode=None)
+        best_match = matcher.find()
+
+        self.assertEqual(best_match.company_number, '002')
+
+    def test_find_many(self):
+        """
+        find_many should return the same matches as find, in the same order, with a constant number of queries.
+        """
+        pairs = [
+            ('MY COMPANY LTD.', 'SW1A 1AA'),  # exact match
+            ('name without match', 'SW1A 1AA'),
+            ('little corporation', 'SW1A 2AA'),  # similar name in the same district
+            ('little corporation', None),  # similar name, no postcode
+            ('', 'SW1A 1AA'),
+        ]
+
+        # exact matches, savepoint, similarity threshold, district search, name search, savepoint release
+        with self.assertNumQueries(6):
+            best_matches = ChDBMatcher.find_many(pairs)
+
+        self.assertEqual(
+            [best_match.company_number if best_match else None for best_match in best_matches],
+            ['001', None, '002', '002', None]
+        )
+        self.assertEqual(
+            best_matches,
+            [ChDBMatcher(name, postcode).find() for name, postcode in pairs]
+        )
+
+    def test_find_many_empty(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(ChDBMatcher.find_many([]), [])
+
+
+class ChIndexMatcherTestCase(TestCase):
+    def setUp(self):
+        Company.objects.create(
+            number='001', name='MY COMPANY LIMITED',
+            postcode='SW1A1AA', raw={'company_number': '001'}
+        )
+        Company.objects.create(
+            number='002', name='The little white corporation',
+            postcode='SW1A1AA', raw={'company_number': '002'}
+        )
+        Company.objects.create(
+            number='003', name='Little Trading',
+            postcode='W1 1AA', raw={'company_number': '003'}
+        )
+
+        fd, self.path = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+        CompanyNameIndex.build(self.path)
+
+        self.settings_override = override_settings(NAME_INDEX_PATH=self.path)
+        self.settings_override.enable()
+
+        use_fresh_name_token_weights(self)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        os.remove(self.path)
+
+    def test_find(self):
+        matcher = ChIndexMatcher(name='little white corporation', postcode='SW1A 1AA')
+        with self.assertNumQueries(1):
+            best_match = matcher.find()
+
+        self.assertEqual(best_match.company_number, '002')
+        self.assertEqual(best_match.name, 'The little white corporation')
+        self.assertEqual(best_match.proximity, 1)
+        self.assertEqual(best_match.raw, {'company_number': '002'})
+        self.assertEqual(
+            sorted(finding.company_number for finding in matcher.findings),
+            ['002', '003']
+        )
+
+    def test_without_match(self):
+        matcher = ChIndexMatcher(name='name without match', postcode='SW1A 1AA')
+        with self.assertNumQueries(0):
+            best_match = matcher.find()
+
+        self.assertEqual(best_match, None)
+        self.assertEqual(matcher.findings, [])
+
+    def test_find_with_token_weights(self):
+        """
+        Sharing a distinctive token ('white') should count more than sharing one found in all companies.
+        """
+        NameToken.objects.create(token='trading', frequency=3)
+        use_fresh_name_token_weights(self)
+
+        best_match = ChIndexMatcher(name='white trading', postcode=None).find()
+        self.assertEqual(best_match.company_number, '002')
+
+    def test_company_deleted(self):
+        """
+        Companies no longer in the db should be skipped.
+        """
+        Company.objects.filter(number='002').delete()
+
+        best_match = ChIndexMatcher(name='little white corporation', postcode='SW1A 1AA').find()
+        self.assertEqual(best_match.company_number, '003')
+        self.assertEqual(best_match.raw, {'company_number': '003'})
+
+    def test_find_many(self):
+        """
+        find_many should return the same matches as find, in the same order, with one query.
+        """
+        pairs = [
+            ('MY COMPANY LTD.', 'SW1A 1AA'),
+            ('name without match', 'SW1A 1AA'),
+            ('little trading', None),
+            ('', 'SW1A 1AA'),
+        ]
+
+        with self.assertNumQueries(1):
+            best_matches = ChIndexMatcher.find_many(pairs)
+
+        self.assertEqual(
+            [best_match.company_number if best_match else None for best_match in best_matches],
+            ['001', None, '003', None]
+        )
+        self.assertEqual(
+            best_matches,
+            [ChIndexMatcher(name, postcode).find() for name, postcode in pairs]
+        )
@@ -0,0 +1,138 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+from django.test.testcases import TestCase, SimpleTestCase
+
+from companieshouse.models import Company
+from companieshouse.sources.db.names import CompanyNameIndex, CompanyRecord, contains, get_name_index
+
+
+COMPANIES = [
+    ('00000001', 'My Company Ltd', 'SW1A 1AA', 'my company', 'sw1a1aa'),
+    ('00000002', 'Other Company', 'W1 1AA', 'other company', 'w11aa'),
+    ('00000003', 'Café Trading', None, 'café trading', None),
+    ('00000004', 'My Other Trading Company', 'SW1A 2AA', 'my other trading company', 'sw1a2aa'),
+]
+
+
+class CompanyNameIndexTestCase(SimpleTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+        CompanyNameIndex.write(self.path, COMPANIES)
+        self.index = CompanyNameIndex.load(self.path)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_records(self):
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(
+            self.index.get_record(0),
+            CompanyRecord('00000001', 'My Company Ltd', 'SW1A 1AA', 'my company', 'sw1a1aa')
+        )
+        self.assertEqual(
+            self.index.get_record(2),
+            CompanyRecord('00000003', 'Café Trading', '', 'café trading', '')
+        )
+
+    def test_postings(self):
+        self.assertEqual(list(self.index.get_postings('company')), [0, 1, 3])
+        self.assertEqual(list(self.index.get_postings('café')), [2])
+        self.assertEqual(list(self.index.get_postings('other')), [1, 3])
+        self.assertEqual(list(self.index.get_postings('missing')), [])
+
+    def test_candidates(self):
+        """
+        The companies sharing the most (distinctive) tokens come first.
+        """
+        candidates = self.index.get_candidates('my trading', 10, 10)
+        self.assertEqual(candidates[0], 3)
+        self.assertEqual(sorted(candidates), [0, 2, 3])
+        self.assertEqual(self.index.get_candidates('my trading', 1, 10), [3])
+        self.assertEqual(self.index.get_candidates('missing', 10, 10), [])
+        self.assertEqual(self.index.get_candidates('', 10, 10), [])
+
+    def test_candidates_with_common_tokens(self):
+        """
+        Tokens of more than `max_postings` companies are only used if there are no rarer ones.
+        """
+        self.assertEqual(sorted(self.index.get_candidates('other company', 10, 2)), [1, 3])
+        self.assertEqual(sorted(self.index.get_candidates('company', 10, 2)), [0, 3])
+
+    def test_candidates_with_only_common_tokens(self):
+        """
+        If all the tokens are common, only `max_postings` companies with the rarest one should be scored
+        and the ones sharing the most of the other tokens should come first.
+        """
+        companies = []
+        for index in range(200):
+            tokens = ['uk']
+            if index % 2 == 0:
+                tokens.append('services')
+            if index % 4 == 0 or index % 8 == 1:
+                tokens.append('trading')
+            companies.append(('{:08}'.format(index), '', '', ' '.join(tokens), ''))
+        CompanyNameIndex.write(self.path, companies)
+        index = CompanyNameIndex.load(self.path)
+
+        with mock.patch('companieshouse.sources.db.names.contains', wraps=contains) as mocked_contains:
+            candidates = index.get_candidates('uk services trading', 5, 10)
+
+        self.assertLessEqual(mocked_contains.call_count, 10 * 2)
+        self.assertEqual(len(candidates), 5)
+        for company_id in candidates:
+            self.assertEqual(index.get_record(company_id).name_normalised, 'uk services trading')
+
+    def test_empty(self):
+        CompanyNameIndex.write(self.path, [])
+        index = CompanyNameIndex.load(self.path)
+
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.get_candidates('my company', 10, 10), [])
+
+    def test_invalid_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * 64)
+
+        with self.assertRaises(ValueError):
+            CompanyNameIndex.load(self.path)
+
+    def test_get_name_index(self):
+        self.assertEqual(len(get_name_index(self.path)), 4)
+        self.assertIs(get_name_index(self.path), get_name_index(self.path))
+
+    def test_get_name_index_missing(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_name_index('{}.missing'.format(self.path))
+
+    @override_settings(NAME_INDEX_PATH='')
+    def test_get_name_index_not_configured(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_name_index()
+
+
+class CompanyNameIndexBuildTestCase(TestCase):
+    def test_build(self):
+        Company.objects.create(number='00000002', name='Other Company', postcode='W1 1AA', raw={})
+        Company.objects.create(number='00000001', name='My Company Ltd', postcode='SW1A 1AA', raw={})
+
+        fd, path = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+        try:
+            self.assertEqual(CompanyNameIndex.build(path), 2)
+            index = CompanyNameIndex.load(path)
+        finally:
+            os.remove(path)
+
+        self.assertEqual(
+            [index.get_record(company_id) for company_id in range(len(index))],
+            [
+                CompanyRecord('00000001', 'My Company Ltd', 'SW1A 1AA', 'my company', 'sw1a1aa'),
+                CompanyRecord('00000002', 'Other Company', 'W1 1AA', 'other company', 'w11aa'),
+            ]
+        )
+        self.assertEqual(list(index.get_postings('company')), [0, 1])
@@ -0,0 +1,174 @@
+import io
+import os
+import pickle
+import zipfile
+import tempfile
+
+from django.test.testcases import SimpleTestCase
+
+from companieshouse.sources.db.readers import FileChunk, StreamChunk, split_file, split_stream, get_chunks
+
+
+class SplitFileTestCase(SimpleTestCase):
+    HEADER = 'CompanyName,CompanyNumber\n'
+
+    def setUp(self):
+        self.rows = [['COMPANY, {}'.format(index), '{:08}'.format(index)] for index in range(100)]
+
+        fd, self.path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            f.write(self.HEADER)
+            for name, number in self.rows:
+                f.write('"{}",{}\n'.format(name, number))
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def read_all(self, chunks):
+        return [row for chunk in chunks for row in chunk.read_rows()]
+
+    def test_chunks_aligned_to_lines(self):
+        for chunk_size in [1, 7, 50, 1000]:
+            chunks = split_file(self.path, chunk_size)
+
+            self.assertEqual(chunks[0].start, len(self.HEADER))
+            self.assertEqual(chunks[-1].end, os.path.getsize(self.path))
+            for chunk, next_chunk in zip(chunks, chunks[1:]):
+                self.assertEqual(chunk.end, next_chunk.start)
+
+            self.assertEqual(self.read_all(chunks), self.rows)
+
+    def test_one_chunk(self):
+        chunks = split_file(self.path, os.path.getsize(self.path) * 2)
+
+        self.assertEqual(chunks, [FileChunk(self.path, len(self.HEADER), os.path.getsize(self.path))])
+
+    def test_without_skipping_header(self):
+        chunks = split_file(self.path, 50, skip_header=False)
+
+        self.assertEqual(chunks[0].start, 0)
+        self.assertEqual(self.read_all(chunks), [['CompanyName', 'CompanyNumber']] + self.rows)
+
+    def test_offset(self):
+        chunk, = split_file(self.path, os.path.getsize(self.path))
+
+        rows = chunk.read_rows()
+        next(rows)
+        next(rows)
+
+        self.assertEqual(list(chunk.read_rows(offset=chunk.offset)), self.rows[2:])
+        self.assertEqual(chunk.offset, chunk.end)
+
+    def test_header_only(self):
+        with open(self.path, 'w') as f:
+            f.write(self.HEADER)
+
+        self.assertEqual(split_file(self.path, 10), [])
+
+    def test_no_trailing_newline(self):
+        with open(self.path, 'w') as f:
+            f.write(self.HEADER)
+            f.write('"COMPANY",00000001')
+
+        self.assertEqual(self.read_all(split_file(self.path, 1)), [['COMPANY', '00000001']])
+
+
+class SplitStreamTestCase(SimpleTestCase):
+    HEADER = 'CompanyName,CompanyNumber\n'
+
+    def setUp(self):
+        self.rows = [['COMPANY, {}'.format(index), '{:08}'.format(index)] for index in range(100)]
+        self.content = self.HEADER + ''.join('"{}",{}\n'.format(name, number) for name, number in self.rows)
+        self.spool_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.spool_dir.cleanup()
+
+    def split(self, content, chunk_size):
+        return list(split_stream('source', io.StringIO(content), chunk_size, spool_dir=self.spool_dir.name))
+
+    def test_chunks(self):
+        chunks = self.split(self.content, 200)
+
+        self.assertTrue(len(chunks) > 1)
+        self.assertEqual(chunks[0].line, 0)
+        for chunk, next_chunk in zip(chunks, chunks[1:]):
+            self.assertEqual(chunk.line + chunk.tot_lines, next_chunk.line)
+        self.assertEqual([row for chunk in chunks for row in chunk.read_rows()], self.rows)
+
+    def test_spooled(self):
+        """
+        The lines are spooled to files so that only their paths get pickled and sent to the workers.
+        """
+        chunk, = self.split(self.content, len(self.content) * 2)
+
+        self.assertEqual(os.path.dirname(chunk.path), self.spool_dir.name)
+        self.assertLess(len(pickle.dumps(chunk)), len(self.content) / 4)
+
+    def test_repr(self):
+        self.assertEqual(repr(StreamChunk('source', 10, 2, 'path', 4)), 'source[rows 10:12]')
+        self.assertEqual(StreamChunk('source', 10, 2, 'path', 4).key, 'source:10')
+
+    def test_offset(self):
+        chunk, = self.split('header\na\nb\nc\n', 200)
+
+        rows = chunk.read_rows()
+        next(rows)
+
+        self.assertEqual(list(chunk.read_rows(offset=chunk.offset)), [['b'], ['c']])
+        self.assertEqual(chunk.offset, chunk.end)
+
+    def test_discard(self):
+        chunk, = self.split('header\na\n', 200)
+        chunk.discard()
+
+        self.assertFalse(os.path.exists(chunk.path))
+        chunk.discard()  # already deleted
+
+    def test_empty(self):
+        self.assertEqual(self.split(self.HEADER, 200), [])
+        self.assertEqual(os.listdir(self.spool_dir.name), [])
+
+
+class GetChunksTestCase(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.content = 'CompanyName,CompanyNumber\n"COMPANY 1",00000001\n"COMPANY 2",00000002\n'
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_csv(self):
+        path = os.path.join(self.tmp_dir.name, 'companies.csv')
+        with open(path, 'w') as f:
+            f.write(self.content)
+
+        chunks = list(get_chunks(path, 10))
+
+        self.assertTrue(all(isinstance(chunk, FileChunk) for chunk in chunks))
+        self.assertEqual(
+            [row for chunk in chunks for row in chunk.read_rows()],
+            [['COMPANY 1', '00000001'], ['COMPANY 2', '00000002']]
+        )
+
+    def test_zip(self):
+        """
+        Only the csv members of the zip file are read.
+        """
+        path = os.path.join(self.tmp_dir.name, 'companies.zip')
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr('companies-1.csv', self.content)
+            zip_file.writestr('readme.txt', 'something')
+            zip_file.writestr('companies-2.csv', self.content.replace('COMPANY', 'OTHER'))
+
+        chunks = list(get_chunks(path, 10, spool_dir=self.tmp_dir.name))
+
+        self.assertTrue(all(isinstance(chunk, StreamChunk) for chunk in chunks))
+        self.assertEqual(
+            [row for chunk in chunks for row in chunk.read_rows()],
+            [
+                ['COMPANY 1', '00000001'], ['COMPANY 2', '00000002'],
+                ['OTHER 1', '00000001'], ['OTHER 2', '00000002'],
+            ]
+        )
+        self.assertEqual(chunks[0].source, '{}/companies-1.csv'.format(path))
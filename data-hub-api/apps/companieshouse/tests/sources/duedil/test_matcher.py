@@ -1,9 +1,11 @@
 import json
 import responses
+from unittest import mock
 
 from django.conf import settings
 from django.test.testcases import TestCase
 
+from companieshouse.models import Company
 from companieshouse.sources.api import COMPANIES_HOUSE_BASE_URL
 
 from companieshouse.sources.duedil import DUEDIL_BASE_URL
@@ -215,3 +217,113 @@ class DueDilMatcherTestCase(TestCase):
             raw=ch_item_075
         )
         self.assertEqual(len(matcher.findings), 2)
+
+    @responses.activate
+    def test_with_ch_record_in_db(self):
+        """
+        In case of one finding with related CH record in the db
+            => best_match == DueDil record with full information from the db, the CH API is not used
+        """
+        item = {
+            'name': 'MY COMPANY',
+            'locale': 'United Kingdom',
+            'uri': 'http://api.duedil.com/open/uk/company/00000001.json',
+            'company_number': '00000001'
+        }
+
+        ch_item = {
+            'company_name': item['name'],
+            'company_number': item['company_number'],
+            'registered_office_address': {
+                'postal_code': 'SW1A 1AA'
+            }
+        }
+        Company.objects.create(
+            number=item['company_number'], name=item['name'], postcode='SW1A 1AA', raw=ch_item
+        )
+
+        name = 'my company ltd'
+        postcode = 'SW1A 1AA'
+
+        responses.add(
+            responses.GET,
+            self.get_duedil_url(name),
+            match_querystring=True,
+            body=self.build_body_response([item]),
+            content_type='application/json'
+        )
+
+        matcher = DueDilMatcher(name=name, postcode=postcode)
+        best_match = matcher.find()
+        self.assertFindingEqual(
+            best_match,
+            name=item['name'],
+            company_number=item['company_number'],
+            postcode='SW1A 1AA',
+            proximity=1,
+            raw=ch_item
+        )
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_mixed_ch_records(self):
+        """
+        Only the companies not in the db should be requested from the CH API, each one once.
+        """
+        items = [
+            {
+                'name': 'MY COMPANY {}'.format(index),
+                'locale': 'United Kingdom',
+                'uri': 'http://api.duedil.com/open/uk/company/0000000{}.json'.format(index),
+                'company_number': '0000000{}'.format(index)
+            }
+            for index in range(1, 5)
+        ]
+        items.append(items[-1])  # duplicated result
+
+        Company.objects.create(
+            number=items[0]['company_number'], name=items[0]['name'], postcode='SW1A 1AA',
+            raw={'registered_office_address': {'postal_code': 'SW1A 1AA'}}
+        )
+
+        name = 'my company'
+        postcode = 'SW1A 1AA'
+
+        responses.add(
+            responses.GET,
+            self.get_duedil_url(name),
+            match_querystring=True,
+            body=self.build_body_response(items),
+            content_type='application/json'
+        )
+        for item in items[1:4]:
+            responses.add(
+                responses.GET,
+                self.get_ch_company_url(item['company_number']),
+                body=json.dumps({
+                    'company_name': item['name'],
+                    'registered_office_address': {
+                        'postal_code': 'SW1A 2AA'
+                    }
+                }),
+                content_type='application/json'
+            )
+
+        matcher = DueDilMatcher(name=name, postcode=postcode)
+        with mock.patch('companieshouse.sources.duedil.matcher.connections') as mocked_connections:
+            matcher.find()
+
+        self.assertEqual(
+            [finding.company_number for finding in matcher.findings],
+            [item['company_number'] for item in items]
+        )
+        # the db connections opened by the threads requesting the CH API are closed
+        self.assertEqual(mocked_connections.close_all.call_count, 3)
+        self.assertEqual(
+            [finding.postcode for finding in matcher.findings],
+            ['SW1A 1AA', 'SW1A 2AA', 'SW1A 2AA', 'SW1A 2AA', 'SW1A 2AA']
+        )
+        self.assertEqual(
+            sorted(call.request.url for call in responses.calls[1:]),
+            [self.get_ch_company_url(item['company_number']) for item in items[1:4]]
+        )
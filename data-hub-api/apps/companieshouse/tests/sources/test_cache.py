@@ -0,0 +1,86 @@
+import json
+import responses
+import slumber
+from slumber.exceptions import HttpNotFoundError, HttpServerError
+
+from django.core.cache import caches
+from django.test import override_settings
+from django.test.testcases import SimpleTestCase
+
+from companieshouse.sources.cache import CachedResource
+
+
+BASE_URL = 'http://api.example.com/'
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'api_responses': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'test-api-responses',
+        },
+    },
+    API_CACHE='api_responses'
+)
+class CachedResourceTestCase(SimpleTestCase):
+    def setUp(self):
+        super(CachedResourceTestCase, self).setUp()
+        caches['api_responses'].clear()
+        self.api = CachedResource(slumber.API(BASE_URL, append_slash=False), 'test')
+
+    def add_response(self, path, body=None, status=200):
+        responses.add(
+            responses.GET,
+            '{}{}'.format(BASE_URL, path),
+            body=json.dumps(body or {}),
+            status=status,
+            content_type='application/json'
+        )
+
+    @responses.activate
+    def test_search(self):
+        """
+        Searches with the same normalised query should only be requested once.
+        """
+        self.add_response('search', {'items': [1]})
+
+        self.assertEqual(self.api.search.get(q='My  Company'), {'items': [1]})
+        self.assertEqual(self.api.search.get(q='my company'), {'items': [1]})
+        self.assertEqual(len(responses.calls), 1)
+
+        self.assertEqual(self.api.search.get(q='other company'), {'items': [1]})
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_resource_with_id(self):
+        self.add_response('company/00000001', {'company_number': '00000001'})
+        self.add_response('company/00000002', {'company_number': '00000002'})
+
+        for number in ['00000001', '00000002', '00000001']:
+            self.assertEqual(self.api.company(number).get(), {'company_number': number})
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_not_found(self):
+        """
+        404 responses should be cached and re-raised.
+        """
+        self.add_response('company/00000001', status=404)
+
+        for index in range(2):
+            with self.assertRaises(HttpNotFoundError) as cm:
+                self.api.company('00000001').get()
+            self.assertEqual(cm.exception.response.status_code, 404)
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_errors_not_cached(self):
+        self.add_response('company/00000001', status=500)
+
+        for index in range(2):
+            with self.assertRaises(HttpServerError):
+                self.api.company('00000001').get()
+        self.assertEqual(len(responses.calls), 2)
@@ -1,3 +1,7 @@
+import time
+import threading
+from unittest import mock
+
 from django.test.testcases import TestCase
 from django.conf import settings
 
@@ -35,6 +39,62 @@ class AlwaysPassMatcher(BestTestMatcher):
     proximity = 1.
 
 
+class SlowPassMatcher(BestTestMatcher):
+    proximity = 0.9
+
+    def _build_findings(self):
+        time.sleep(0.1)
+        super(SlowPassMatcher, self)._build_findings()
+
+
+class BlockingPassMatcher(BestTestMatcher):
+    """
+    Sets `started` and then blocks until `released` is set (or 5 seconds).
+    """
+    proximity = 1.
+    started = threading.Event()
+    released = threading.Event()
+
+    def _build_findings(self):
+        self.started.set()
+        self.released.wait(5)
+        super(BlockingPassMatcher, self)._build_findings()
+
+
+class WaitingFailMatcher(BestTestMatcher):
+    """
+    Waits for the BlockingPassMatcher to start (or 5 seconds) before failing.
+    """
+    proximity = 0
+
+    def _build_findings(self):
+        BlockingPassMatcher.started.wait(5)
+        super(WaitingFailMatcher, self)._build_findings()
+
+
+class NameProximityMatcher(BaseMatcher):
+    """
+    Returns a finding with proximity == float(name) and keeps track of the names it was called with.
+    """
+    names = []
+
+    def _build_findings(self):
+        self.names.append(self.name)
+        self.findings = [
+            FindingResult(
+                company_number=self.name,
+                name=self.name,
+                postcode=self.postcode,
+                proximity=float(self.name),
+                raw={}
+            )
+        ]
+
+
+class ConcurrentNameProximityMatcher(NameProximityMatcher):
+    CONCURRENT = True
+
+
 class MatcherHelperTestCase(TestCase):
     def test_finding_just_passes_acceptance_level(self):
         with self.settings(MATCHER_CLASSES=[
@@ -66,3 +126,126 @@ class MatcherHelperTestCase(TestCase):
             helper = MatcherHelper()
             best_match = helper.find_match('company name', 'SW1A 1AA')
             self.assertEqual(best_match.proximity, overriding_acceptance_level)
+
+
+class ConcurrentFindMatchTestCase(TestCase):
+    def test_priority(self):
+        """
+        The match of a higher-priority matcher should be returned even if a lower-priority one finishes first.
+        """
+        with self.settings(MATCHER_CLASSES=[
+            'companieshouse.tests.sources.test_matcher_helper.AlwaysFailMatcher',
+            'companieshouse.tests.sources.test_matcher_helper.SlowPassMatcher',
+            'companieshouse.tests.sources.test_matcher_helper.AlwaysPassMatcher',
+        ]):
+            best_match = MatcherHelper().find_match('company name', 'SW1A 1AA', concurrent=True)
+            self.assertEqual(best_match.proximity, SlowPassMatcher.proximity)
+
+    def test_early_return(self):
+        """
+        Lower-priority matchers should not be waited for once an acceptable match is found.
+        """
+        BlockingPassMatcher.started.clear()
+        BlockingPassMatcher.released.clear()
+        try:
+            with self.settings(MATCHER_CLASSES=[
+                'companieshouse.tests.sources.test_matcher_helper.WaitingFailMatcher',
+                'companieshouse.tests.sources.test_matcher_helper.JustPassMatcher',
+                'companieshouse.tests.sources.test_matcher_helper.BlockingPassMatcher',
+            ]):
+                helper = MatcherHelper()
+                futures = []
+                submit = helper.executor.submit
+
+                def submit_and_track(*args):
+                    futures.append(submit(*args))
+                    return futures[-1]
+
+                with mock.patch.object(helper.executor, 'submit', submit_and_track):
+                    best_match = helper.find_match('company name', 'SW1A 1AA', concurrent=True)
+
+                self.assertEqual(best_match.proximity, JustPassMatcher.proximity)
+                self.assertFalse(BlockingPassMatcher.released.is_set())
+                blocked_future = futures[-1]
+                self.assertFalse(blocked_future.done())
+        finally:
+            BlockingPassMatcher.released.set()
+
+        self.assertEqual(blocked_future.result(5).proximity, BlockingPassMatcher.proximity)
+
+    def test_no_findings_pass_acceptance_level(self):
+        with self.settings(MATCHER_CLASSES=[
+            'companieshouse.tests.sources.test_matcher_helper.AlwaysFailMatcher',
+            'companieshouse.tests.sources.test_matcher_helper.JustFailMatcher',
+        ]):
+            best_match = MatcherHelper().find_match('company name', 'SW1A 1AA', concurrent=True)
+            self.assertEqual(best_match, None)
+
+    def test_setting(self):
+        """
+        The concurrent mode should be used by default if MATCHER_CONCURRENT == True.
+        """
+        with self.settings(
+            MATCHER_CLASSES=[
+                'companieshouse.tests.sources.test_matcher_helper.AlwaysFailMatcher',
+                'companieshouse.tests.sources.test_matcher_helper.JustPassMatcher',
+            ],
+            MATCHER_CONCURRENT=True
+        ):
+            helper = MatcherHelper()
+            with mock.patch.object(helper, '_find_match_concurrently') as mocked_find_match_concurrently:
+                helper.find_match('company name', 'SW1A 1AA')
+                mocked_find_match_concurrently.assert_called_once_with('company name', 'SW1A 1AA')
+
+
+class FindMatchesTestCase(TestCase):
+    def setUp(self):
+        NameProximityMatcher.names = []
+
+    def test_input_order(self):
+        with self.settings(MATCHER_CLASSES=[
+            'companieshouse.tests.sources.test_matcher_helper.ConcurrentNameProximityMatcher',
+        ]):
+            names = ['1', '0', '0.9', '0.2', '0.5']
+            matches = list(MatcherHelper().find_matches((name, 'SW1A 1AA') for name in names))
+
+        self.assertEqual(
+            [match.company_number if match else None for match in matches],
+            ['1', None, '0.9', None, '0.5']
+        )
+
+    def test_only_pending_pairs_passed_on(self):
+        """
+        Each matcher class should only get the pairs not matched by the previous ones.
+        """
+        with self.settings(MATCHER_CLASSES=[
+            'companieshouse.tests.sources.test_matcher_helper.NameProximityMatcher',
+            'companieshouse.tests.sources.test_matcher_helper.NameProximityMatcher',
+        ]):
+            list(MatcherHelper().find_matches([('1', ''), ('0', ''), ('0.7', ''), ('0.1', '')]))
+
+        self.assertEqual(NameProximityMatcher.names, ['1', '0', '0.7', '0.1', '0', '0.1'])
+
+    def test_streaming(self):
+        """
+        Matches should be yielded batch by batch.
+        """
+        def get_pairs():
+            for name in ['1', '0.9', '0.8']:
+                yield name, ''
+
+        with self.settings(
+            MATCHER_CLASSES=['companieshouse.tests.sources.test_matcher_helper.NameProximityMatcher'],
+            MATCHER_BATCH_SIZE=2
+        ):
+            matches = MatcherHelper().find_matches(get_pairs())
+
+            self.assertEqual(next(matches).company_number, '1')
+            self.assertEqual(NameProximityMatcher.names, ['1', '0.9'])
+
+            self.assertEqual(next(matches).company_number, '0.9')
+            self.assertEqual(next(matches).company_number, '0.8')
+            self.assertEqual(NameProximityMatcher.names, ['1', '0.9', '0.8'])
+
+    def test_empty(self):
+        self.assertEqual(list(MatcherHelper().find_matches([])), [])
@@ -0,0 +1,127 @@
+import responses
+from unittest import mock
+
+from django.test.testcases import SimpleTestCase
+
+from companieshouse.sources.ratelimit import RateLimiter, ThrottledSession
+
+
+URL = 'http://api.example.com/search'
+
+
+@mock.patch('companieshouse.sources.ratelimit.time')
+class RateLimiterTestCase(SimpleTestCase):
+    def test_burst(self, mocked_time):
+        mocked_time.monotonic.return_value = 100
+        limiter = RateLimiter(2, burst=3)
+
+        self.assertEqual([limiter.wait() for index in range(3)], [0, 0, 0])
+        self.assertFalse(mocked_time.sleep.called)
+
+    def test_consecutive_slots(self, mocked_time):
+        """
+        Callers over the limit should wait for consecutive slots.
+        """
+        mocked_time.monotonic.return_value = 100
+        limiter = RateLimiter(2)
+
+        self.assertEqual([limiter.wait() for index in range(3)], [0, 0.5, 1])
+        mocked_time.sleep.assert_has_calls([mock.call(0.5), mock.call(1)])
+
+    def test_refill(self, mocked_time):
+        mocked_time.monotonic.return_value = 100
+        limiter = RateLimiter(2)
+        limiter.wait()
+
+        mocked_time.monotonic.return_value = 100.5
+        self.assertEqual(limiter.wait(), 0)
+
+        mocked_time.monotonic.return_value = 110
+        self.assertEqual(limiter.wait(), 0)
+        self.assertEqual(limiter.wait(), 0.5)  # the bucket doesn't fill up beyond `burst`
+
+    def test_processes(self, mocked_time):
+        """
+        Each process should only get its share of the rate.
+        """
+        mocked_time.monotonic.return_value = 100
+        limiter = RateLimiter(2, processes=4)
+
+        self.assertEqual([limiter.wait() for index in range(3)], [0, 2, 4])
+
+    def test_no_limit(self, mocked_time):
+        limiter = RateLimiter(None)
+
+        self.assertEqual([limiter.wait() for index in range(10)], [0] * 10)
+        self.assertFalse(mocked_time.sleep.called)
+
+
+@mock.patch('companieshouse.sources.ratelimit.time.sleep')
+class ThrottledSessionTestCase(SimpleTestCase):
+    def setUp(self):
+        super(ThrottledSessionTestCase, self).setUp()
+        self.session = ThrottledSession(RateLimiter(None), max_retries=3, backoff=1)
+
+    def add_responses(self, statuses, headers=None):
+        """
+        Responds with the status codes in `statuses` in order, the last one is used for any further request.
+        """
+        statuses = list(statuses)
+
+        def callback(request):
+            status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+            return status, headers or {}, '{}'
+
+        responses.add_callback(responses.GET, URL, callback=callback)
+
+    @responses.activate
+    def test_success(self, mocked_sleep):
+        self.add_responses([200])
+
+        self.assertEqual(self.session.get(URL).status_code, 200)
+        self.assertFalse(mocked_sleep.called)
+        self.assertEqual(self.session.stats, {'requests': 1, 'throttled_seconds': 0})
+
+    @responses.activate
+    def test_retry_with_backoff(self, mocked_sleep):
+        self.add_responses([503, 429, 200])
+
+        self.assertEqual(self.session.get(URL).status_code, 200)
+        mocked_sleep.assert_has_calls([mock.call(1), mock.call(2)])
+        self.assertEqual(
+            self.session.stats,
+            {'requests': 3, 'retries': 2, 'throttled_seconds': 0, 'backoff_seconds': 3}
+        )
+
+    @responses.activate
+    def test_retry_after(self, mocked_sleep):
+        self.add_responses([429, 200], headers={'Retry-After': '10'})
+
+        self.assertEqual(self.session.get(URL).status_code, 200)
+        mocked_sleep.assert_called_once_with(10)
+
+    @responses.activate
+    def test_max_retries(self, mocked_sleep):
+        """
+        After `max_retries` retries, the last response should be returned.
+        """
+        self.add_responses([500])
+
+        self.assertEqual(self.session.get(URL).status_code, 500)
+        self.assertEqual(len(responses.calls), 4)
+
+    @responses.activate
+    def test_client_errors_not_retried(self, mocked_sleep):
+        self.add_responses([404])
+
+        self.assertEqual(self.session.get(URL).status_code, 404)
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_throttled_time(self, mocked_sleep):
+        self.add_responses([200])
+        self.session.rate_limiter = mock.Mock(wait=mock.Mock(return_value=0.5))
+
+        self.session.get(URL)
+        self.session.get(URL)
+        self.assertEqual(self.session.stats['throttled_seconds'], 1)
@@ -1,6 +1,14 @@
+from array import array
+
+from django.conf import settings
+from django.test import override_settings
 from django.test.testcases import TestCase
 
-from companieshouse.sources.similarity import SimilarityCalculator, clean_postcode, clean_name
+from companieshouse.models import Company, NameToken
+from companieshouse.sources.similarity import (
+    SimilarityCalculator, BatchSimilarityCalculator, NameTokenWeights,
+    clean_postcode, clean_name, get_postcode_district, get_normalised_values
+)
 
 
 class CleanPostcodeTestCase(TestCase):
@@ -29,6 +37,23 @@ class CleanPostcodeTestCase(TestCase):
         )
 
 
+class GetPostcodeDistrictTestCase(TestCase):
+    def test_empty(self):
+        self.assertEqual(get_postcode_district(''), '')
+
+    def test_None(self):
+        self.assertEqual(get_postcode_district(None), '')
+
+    def test_correct(self):
+        self.assertEqual(get_postcode_district('SW1A 1AA'), 'sw1a')
+        self.assertEqual(get_postcode_district('E1 6AN'), 'e1')
+        self.assertEqual(get_postcode_district('M601NW'), 'm60')
+
+    def test_invalid(self):
+        self.assertEqual(get_postcode_district('SW1A'), '')
+        self.assertEqual(get_postcode_district('SW1A 1AA 1AA'), '')
+
+
 class CleanNameTestCase(TestCase):
     def test_empty(self):
         self.assertEqual(
@@ -55,6 +80,20 @@ class CleanNameTestCase(TestCase):
         )
 
 
+class GetNormalisedValuesTestCase(TestCase):
+    def test_values(self):
+        self.assertEqual(
+            get_normalised_values('The CompaNy.  lTd', 'SW1A 1AA'),
+            {'name_normalised': 'company', 'postcode_normalised': 'sw1a1aa', 'postcode_district': 'sw1a'}
+        )
+
+    def test_empty(self):
+        self.assertEqual(
+            get_normalised_values(None, None),
+            {'name_normalised': '', 'postcode_normalised': '', 'postcode_district': ''}
+        )
+
+
 class SimilarityCalculatorTestCase(TestCase):
     def setUp(self):
         self.calc = SimilarityCalculator()
@@ -69,7 +108,7 @@ class SimilarityCalculatorTestCase(TestCase):
         """n1 ~ n2 AND p1 = p2 => (>0.5)"""
         self.calc.analyse_names('another test', 'some test something')
         self.calc.analyse_postcodes('SW1A 1AA', 'sw1a1aa')
-        self.assertEqual(self.calc.get_proximity(), 0.74)
+        self.assertEqual(self.calc.get_proximity(), 0.8)
 
     def test_different_names_and_exact_postcodes(self):
         """n1 != n2 AND p1 = p2 => (<0.5)"""
@@ -90,16 +129,16 @@ class SimilarityCalculatorTestCase(TestCase):
         self.assertEqual(self.calc.get_proximity(), 0.53)
 
     def test_similar_names_and_similar_postcodes(self):
-        """n1 ~ n2 AND p1 ~ p2 => 0.5"""
+        """n1 ~ n2 AND p1 ~ p2 => (>0.5)"""
         self.calc.analyse_names('another test', 'some test something')
         self.calc.analyse_postcodes('SW1A 1AA', 'sw1a5ab')
-        self.assertEqual(self.calc.get_proximity(), 0.5)
+        self.assertEqual(self.calc.get_proximity(), 0.57)
 
     def test_similar_names_and_different_postcodes(self):
         """n1 ~ n2 AND p1 != p2 => (<0.5)"""
         self.calc.analyse_names('another test', 'some test something')
         self.calc.analyse_postcodes('SW1A 1AA', 'w1a5ab')
-        self.assertEqual(self.calc.get_proximity(), 0.26)
+        self.assertEqual(self.calc.get_proximity(), 0.33)
 
     def test_different_names_and_similar_postcodes(self):
         """n1 != n2 AND p1 ~ p2 => (<0.5)"""
@@ -125,6 +164,40 @@ class SimilarityCalculatorTestCase(TestCase):
         )
         self.assertEqual(self.calc.get_proximity(), 0.79)
 
+    def test_names_graded_by_shared_tokens(self):
+        """the more tokens two names share, the closer they are"""
+        proximities = [
+            self.calc._get_names_proximity('acme trading services', other_name)
+            for other_name in ['acme trading services ltd', 'acme trading', 'acme', 'other']
+        ]
+        self.assertEqual([round(proximity, 2) for proximity in proximities], [1, 0.83, 0.67, 0])
+
+    def test_names_with_token_weights(self):
+        """sharing a distinctive token counts more than sharing a common one"""
+        calc = SimilarityCalculator(
+            token_weights=NameTokenWeights(frequencies={'services': 999}, total=1000)
+        )
+        self.assertGreater(
+            calc._get_names_proximity('acme services', 'acme trading'),
+            calc._get_names_proximity('acme services', 'other services'),
+        )
+
+    def test_acceptance_boundary(self):
+        """
+        names sharing any token (even a common one) and the postcode are accepted, names sharing nothing are not
+        """
+        calc = SimilarityCalculator(
+            token_weights=NameTokenWeights(frequencies={'services': 999}, total=1000)
+        )
+        calc.analyse_names('acme services', 'other services')
+        calc.analyse_postcodes('SW1A 1AA', 'sw1a1aa')
+        self.assertGreaterEqual(calc.get_proximity(), settings.MATCHER_ACCEPTANCE_PROXIMITY)
+
+        calc = SimilarityCalculator()
+        calc.analyse_names('acme services', 'other trading')
+        calc.analyse_postcodes('SW1A 1AA', 'sw1a1aa')
+        self.assertLess(calc.get_proximity(), settings.MATCHER_ACCEPTANCE_PROXIMITY)
+
     def test_raises_exception_names_not_analysed(self):
         self.calc.analyse_postcodes('SW1A 1AA', 'sw1a1aa')
         self.assertRaises(AssertionError, self.calc.get_proximity)
@@ -132,3 +205,105 @@ class SimilarityCalculatorTestCase(TestCase):
     def test_raises_exception_postcodes_not_analysed(self):
         self.calc.analyse_names('test', 'test')
         self.assertRaises(AssertionError, self.calc.get_proximity)
+
+
+class BatchSimilarityCalculatorTestCase(TestCase):
+    NAME = 'another test'
+    POSTCODE = 'SW1A 1AA'
+    CANDIDATES = [
+        ('another test', 'sw1a1aa'),
+        ('The Another Test Ltd.', 'SW1A 1AB'),
+        ('some test something', 'SW1A 1AA'),
+        ('some test something', 'w1a5ab'),
+        ('name1 part1', 'SW1A 1AA'),
+        ('name1 part1', None),
+        ('', ''),
+    ]
+
+    def get_legacy_proximity(self, name, postcode):
+        calc = SimilarityCalculator()
+        calc.analyse_names(self.NAME, name)
+        calc.analyse_postcodes(self.POSTCODE, postcode)
+        return calc.get_proximity()
+
+    def test_same_as_similarity_calculator(self):
+        calc = BatchSimilarityCalculator(self.NAME, self.POSTCODE)
+
+        self.assertEqual(
+            list(calc.get_proximities(self.CANDIDATES)),
+            [self.get_legacy_proximity(name, postcode) for name, postcode in self.CANDIDATES]
+        )
+        self.assertEqual(
+            list(calc.get_proximities(self.CANDIDATES)),
+            [1, 0.76, 0.8, 0.33, 0.47, 0, 0]
+        )
+
+    def test_normalised(self):
+        calc = BatchSimilarityCalculator(self.NAME, self.POSTCODE)
+        normalised_candidates = [(clean_name(name), clean_postcode(postcode)) for name, postcode in self.CANDIDATES]
+
+        self.assertEqual(
+            list(calc.get_proximities(normalised_candidates, normalised=True)),
+            list(calc.get_proximities(self.CANDIDATES))
+        )
+
+    def test_one(self):
+        calc = BatchSimilarityCalculator(self.NAME, self.POSTCODE)
+
+        self.assertEqual(calc.get_proximity('some test something', 'sw1a1aa'), 0.8)
+
+    def test_without_postcode(self):
+        calc = BatchSimilarityCalculator(self.NAME, None)
+
+        self.assertEqual(calc.get_proximity('another test', ''), 0.53)
+
+    def test_empty(self):
+        calc = BatchSimilarityCalculator(self.NAME, self.POSTCODE)
+
+        self.assertEqual(calc.get_proximities([]), array('d'))
+
+
+class NameTokenWeightsTestCase(TestCase):
+    def setUp(self):
+        self.weights = NameTokenWeights(frequencies={'services': 500, 'uk': 100}, total=1000)
+
+    def test_common_tokens_weigh_less(self):
+        self.assertLess(self.weights.get_weight('services'), self.weights.get_weight('uk'))
+        self.assertLess(self.weights.get_weight('uk'), self.weights.get_weight('acme'))
+
+    def test_unknown_tokens_are_rare(self):
+        self.assertEqual(self.weights.get_weight('acme'), self.weights.get_weight('other'))
+        self.assertEqual(
+            self.weights.get_weight('acme'),
+            NameTokenWeights(frequencies={'acme': 1}, total=1000).get_weight('acme')
+        )
+
+    def test_proximity(self):
+        weights = NameTokenWeights(frequencies={}, total=0)  # all tokens weigh the same
+
+        self.assertEqual(weights.get_proximity({'a', 'b'}, {'b', 'c', 'd'}), 0.25)
+        self.assertEqual(weights.get_proximity({'a', 'b'}, {'b', 'a'}), 1)
+        self.assertEqual(weights.get_proximity({'a'}, {'b'}), 0)
+        self.assertEqual(weights.get_proximity(set(), set()), 0)
+
+    @override_settings(NAME_TOKEN_WEIGHTS=True)
+    def test_load(self):
+        for index in range(3):
+            Company.objects.create(number='{:08}'.format(index), name='company {}'.format(index), raw={})
+        NameToken.objects.create(token='company', frequency=3)
+
+        weights = NameTokenWeights()
+        with self.assertNumQueries(2):
+            weights.get_weight('company')
+            weights.get_weight('other')
+
+        self.assertEqual(weights.total, 3)
+        self.assertEqual(weights.frequencies, {'company': 3})
+
+    @override_settings(NAME_TOKEN_WEIGHTS=False)
+    def test_load_disabled(self):
+        NameToken.objects.create(token='company', frequency=3)
+
+        weights = NameTokenWeights()
+        with self.assertNumQueries(0):
+            self.assertEqual(weights.get_weight('company'), weights.get_weight('other'))
@@ -3,7 +3,8 @@ import datetime
 from django.test.testcases import TestCase
 from django_countries import countries
 
-from companieshouse.models import Company, CompanySicCode
+from companieshouse.models import Company, CompanySicCode, CompanyPreviousName
+from companieshouse.sources.similarity import clean_name, clean_postcode, get_postcode_district
 
 
 FULL_DATA = {
@@ -88,6 +89,13 @@ class BaseFromCHTestCasea(TestCase):
         self.assertEqual(company.address_line1, registered_office_address.get('address_line_1', ''))
         self.assertEqual(company.address_line2, registered_office_address.get('address_line_2', ''))
         self.assertEqual(company.postcode, registered_office_address.get('postal_code', ''))
+        self.assertEqual(company.name_normalised, clean_name(data['company_name']))
+        self.assertEqual(
+            company.postcode_normalised, clean_postcode(registered_office_address.get('postal_code', ''))
+        )
+        self.assertEqual(
+            company.postcode_district, get_postcode_district(registered_office_address.get('postal_code', ''))
+        )
         self.assertEqual(company.region, registered_office_address.get('region', ''))
         self.assertEqual(company.locality, registered_office_address.get('locality', ''))
 
@@ -205,3 +213,90 @@ class UpdateFromCHTestCase(BaseFromCHTestCasea):
         self.assert_company(company, data)
         self.assert_sic_codes(company, [])
         self.assert_previous_names(company, [])
+
+
+class RowHashFromCHTestCase(BaseFromCHTestCasea):
+    def test_set(self):
+        company = Company.objects.update_from_CH_data(dict(MINIMAL_DATA), row_hash=10)
+
+        self.assertEqual(Company.objects.get(number=company.number).row_hash, 10)
+
+    def test_reset(self):
+        """
+        Updating from data other than a csv row resets the row hash so that the next import doesn't skip the company.
+        """
+        Company.objects.create(number='00000001', name='old name', raw={}, row_hash=10)
+
+        Company.objects.update_from_CH_data(dict(MINIMAL_DATA))
+
+        self.assertEqual(Company.objects.get(number='00000001').row_hash, None)
+
+
+class SyncChildrenTestCase(TestCase):
+    def setUp(self):
+        self.company1 = Company.objects.create(number='00000001', name='company 1', raw={})
+        self.company2 = Company.objects.create(number='00000002', name='company 2', raw={})
+
+        self.sic_code1 = self.company1.companysiccode_set.create(code='91040')
+        self.sic_code2 = self.company1.companysiccode_set.create(code='07210')
+        self.sic_code3 = self.company2.companysiccode_set.create(code='07210')
+
+    def test_diff(self):
+        """
+        Unchanged children are kept, stale ones deleted and missing ones created.
+        """
+        with self.assertNumQueries(3):
+            created, deleted = CompanySicCode.objects.sync({
+                '00000001': [('91040',), ('2040',)],
+                '00000002': [],
+            })
+
+        self.assertEqual((created, deleted), (1, 2))
+        self.assertEqual(
+            sorted(self.company1.companysiccode_set.values_list('code', flat=True)),
+            ['2040', '91040']
+        )
+        self.assertTrue(CompanySicCode.objects.filter(id=self.sic_code1.id).exists())
+        self.assertEqual(self.company2.companysiccode_set.count(), 0)
+
+    def test_unchanged(self):
+        with self.assertNumQueries(1):
+            created, deleted = CompanySicCode.objects.sync({
+                '00000001': [('07210',), ('91040',)],
+            })
+
+        self.assertEqual((created, deleted), (0, 0))
+        self.assertEqual(CompanySicCode.objects.count(), 3)
+
+    def test_duplicates(self):
+        CompanySicCode.objects.sync({
+            '00000001': [('91040',), ('91040',)],
+        })
+
+        self.assertEqual(
+            list(self.company1.companysiccode_set.values_list('code', flat=True)),
+            ['91040', '91040']
+        )
+
+    def test_values_converted(self):
+        """
+        Values are compared after being converted to their python type so that e.g.
+        dates as strings don't cause the previous names to be re-created.
+        """
+        previous_name = self.company1.companypreviousname_set.create(
+            name='previous name', change_date=datetime.date(1999, 12, 1)
+        )
+
+        created, deleted = CompanyPreviousName.objects.sync({
+            '00000001': [('1999-12-1', 'previous name')],
+        })
+
+        self.assertEqual((created, deleted), (0, 0))
+        self.assertEqual(
+            list(self.company1.companypreviousname_set.values_list('id', flat=True)),
+            [previous_name.id]
+        )
+
+    def test_empty(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(CompanySicCode.objects.sync({}), (0, 0))
@@ -27,3 +27,19 @@ class CleanCountryTestCase(TestCase):
             clean_country(''),
             None
         )
+
+    def test_aliases(self):
+        for country in ['England', 'GREAT BRITAIN', 'Scotland', 'wales', 'Northern Ireland', 'UK']:
+            self.assertEqual(clean_country(country), 'GB')
+
+    def test_extra_whitespaces(self):
+        self.assertEqual(
+            clean_country(' United  Kingdom '),
+            'GB'
+        )
+
+    def test_non_uk(self):
+        self.assertEqual(
+            clean_country('france'),
+            'FR'
+        )
@@ -1,21 +1,46 @@
+from django.utils.functional import cached_property
+
 from django_countries import Countries
 
 
 class CountryCleaner(object):
     """
     Used to clean countries so that they match the official ISO 3166-1 list.
-    The main difference is that it ignores case sensitivity.
+    The main difference is that it ignores case sensitivity and that it accepts a few common aliases
+    used in the CH data (e.g. England, Great Britain).
+
+    The lookup dict of case-folded names is built once, the first time it's needed.
     """
+    ALIASES = {
+        'uk': 'GB',
+        'united kingdom': 'GB',
+        'great britain': 'GB',
+        'england': 'GB',
+        'wales': 'GB',
+        'scotland': 'GB',
+        'northern ireland': 'GB',
+        'england & wales': 'GB',
+        'england and wales': 'GB',
+    }
+
     def __init__(self):
         self.countries = Countries()
 
+    def normalise(self, country):
+        return ' '.join(country.split()).casefold()
+
+    @cached_property
+    def codes_by_name(self):
+        codes_by_name = {
+            self.normalise(alias): code for alias, code in self.ALIASES.items()
+        }
+        codes_by_name.update(
+            (self.normalise(str(name)), code) for code, name in self.countries
+        )
+        return codes_by_name
+
     def clean(self, country):
         if not country:
             return None
-        country = country.lower()
-
-        for code, name in self.countries:
-            if name.lower() == country:
-                return code
-        return None
+        return self.codes_by_name.get(self.normalise(country))
 clean_country = CountryCleaner().clean
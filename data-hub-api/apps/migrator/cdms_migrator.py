@@ -11,6 +11,13 @@ class BaseCDMSMigrator(object):
     def __init__(self):
         self.all_fields = self.build_filters()
 
+        # {field_name: (cdms_name, to_cdms_value)}
+        self.to_cdms_mapping = {
+            field_name: (cdms_field.cdms_name, cdms_field.to_cdms_value)
+            for field_name, cdms_field in self.all_fields.items()
+        }
+        self._model_mappings = {}  # {model: ([(field_name, cdms_name, converter), ...], [...])}
+
     def build_filters(self):
         all_fields = {
             'modified': cdms_fields.DateTimeField('ModifiedOn')
@@ -52,32 +59,51 @@ class BaseCDMSMigrator(object):
 
         return cdms_field
 
+    def get_model_mappings(self, model):
+        """
+        Returns the tuple (from_cdms, to_cdms) of lists of (field_name, cdms_name, converter)
+        for the mapped fields of `model` in field order.
+
+        The lists are built once per model class so that converting objects doesn't have to look up
+        and skip non-mapped fields for every row.
+        """
+        mappings = self._model_mappings.get(model)
+        if mappings is None:
+            from_cdms = []
+            to_cdms = []
+            for field in model._meta.fields:
+                cdms_field = self.all_fields.get(field.name)
+                if not cdms_field:
+                    continue
+
+                from_cdms.append((field.name, cdms_field.cdms_name, cdms_field.from_cdms_value))
+                to_cdms.append((field.name, cdms_field.cdms_name, cdms_field.to_cdms_value))
+
+            mappings = (from_cdms, to_cdms)
+            self._model_mappings[model] = mappings
+        return mappings
+
     def update_cdms_data_from_local(self, local_obj, cdms_data):
-        values = [
-            (field.name, getattr(local_obj, field.name)) for field in local_obj._meta.fields
-        ]
-        return self.update_cdms_data_from_values(values, cdms_data)
+        _, to_cdms = self.get_model_mappings(local_obj.__class__)
+        for field_name, cdms_name, to_cdms_value in to_cdms:
+            cdms_data[cdms_name] = to_cdms_value(getattr(local_obj, field_name))
+        return cdms_data
 
     def update_cdms_data_from_values(self, values, cdms_data):
+        to_cdms_mapping = self.to_cdms_mapping
         for field_name, value in values:
-            try:
-                cdms_field = self.get_cdms_field(field_name)
-            except NotMappingFieldException:
+            mapping = to_cdms_mapping.get(field_name)
+            if not mapping:
                 continue
 
-            value = cdms_field.to_cdms_value(value)
-            cdms_data[cdms_field.cdms_name] = value
+            cdms_name, to_cdms_value = mapping
+            cdms_data[cdms_name] = to_cdms_value(value)
         return cdms_data
 
     def update_local_from_cdms_data(self, local_obj, cdms_data, cdms_known_related_objects={}):
-        for field in local_obj._meta.fields:
-            field_name = field.name
-            try:
-                cdms_field = self.get_cdms_field(field_name)
-            except NotMappingFieldException:
-                continue
-
-            value = cdms_field.from_cdms_value(cdms_data[cdms_field.cdms_name])
+        from_cdms, _ = self.get_model_mappings(local_obj.__class__)
+        for field_name, cdms_name, from_cdms_value in from_cdms:
+            value = from_cdms_value(cdms_data[cdms_name])
             if field_name in cdms_known_related_objects:
                 related_obj = cdms_known_related_objects.get(field_name, {}).get(value.cdms_pk)
 
@@ -4,3 +4,10 @@ class NotMappingFieldException(Exception):
 
 class ObjectsNotInSyncException(Exception):
     pass
+
+
+class EmptyFilterException(Exception):
+    """
+    Used when a filter can't match anything (e.g. `field__in=[]`) so CDMS doesn't need to be called.
+    """
+    pass
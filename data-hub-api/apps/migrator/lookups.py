@@ -1,16 +1,22 @@
 import datetime
+from collections import OrderedDict
+from functools import lru_cache
 from numbers import Number
 
 from django.utils import tree
 
 from .models import CDMSModel
+from .exceptions import EmptyFilterException
 
 
 class Lookup(object):
     AND = 'AND'
     OR = 'OR'
+    IN = 'in'
+    ISNULL = 'isnull'
     EXPRS = {
         'exact': '{field} eq {value}',
+        'in': '{field} eq {value}',  # applied to each value and chained in OR
         'iexact': '{field} eq {value}',
         'lt': '{field} lt {value}',
         'lte': '{field} le {value}',
@@ -28,6 +34,7 @@ class Lookup(object):
         'hour': 'hour({field}) eq {value}',
         'minute': 'minute({field}) eq {value}',
         'second': 'second({field}) eq {value}',
+        'isnull': '{field} {value} null',  # value: 'eq' if isnull else 'ne'
     }
 
     def __init__(self, field, expr, value):
@@ -35,6 +42,19 @@ class Lookup(object):
         self.expr = expr
         self.value = value
 
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def get_template(cls, field, expr):
+        """
+        Returns the filter template for `field` and `expr` with only the `{value}` placeholder left.
+        Templates are cached per (field, expr) and shared by all the lookups so that only the value
+        has to be converted and substituted when building a lookup filter string.
+        """
+        cdms_expr = cls.EXPRS.get(expr)
+        if not cdms_expr:
+            raise NotImplementedError('Expression %s not recognised yet' % expr)
+        return cdms_expr.format(field=field, value='{value}')
+
     def convert_value(self, value):
         if isinstance(value, Number):
             return value
@@ -46,11 +66,27 @@ class Lookup(object):
         return "'{value}'".format(value=value)
 
     def as_filter_string(self):
-        cdms_expr = self.EXPRS.get(self.expr)
-        if not cdms_expr:
-            raise NotImplementedError('Expression %s not recognised yet' % self.expr)
+        template = self.get_template(self.field, self.expr)
+        if self.expr == self.IN:
+            return self._as_in_filter_string(template)
+        if self.expr == self.ISNULL:
+            return template.format(value='eq' if self.value else 'ne')
+        return template.format(value=self.convert_value(self.value))
 
-        return cdms_expr.format(field=self.field, value=self.convert_value(self.value))
+    def _as_in_filter_string(self, template):
+        """
+        CDMS doesn't support `in` so the lookup gets translated into a chain of `eq` in OR.
+        None values are ignored as in Django (`field = NULL` can never be true).
+        """
+        filters = list(OrderedDict.fromkeys(
+            template.format(value=self.convert_value(value)) for value in self.value if value is not None
+        ))
+        if not filters:
+            raise EmptyFilterException('No values given to the in lookup of {0}'.format(self.field))
+
+        if len(filters) == 1:
+            return filters[0]
+        return '(%s)' % ' or '.join(filters)
 
 
 class FilterNode(tree.Node):
@@ -60,14 +96,91 @@ class FilterNode(tree.Node):
     Technically a tree with FilterNode as nodes and leaves as python objects with a `as_filter_string` method.
 
     See tests for examples of how to use it.
+
+    The filter string is cached on the node instance after being built and the cache is reset when
+    the node changes so children should not be changed after being added to a node.
+    Only the lookup templates (see `Lookup.get_template`) are shared between nodes: the filter string
+    of a new node (e.g. of a new queryset) is always built, and its siblings sorted, from scratch.
     """
+    _filter_string = None  # class attr as tree.Node._new_instance doesn't call __init__
+
+    def add(self, *args, **kwargs):
+        self._filter_string = None
+        return super(FilterNode, self).add(*args, **kwargs)
+
+    def negate(self):
+        self._filter_string = None
+        super(FilterNode, self).negate()
+
+    def reset_filter_string(self):
+        self._filter_string = None
 
     def as_filter_string(self):
+        if self._filter_string is None:
+            self._filter_string = self._build_filter_string()
+        return self._filter_string
+
+    def get_in_lookup_path(self):
+        """
+        Returns the path [node, ..., lookup] to the `in` lookup with the most values which is not
+        in a negated branch or None if there isn't any.
+
+        Such lookup can be split into multiple filters with the union of their results being the
+        same as the results of the original filter.
+        """
+        if self.negated:
+            return None
+
+        best_path = None
+        for child in self.children:
+            if isinstance(child, FilterNode):
+                path = child.get_in_lookup_path()
+            elif isinstance(child, Lookup) and child.expr == Lookup.IN:
+                path = [child]
+            else:
+                continue
+
+            if path and (not best_path or len(path[-1].value) > len(best_path[-1].value)):
+                best_path = path
+
+        if not best_path:
+            return None
+        return [self] + best_path
+
+    def _empty_filter_string(self):
+        if self.negated:
+            return ''  # not (nothing) => everything
+        raise EmptyFilterException('The filter cannot match anything')
+
+    def _everything_filter_string(self):
+        if self.negated:
+            raise EmptyFilterException('The filter cannot match anything')  # not (everything) => nothing
+        return ''
+
+    def _build_filter_string(self):
         result = []
+        tot_empty = 0
         for child in self.children:
-            filter_string = child.as_filter_string()
-            if filter_string:
-                result.append(filter_string)
+            try:
+                filter_string = child.as_filter_string()
+            except EmptyFilterException:
+                if self.connector == Lookup.AND:
+                    return self._empty_filter_string()
+                tot_empty += 1
+                continue
+
+            if not filter_string:  # the child matches everything
+                if self.connector == Lookup.OR:
+                    return self._everything_filter_string()
+                continue
+            result.append(filter_string)
+
+        if tot_empty and tot_empty == len(self.children):
+            return self._empty_filter_string()
+
+        if not result and self.children:  # all the children match everything
+            return self._everything_filter_string()
+
         conn = ' %s ' % self.connector
         filters_string = conn.lower().join(sorted(result))
 
@@ -1,7 +1,13 @@
 import sys
+import math
 import warnings
 import datetime
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
+from requests.utils import requote_uri
+
+from django.conf import settings
 from django.db import transaction, models
 from django.db.models.sql.query import get_field_names_from_opts, get_order_dir
 from django.db.models.constants import LOOKUP_SEP
@@ -14,7 +20,7 @@ from reversion import revisions as reversion
 from cdms_api.connection import rest_connection
 
 from .models import CDMSModel
-from .exceptions import NotMappingFieldException
+from .exceptions import NotMappingFieldException, EmptyFilterException
 from .lookups import FilterNode, Lookup
 
 
@@ -68,16 +74,91 @@ class CDMSSelectCompiler(CDMSCompiler):
             )
         return cdms_orderby
 
-    def execute(self):
-        if self.query.empty:
-            return []
+    def is_filter_string_too_long(self, filter_string):
+        return len(requote_uri(filter_string)) > settings.CDMS_MAX_FILTER_LENGTH
 
+    def get_filters_chunks(self):
+        """
+        Returns the list of filter strings to be used to get the results, normally just one.
+
+        If the filter string is too long for CDMS, the `in` lookup with the most values is split in chunks
+        so that each filter string fits and the union of their results is the result of the original filter.
+        """
+        filters = self.get_filters()
+        if not self.is_filter_string_too_long(filters):
+            return [filters]
+
+        path = self.query.filters.get_in_lookup_path()
+        if not path:
+            return [filters]
+
+        nodes, lookup = path[:-1], path[-1]
+        original_value = lookup.value
+        values = list(original_value)
+
+        tot_chunks = 2
+        try:
+            while True:
+                chunk_size = math.ceil(len(values) / tot_chunks)
+
+                chunks = []
+                for index in range(0, len(values), chunk_size):
+                    lookup.value = values[index:index + chunk_size]
+                    for node in nodes:
+                        node.reset_filter_string()
+                    chunks.append(self.get_filters())
+
+                if chunk_size == 1 or not any(self.is_filter_string_too_long(chunk) for chunk in chunks):
+                    return chunks
+                tot_chunks *= 2
+        finally:
+            lookup.value = original_value
+            for node in nodes:
+                node.reset_filter_string()
+
+    def get_results(self, filters, order_by):
         return rest_connection.list(
             self.get_service(),
-            filters=self.get_filters(),
-            order_by=self.get_order_by()
+            filters=filters,
+            order_by=order_by
         )
 
+    def execute(self):
+        """
+        Returns the results of the query.
+
+        If the filter string has been split (see `get_filters_chunks`), the chunks are requested concurrently
+        and their results merged in chunk order without duplicates. CDMS pages the results of each request
+        (50 by default) so a split query can return up to 50 results per chunk instead of 50 in total and
+        the merged results are only ordered within each chunk.
+        """
+        if self.query.empty:
+            return []
+
+        try:
+            filters_chunks = self.get_filters_chunks()
+        except EmptyFilterException:
+            return []
+
+        get_results = functools.partial(self.get_results, order_by=self.get_order_by())
+        if len(filters_chunks) == 1:
+            return get_results(filters_chunks[0])
+
+        # the filters have been split so get all the chunks concurrently and merge the results
+        with ThreadPoolExecutor(max_workers=settings.CDMS_MAX_CONCURRENT_REQUESTS) as executor:
+            chunks_results = list(executor.map(get_results, filters_chunks))
+
+        migrator = self.get_migrator()
+        results = []
+        cdms_pks = set()
+        for chunk_results in chunks_results:
+            for result in chunk_results:
+                cdms_pk = migrator.get_cdms_pk(result)
+                if cdms_pk not in cdms_pks:
+                    cdms_pks.add(cdms_pk)
+                    results.append(result)
+        return results
+
 
 class CDMSInsertCompiler(CDMSCompiler):
     def execute(self):
@@ -322,11 +403,22 @@ class CDMSQuery(object):
                 break
         return path, final_field, targets, names[pos + 1:]
 
-    def build_filter(self, filter_expr, branch_negated=False, current_negated=False, connector=None):
-        arg, value = filter_expr
-        lookups, parts, reffed_expression = self.solve_lookup_type(arg)
+    def resolve_lookup(self, lookup):
+        """
+        Returns (lookup_type, cdms_field_name, is_relation) for the lookup (eg: 'foobar__icontains').
+
+        The field path resolution only depends on the model and the lookup so the result is
+        memoised per (model, lookup) instead of being recalculated for every filter() call.
+        """
+        return self._resolve_model_lookup(self.model, lookup)
+
+    @classmethod
+    @functools.lru_cache(maxsize=1024)
+    def _resolve_model_lookup(cls, model, lookup):
+        return cls(model)._resolve_lookup(lookup)
 
-        value, lookups = self.prepare_lookup_value(value, lookups)
+    def _resolve_lookup(self, lookup):
+        lookups, parts, reffed_expression = self.solve_lookup_type(lookup)
 
         if len(lookups) != 1:
             raise NotImplementedError('Only one lookup implemented at the moment')
@@ -342,12 +434,29 @@ class CDMSQuery(object):
         cdms_field = self.model.cdms_migrator.get_cdms_field(field_name)
 
         if field.is_relation:
-            if not isinstance(value, CDMSModel):
-                raise NotImplementedError('Please use an object as value of relation fields')
             cdms_field_name = '{field}/Id'.format(field=cdms_field.cdms_name)
         else:
             cdms_field_name = cdms_field.cdms_name
 
+        return lookups[0], cdms_field_name, field.is_relation
+
+    def build_filter(self, filter_expr, branch_negated=False, current_negated=False, connector=None):
+        arg, value = filter_expr
+        lookup_type, cdms_field_name, is_relation = self.resolve_lookup(arg)
+
+        value, lookups = self.prepare_lookup_value(value, [lookup_type])
+
+        if lookups[0] == Lookup.IN:
+            value = list(value)
+            values = value
+        elif lookups[0] == Lookup.ISNULL:
+            values = []
+        else:
+            values = [value]
+
+        if is_relation and not all(isinstance(val, CDMSModel) for val in values):
+            raise NotImplementedError('Please use an object as value of relation fields')
+
         return Lookup(cdms_field_name, lookups[0], value)
 
     def prepare_lookup_value(self, value, lookups):
@@ -357,7 +466,10 @@ class CDMSQuery(object):
         # Interpret '__exact=None' as the sql 'is NULL'; otherwise, reject all
         # uses of None as a query value.
         if value is None:
-            raise NotImplementedError('Cannot use None as value, not implemented yet')
+            if lookups[-1] not in ('exact', 'iexact'):
+                raise ValueError('Cannot use None as a query value')
+            lookups[-1] = Lookup.ISNULL
+            value = True
         elif hasattr(value, 'resolve_expression'):
             raise NotImplementedError('Can only use raw values, anything else has not been implemented yet')
 
@@ -1,7 +1,10 @@
-from unittest import skip, mock
+from unittest import mock
 
+from django.db.models import Q
+from django.test import override_settings
 from django.utils import timezone
 
+from migrator.query import CDMSQuery, CDMSSelectCompiler
 from migrator.tests.models import SimpleObj
 from migrator.tests.base import BaseMockedCDMSRestApiTestCase
 
@@ -46,9 +49,40 @@ class FilterLookupsTestCase(BaseMockedCDMSRestApiTestCase):
         self.assertAPINotCalled(['create', 'update', 'delete', 'get'])
 
     def test_in(self):
-        self.assertRaises(
-            NotImplementedError,
-            list, SimpleObj.objects.filter(name__in=['something', 'something else'])
+        list(SimpleObj.objects.filter(name__in=['something', 'something else']))
+
+        self.assertAPIListCalled(
+            SimpleObj, kwargs={'filters': "(Name eq 'something' or Name eq 'something else')"}
+        )
+        self.assertAPINotCalled(['create', 'update', 'delete', 'get'])
+
+    def test_in_empty(self):
+        """
+        An empty `in` cannot match anything so cdms should not get called.
+        """
+        list(SimpleObj.objects.filter(name__in=[]))
+
+        self.assertNoAPICalled()
+
+    def test_in_None(self):
+        """
+        None values in an `in` are ignored as in Django.
+        """
+        list(SimpleObj.objects.filter(name__in=['something', None]))
+
+        self.assertAPIListCalled(
+            SimpleObj, kwargs={'filters': "Name eq 'something'"}
+        )
+        self.assertAPINotCalled(['create', 'update', 'delete', 'get'])
+
+    def test_in_empty_negated_in_OR(self):
+        """
+        something OR not (nothing) => everything
+        """
+        list(SimpleObj.objects.filter(Q(name='something') | ~Q(int_field__in=[])))
+
+        self.assertAPIListCalled(
+            SimpleObj, kwargs={'filters': ''}
         )
         self.assertAPINotCalled(['create', 'update', 'delete', 'get'])
 
@@ -179,11 +213,51 @@ class FilterLookupsTestCase(BaseMockedCDMSRestApiTestCase):
         )
         self.assertAPINotCalled(['create', 'update', 'delete', 'get'])
 
-    @skip('TODO we should probably support this')
     def test_isnull(self):
-        self.assertRaises(
-            NotImplementedError,
-            list, SimpleObj.objects.filter(dt_field__isnull=True)
+        list(SimpleObj.objects.filter(dt_field__isnull=True))
+
+        self.assertAPIListCalled(
+            SimpleObj, kwargs={'filters': "DateTimeField eq null"}
+        )
+        self.assertAPINotCalled(['create', 'update', 'delete', 'get'])
+
+    def test_isnull_false(self):
+        list(SimpleObj.objects.filter(dt_field__isnull=False))
+
+        self.assertAPIListCalled(
+            SimpleObj, kwargs={'filters': "DateTimeField ne null"}
+        )
+        self.assertAPINotCalled(['create', 'update', 'delete', 'get'])
+
+    def test_exact_None(self):
+        list(SimpleObj.objects.filter(int_field=None))
+
+        self.assertAPIListCalled(
+            SimpleObj, kwargs={'filters': "IntField eq null"}
+        )
+        self.assertAPINotCalled(['create', 'update', 'delete', 'get'])
+
+    def test_exclude_None(self):
+        list(SimpleObj.objects.exclude(int_field=None))
+
+        self.assertAPIListCalled(
+            SimpleObj, kwargs={'filters': "not (IntField eq null)"}
+        )
+        self.assertAPINotCalled(['create', 'update', 'delete', 'get'])
+
+    def test_fk_isnull(self):
+        list(SimpleObj.objects.filter(fk_obj__isnull=True))
+
+        self.assertAPIListCalled(
+            SimpleObj, kwargs={'filters': "FKField/Id eq null"}
+        )
+        self.assertAPINotCalled(['create', 'update', 'delete', 'get'])
+
+    def test_fk_None(self):
+        list(SimpleObj.objects.filter(fk_obj=None))
+
+        self.assertAPIListCalled(
+            SimpleObj, kwargs={'filters': "FKField/Id eq null"}
         )
         self.assertAPINotCalled(['create', 'update', 'delete', 'get'])
 
@@ -243,3 +317,114 @@ class FilterInvalidValuesForLookupsTestCase(BaseMockedCDMSRestApiTestCase):
             NotImplementedError,
             SimpleObj.objects.filter, name=mock.MagicMock(spec=Query)
         )
+
+
+class ResolvedLookupsTestCase(BaseMockedCDMSRestApiTestCase):
+    def setUp(self):
+        super(ResolvedLookupsTestCase, self).setUp()
+        CDMSQuery._resolve_model_lookup.cache_clear()
+
+    def test_resolution_memoised(self):
+        """
+        The field path of the same lookup is only resolved once.
+        """
+        with mock.patch.object(
+            CDMSQuery, 'solve_lookup_type', side_effect=CDMSQuery.solve_lookup_type, autospec=True
+        ) as mocked_solve_lookup_type:
+            list(SimpleObj.objects.filter(name__icontains='something'))
+            list(SimpleObj.objects.filter(name__icontains='something else'))
+
+        self.assertEqual(mocked_solve_lookup_type.call_count, 1)
+        self.assertAPICalled(
+            SimpleObj, 'list', tot=2, kwargs=[
+                {'filters': "substringof('something', Name)", 'order_by': ['ModifiedOn asc']},
+                {'filters': "substringof('something else', Name)", 'order_by': ['ModifiedOn asc']},
+            ]
+        )
+
+
+class InLookupChunksTestCase(BaseMockedCDMSRestApiTestCase):
+    def get_list_filters(self):
+        return sorted(
+            _kwargs['filters'] for _, _kwargs in self.mocked_cdms_api.list.call_args_list
+        )
+
+    @override_settings(CDMS_MAX_FILTER_LENGTH=80)
+    def test_split_in_chunks(self):
+        """
+        If the filter is too long, the `in` lookup gets split and cdms is called once per chunk.
+        """
+        list(
+            SimpleObj.objects.filter(
+                int_field=1, name__in=['name1', 'name2', 'name3', 'name4']
+            )
+        )
+
+        self.assertEqual(
+            self.get_list_filters(),
+            [
+                "((Name eq 'name1' or Name eq 'name2') and IntField eq 1)",
+                "((Name eq 'name3' or Name eq 'name4') and IntField eq 1)",
+            ]
+        )
+        self.assertAPINotCalled(['create', 'update', 'delete', 'get'])
+
+    @override_settings(CDMS_MAX_FILTER_LENGTH=10)
+    def test_split_in_single_values(self):
+        """
+        If even a filter with one value is too long, each value is requested separately.
+        """
+        list(SimpleObj.objects.filter(name__in=['name1', 'name2', 'name3']))
+
+        self.assertEqual(
+            self.get_list_filters(),
+            ["Name eq 'name1'", "Name eq 'name2'", "Name eq 'name3'"]
+        )
+
+    @override_settings(CDMS_MAX_FILTER_LENGTH=10)
+    def test_cannot_split_negated(self):
+        """
+        `in` lookups in negated filters cannot be split.
+        """
+        list(SimpleObj.objects.exclude(name__in=['name1', 'name2']))
+
+        self.assertEqual(
+            self.get_list_filters(),
+            ["not ((Name eq 'name1' or Name eq 'name2'))"]
+        )
+
+    @override_settings(CDMS_MAX_FILTER_LENGTH=10)
+    def test_merge_results(self):
+        """
+        The results of the chunks are merged removing the duplicates.
+        """
+        self.mocked_cdms_api.list.side_effect = lambda service, filters, order_by: [
+            {'SimpleId': 'cdms-pk-all'},
+            {'SimpleId': 'cdms-pk-{}'.format(filters)}
+        ]
+
+        query = CDMSQuery(SimpleObj)
+        query.add_q(Q(name__in=['name1', 'name2']))
+        results = CDMSSelectCompiler(query).execute()
+
+        self.assertEqual(self.mocked_cdms_api.list.call_count, 2)
+        self.assertEqual(
+            sorted(result['SimpleId'] for result in results),
+            ['cdms-pk-Name eq \'name1\'', 'cdms-pk-Name eq \'name2\'', 'cdms-pk-all']
+        )
+
+    @override_settings(CDMS_MAX_FILTER_LENGTH=10)
+    def test_page_size_per_chunk(self):
+        """
+        Each chunk is paged by cdms so a split query can return more results than the page size.
+        """
+        self.mocked_cdms_api.list.side_effect = lambda service, filters, order_by: [
+            {'SimpleId': 'cdms-pk-{}-{}'.format(filters, index)} for index in range(50)
+        ]
+
+        query = CDMSQuery(SimpleObj)
+        query.add_q(Q(name__in=['name1', 'name2']))
+        results = CDMSSelectCompiler(query).execute()
+
+        self.assertEqual(self.mocked_cdms_api.list.call_count, 2)
+        self.assertEqual(len(results), 100)
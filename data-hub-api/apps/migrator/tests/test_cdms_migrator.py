@@ -0,0 +1,56 @@
+import datetime
+
+from django.test.testcases import TestCase
+
+from cdms_api.tests.rest.utils import populate_data
+
+from migrator.tests.models import SimpleObj
+
+
+class ModelMappingsTestCase(TestCase):
+    def setUp(self):
+        self.migrator = SimpleObj.cdms_migrator
+
+    def test_only_mapped_fields(self):
+        from_cdms, to_cdms = self.migrator.get_model_mappings(SimpleObj)
+
+        for mapping in [from_cdms, to_cdms]:
+            self.assertEqual(
+                sorted((field_name, cdms_name) for field_name, cdms_name, _ in mapping),
+                [
+                    ('dt_field', 'DateTimeField'),
+                    ('fk_obj', 'FKField'),
+                    ('int_field', 'IntField'),
+                    ('modified', 'ModifiedOn'),
+                    ('name', 'Name'),
+                ]
+            )
+
+    def test_built_once(self):
+        self.assertIs(
+            self.migrator.get_model_mappings(SimpleObj),
+            self.migrator.get_model_mappings(SimpleObj)
+        )
+
+    def test_update_cdms_data_from_values(self):
+        cdms_data = self.migrator.update_cdms_data_from_values(
+            [('name', 'some name'), ('d_field', datetime.date.today())], {}
+        )
+        self.assertEqual(cdms_data, {'Name': 'some name'})
+
+    def test_update_local_from_cdms_data(self):
+        obj = SimpleObj(d_field=datetime.date(2016, 1, 1))
+        self.migrator.update_local_from_cdms_data(
+            obj, populate_data('Simple', {
+                'Name': 'some name',
+                'DateTimeField': datetime.datetime(2016, 1, 1).replace(tzinfo=datetime.timezone.utc),
+                'IntField': 1,
+                'FKField': None
+            })
+        )
+
+        self.assertEqual(obj.name, 'some name')
+        self.assertEqual(obj.dt_field, datetime.datetime(2016, 1, 1).replace(tzinfo=datetime.timezone.utc))
+        self.assertEqual(obj.int_field, 1)
+        self.assertEqual(obj.fk_obj, None)
+        self.assertEqual(obj.d_field, datetime.date(2016, 1, 1))
@@ -3,6 +3,7 @@ import datetime
 from django.test.testcases import TestCase
 
 from migrator.lookups import FilterNode, Lookup
+from migrator.exceptions import EmptyFilterException
 
 
 class LookupTestCase(TestCase):
@@ -121,3 +122,291 @@ class ValueLookupTestCase(TestCase):
             filters.as_filter_string(),
             "Field eq 2"
         )
+
+
+class LookupTemplateTestCase(TestCase):
+    def test_template(self):
+        self.assertEqual(
+            Lookup.get_template('Field', 'exact'),
+            'Field eq {value}'
+        )
+
+    def test_function_template(self):
+        self.assertEqual(
+            Lookup.get_template('Field', 'contains'),
+            'substringof({value}, Field)'
+        )
+
+    def test_invalid_expr(self):
+        self.assertRaises(
+            NotImplementedError,
+            Lookup.get_template, 'Field', 'invalid'
+        )
+
+
+class FilterNodeCacheTestCase(TestCase):
+    def setUp(self):
+        self.lookup = Lookup('Field1', 'exact', 'my-field1')
+        self.filters = FilterNode(children=[self.lookup])
+
+    def test_cached(self):
+        """
+        The filter string is not rebuilt when the node doesn't change.
+        """
+        self.assertEqual(self.filters.as_filter_string(), "Field1 eq 'my-field1'")
+
+        self.lookup.value = 'something else'
+        self.assertEqual(self.filters.as_filter_string(), "Field1 eq 'my-field1'")
+
+    def test_reset_on_add(self):
+        self.assertEqual(self.filters.as_filter_string(), "Field1 eq 'my-field1'")
+
+        self.filters.add(Lookup('Field2', 'exact', 'my-field2'), Lookup.AND)
+        self.assertEqual(
+            self.filters.as_filter_string(),
+            "(Field1 eq 'my-field1' and Field2 eq 'my-field2')"
+        )
+
+    def test_reset_on_negate(self):
+        self.assertEqual(self.filters.as_filter_string(), "Field1 eq 'my-field1'")
+
+        self.filters.negate()
+        self.assertEqual(self.filters.as_filter_string(), "not (Field1 eq 'my-field1')")
+
+
+class InLookupTestCase(TestCase):
+    def test_multiple_values(self):
+        filters = FilterNode(
+            children=[
+                Lookup('Field', 'in', ['value1', 'value2', 'value3'])
+            ]
+        )
+
+        self.assertEqual(
+            filters.as_filter_string(),
+            "(Field eq 'value1' or Field eq 'value2' or Field eq 'value3')"
+        )
+
+    def test_one_value(self):
+        filters = FilterNode(
+            children=[
+                Lookup('Field', 'in', [1])
+            ]
+        )
+
+        self.assertEqual(
+            filters.as_filter_string(),
+            "Field eq 1"
+        )
+
+    def test_duplicated_values(self):
+        filters = FilterNode(
+            children=[
+                Lookup('Field', 'in', ['value1', 'value2', 'value1'])
+            ]
+        )
+
+        self.assertEqual(
+            filters.as_filter_string(),
+            "(Field eq 'value1' or Field eq 'value2')"
+        )
+
+    def test_empty(self):
+        filters = FilterNode(
+            children=[
+                Lookup('Field', 'in', [])
+            ]
+        )
+
+        self.assertRaises(EmptyFilterException, filters.as_filter_string)
+
+    def test_empty_in_AND(self):
+        """
+        something AND nothing => nothing
+        """
+        filters = FilterNode(
+            children=[
+                Lookup('Field1', 'exact', 'my-field1'),
+                Lookup('Field2', 'in', [])
+            ],
+            connector=Lookup.AND
+        )
+
+        self.assertRaises(EmptyFilterException, filters.as_filter_string)
+
+    def test_empty_in_OR(self):
+        """
+        something OR nothing => something
+        """
+        filters = FilterNode(
+            children=[
+                Lookup('Field1', 'exact', 'my-field1'),
+                Lookup('Field2', 'in', [])
+            ],
+            connector=Lookup.OR
+        )
+
+        self.assertEqual(
+            filters.as_filter_string(),
+            "Field1 eq 'my-field1'"
+        )
+
+    def test_empty_negated(self):
+        """
+        not (nothing) => everything
+        """
+        filters = FilterNode(
+            children=[
+                Lookup('Field1', 'exact', 'my-field1'),
+                FilterNode(
+                    children=[
+                        Lookup('Field2', 'in', [])
+                    ],
+                    negated=True
+                ),
+            ],
+            connector=Lookup.AND
+        )
+
+        self.assertEqual(
+            filters.as_filter_string(),
+            "Field1 eq 'my-field1'"
+        )
+
+    def test_everything_in_OR(self):
+        """
+        something OR everything => everything
+        """
+        filters = FilterNode(
+            children=[
+                Lookup('Field1', 'exact', 'my-field1'),
+                FilterNode(
+                    children=[
+                        Lookup('Field2', 'in', [])
+                    ],
+                    negated=True
+                ),
+            ],
+            connector=Lookup.OR
+        )
+
+        self.assertEqual(filters.as_filter_string(), '')
+
+    def test_everything_negated(self):
+        """
+        not (something OR everything) => nothing
+        """
+        filters = FilterNode(
+            children=[
+                Lookup('Field1', 'exact', 'my-field1'),
+                FilterNode(
+                    children=[
+                        Lookup('Field2', 'in', [])
+                    ],
+                    negated=True
+                ),
+            ],
+            connector=Lookup.OR,
+            negated=True
+        )
+
+        self.assertRaises(EmptyFilterException, filters.as_filter_string)
+
+    def test_None_values(self):
+        """
+        None values are ignored as `Field eq null` can never be true.
+        """
+        filters = FilterNode(
+            children=[
+                Lookup('Field', 'in', ['value1', None])
+            ]
+        )
+
+        self.assertEqual(filters.as_filter_string(), "Field eq 'value1'")
+
+    def test_only_None_values(self):
+        filters = FilterNode(
+            children=[
+                Lookup('Field', 'in', [None])
+            ]
+        )
+
+        self.assertRaises(EmptyFilterException, filters.as_filter_string)
+
+
+class InLookupPathTestCase(TestCase):
+    def test_path(self):
+        """
+        The path to the `in` lookup with most values is returned.
+        """
+        in_lookup = Lookup('Field3', 'in', ['value1', 'value2'])
+        sub_node = FilterNode(
+            children=[
+                Lookup('Field2', 'in', ['value1']),
+                in_lookup
+            ],
+            connector=Lookup.OR
+        )
+        filters = FilterNode(
+            children=[
+                Lookup('Field1', 'exact', 'my-field1'),
+                sub_node
+            ],
+            connector=Lookup.AND
+        )
+
+        self.assertEqual(filters.get_in_lookup_path(), [filters, sub_node, in_lookup])
+
+    def test_negated(self):
+        """
+        `in` lookups in negated branches are ignored.
+        """
+        filters = FilterNode(
+            children=[
+                Lookup('Field1', 'exact', 'my-field1'),
+                FilterNode(
+                    children=[
+                        Lookup('Field2', 'in', ['value1', 'value2'])
+                    ],
+                    negated=True
+                ),
+            ],
+            connector=Lookup.AND
+        )
+
+        self.assertEqual(filters.get_in_lookup_path(), None)
+
+    def test_without_in(self):
+        filters = FilterNode(
+            children=[
+                Lookup('Field1', 'exact', 'my-field1')
+            ]
+        )
+
+        self.assertEqual(filters.get_in_lookup_path(), None)
+
+
+class IsNullLookupTestCase(TestCase):
+    def test_true(self):
+        filters = FilterNode(
+            children=[
+                Lookup('Field', 'isnull', True)
+            ]
+        )
+
+        self.assertEqual(
+            filters.as_filter_string(),
+            "Field eq null"
+        )
+
+    def test_false(self):
+        filters = FilterNode(
+            children=[
+                Lookup('Field', 'isnull', False)
+            ]
+        )
+
+        self.assertEqual(
+            filters.as_filter_string(),
+            "Field ne null"
+        )
@@ -73,6 +73,22 @@ DATABASES = {
     }
 }
 
+# Cache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api_responses': {  # the table is created by the companieshouse migrations
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'companieshouse_api_responses',
+        'TIMEOUT': 60 * 60 * 24 * 7,  # a week
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,  # a third of the entries gets evicted when exceeded
+        },
+    },
+}
+
 # Internationalization
 
 LANGUAGE_CODE = 'en-gb'
@@ -147,6 +163,8 @@ CDMS_COOKIE_KEY = b''
 COOKIE_FILE = '/tmp/cdms_cookie_{slug}.tmp'.format(
     slug=slugify(CDMS_BASE_URL)
 )
+CDMS_MAX_FILTER_LENGTH = 1500  # max length of the url encoded $filter, longer `in` filters get split
+CDMS_MAX_CONCURRENT_REQUESTS = 4  # max concurrent cdms requests when filters get split
 
 # SOURCES
 COMPANIES_HOUSE_TOKEN = ''
@@ -157,6 +175,26 @@ MATCHER_CLASSES = [  # the order is important, the classes will be used from fir
     'companieshouse.sources.duedil.matcher.DueDilMatcher'
 ]
 MATCHER_ACCEPTANCE_PROXIMITY = 0.5  # any proximity matches >= this value will be a hit
+MATCHER_CONCURRENT = False  # if True, find_match uses all the matcher classes at the same time
+DB_MATCHER_SIMILARITY_THRESHOLD = 0.3  # min pg_trgm similarity of the names considered by the db matcher
+DB_MATCHER_MAX_CANDIDATES = 20  # max number of companies considered by the db matcher
+NAME_TOKEN_WEIGHTS = True  # if False, all name tokens weigh the same when comparing names
+NAME_TOKEN_MIN_FREQUENCY = 10  # min number of companies with a name token for its weight to be stored
+# file of the in-memory name index used by the ChIndexMatcher, it must only be writable by the app user
+NAME_INDEX_PATH = os.environ.get('DJANGO__NAME_INDEX_PATH', '')
+NAME_INDEX_MAX_CANDIDATES = 20  # max number of companies considered by the index matcher
+NAME_INDEX_MAX_POSTINGS = 10000  # name tokens of more companies are ignored unless the name has no rarer ones
+MATCHER_BATCH_SIZE = 100  # number of (name, postcode) pairs matched together by `find_matches`
+MATCHER_MAX_CONCURRENT_REQUESTS = 4  # max concurrent api requests when matching in bulk
+# the api rate limits are max requests per second of all the processes together, each process
+# gets an equal share so set API_RATE_LIMIT_PROCESSES to the number of processes calling the apis (e.g. web workers)
+COMPANIES_HOUSE_API_RATE_LIMIT = 2  # CH allows 600 requests every 5 minutes
+DUEDIL_API_RATE_LIMIT = 2
+API_RATE_LIMIT_PROCESSES = int(os.environ.get('DJANGO__API_RATE_LIMIT_PROCESSES', 1))
+API_MAX_RETRIES = 3  # max retries of the api requests failing with 429 or 5xx
+API_RETRY_BACKOFF = 1  # seconds before the first retry, doubled at each following one
+API_CACHE = 'api_responses'  # alias of the cache used for the CH and DueDil api responses
+API_CACHE_NOT_FOUND_TIMEOUT = 60 * 60 * 24  # seconds 404 api responses are cached for
 
 
 # .local.py overrides all the common settings.
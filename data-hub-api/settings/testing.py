@@ -10,6 +10,11 @@ INSTALLED_APPS += (  # noqa
 
 TEST_RUNNER = 'django_nose.NoseTestSuiteRunner'
 
+# so that the api responses mocked by the tests don't get cached
+CACHES['api_responses'] = {  # noqa
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+}
+
 NOSE_ARGS = [
     '--nologcapture',
     '--with-doctest',
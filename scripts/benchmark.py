@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+"""
+Micro-benchmarks comparing the optimised code paths with their previous implementations.
+
+They only report the timings, the behaviour is covered by the tests.
+
+Usage:
+    ./scripts/benchmark.py [benchmark ...]
+"""
+import os
+import re
+import sys
+import time
+import timeit
+import datetime
+from unittest import mock
+
+
+BENCHMARKS = []
+
+
+def benchmark(func):
+    BENCHMARKS.append(func)
+    return func
+
+
+def report(description, legacy_func, current_func):
+    legacy = timeit.timeit(legacy_func, number=1)
+    current = timeit.timeit(current_func, number=1)
+    print('{}: legacy {:.3f}s, current {:.3f}s'.format(description, legacy, current))
+
+
+@benchmark
+def cdms_datetimes():
+    """
+    Compares the cdms datetime utils with the previous regex/mktime based implementation.
+    """
+    from cdms_api.rest.utils import datetime_to_cdms_datetime, cdms_datetimes_to_datetimes
+
+    tot_values, distinct_values = 100000, 1000
+    legacy_datetime_re = re.compile(r'/Date\(([-+]?\d+)\)/')
+
+    def legacy_cdms_datetime_to_datetime(value):
+        match = legacy_datetime_re.match(value or '')
+        if match:
+            parsed_val = int(match.group(1))
+            parsed_val = datetime.datetime.utcfromtimestamp(parsed_val / 1000)
+            return parsed_val.replace(tzinfo=datetime.timezone.utc)
+
+    def legacy_datetime_to_cdms_datetime(value):
+        return '/Date({0})/'.format(
+            int(time.mktime(value.timetuple()) * 1000)
+        )
+
+    start = datetime.datetime(2016, 1, 1).replace(tzinfo=datetime.timezone.utc)
+    dts = [start + datetime.timedelta(minutes=index % distinct_values) for index in range(tot_values)]
+    cdms_values = [datetime_to_cdms_datetime(dt) for dt in dts]
+
+    report(
+        'Parsing {} cdms datetimes'.format(tot_values),
+        lambda: [legacy_cdms_datetime_to_datetime(value) for value in cdms_values],
+        lambda: cdms_datetimes_to_datetimes(cdms_values)
+    )
+    report(
+        'Formatting {} cdms datetimes'.format(tot_values),
+        lambda: [legacy_datetime_to_cdms_datetime(dt) for dt in dts],
+        lambda: [datetime_to_cdms_datetime(dt) for dt in dts]
+    )
+
+
+@benchmark
+def cdms_migrator():
+    """
+    Compares the migrator conversions with the previous implementation which looked up
+    the mapping of each model field for each row.
+    """
+    from cdms_api.tests.rest.utils import populate_data
+    from migrator.exceptions import NotMappingFieldException
+    from migrator.tests.models import SimpleObj
+
+    tot_rows = 10000
+    migrator = SimpleObj.cdms_migrator
+    objs = [SimpleObj() for index in range(tot_rows)]
+    cdms_rows = [
+        populate_data('Simple', {
+            'Name': 'name {}'.format(index),
+            'DateTimeField': datetime.datetime(2016, 1, 1).replace(tzinfo=datetime.timezone.utc),
+            'IntField': index,
+            'FKField': None
+        }, guid='cdms-pk-{}'.format(index))
+        for index in range(tot_rows)
+    ]
+
+    def legacy_update_local_from_cdms_data(local_obj, cdms_data):
+        for field in local_obj._meta.fields:
+            field_name = field.name
+            try:
+                cdms_field = migrator.get_cdms_field(field_name)
+            except NotMappingFieldException:
+                continue
+
+            setattr(local_obj, field_name, cdms_field.from_cdms_value(cdms_data[cdms_field.cdms_name]))
+        return local_obj
+
+    def legacy_update_cdms_data_from_local(local_obj, cdms_data):
+        for field in local_obj._meta.fields:
+            try:
+                cdms_field = migrator.get_cdms_field(field.name)
+            except NotMappingFieldException:
+                continue
+
+            cdms_data[cdms_field.cdms_name] = cdms_field.to_cdms_value(getattr(local_obj, field.name))
+        return cdms_data
+
+    report(
+        'Updating local from {} cdms rows'.format(tot_rows),
+        lambda: [legacy_update_local_from_cdms_data(obj, row) for obj, row in zip(objs, cdms_rows)],
+        lambda: [migrator.update_local_from_cdms_data(obj, row) for obj, row in zip(objs, cdms_rows)]
+    )
+    report(
+        'Updating cdms data from {} local objs'.format(tot_rows),
+        lambda: [legacy_update_cdms_data_from_local(obj, {}) for obj in objs],
+        lambda: [migrator.update_cdms_data_from_local(obj, {}) for obj in objs]
+    )
+
+
+@benchmark
+def ch_date_parser():
+    """
+    Compares the DateParser with the previous strptime based implementation.
+    """
+    from companieshouse.sources.db.importers import date_parser
+
+    tot_values = 1000000
+    values = [
+        '{}/{}/{}'.format(index % 28 + 1, index % 12 + 1, 1950 + index % 60)
+        for index in range(tot_values)
+    ]
+
+    report(
+        'Parsing {} CH dates'.format(tot_values),
+        lambda: [datetime.datetime.strptime(val, '%d/%m/%Y').date().isoformat() for val in values],
+        lambda: [date_parser._parse(val) for val in values]
+    )
+
+
+@benchmark
+def ch_csv_importer():
+    """
+    Compares the compiled CSVImporter with the previous implementation going through
+    the nested parsers tree for each row without memoising the conversions.
+    """
+    from companieshouse.sources.db.importers import CSVImporter, DictParser, DateParser, ChoicesParser
+    from companieshouse.tests.sources.db.test_importers import FULL_DATA, MINIMAL_DATA
+
+    tot_rows = 1000000
+    importer = CSVImporter()  # compiled here, before the converters get replaced below
+    rows = [FULL_DATA, MINIMAL_DATA] * (tot_rows // 2)
+
+    def legacy_parse():
+        with mock.patch.object(DateParser, '_parse', DateParser._parse.__wrapped__), \
+                mock.patch.object(ChoicesParser, '_lookup', ChoicesParser._lookup.__wrapped__):
+            return [DictParser.parse(importer, iter(row)) for row in rows]
+
+    def current_parse():
+        DateParser._parse.cache_clear()
+        ChoicesParser._lookup.cache_clear()
+        return [importer.parse(row) for row in rows]
+
+    report('Parsing {} CH csv rows'.format(tot_rows), legacy_parse, current_parse)
+
+
+@benchmark
+def batch_similarity():
+    """
+    Compares the BatchSimilarityCalculator with one SimilarityCalculator per candidate.
+    """
+    from companieshouse.sources.similarity import (
+        SimilarityCalculator, BatchSimilarityCalculator, NameTokenWeights, clean_name, clean_postcode
+    )
+
+    tot_candidates = 100000
+    name, postcode = 'my company 5', 'SW1A 1AA'
+    token_weights = NameTokenWeights(frequencies={'my': 90000, 'company': 100000}, total=tot_candidates)
+    candidates = [
+        (clean_name('MY COMPANY {} LIMITED'.format(index)), clean_postcode('SW1A {}AA'.format(index % 10)))
+        for index in range(tot_candidates)
+    ]
+
+    def get_legacy_proximities():
+        proximities = []
+        for candidate_name, candidate_postcode in candidates:
+            calc = SimilarityCalculator(token_weights=token_weights)
+            calc.analyse_names(name, candidate_name)
+            calc.analyse_postcodes(postcode, candidate_postcode)
+            proximities.append(calc.get_proximity())
+        return proximities
+
+    report(
+        'Scoring {} matcher candidates'.format(tot_candidates),
+        get_legacy_proximities,
+        lambda: BatchSimilarityCalculator(name, postcode, token_weights=token_weights).get_proximities(
+            candidates, normalised=True
+        )
+    )
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    # the testing settings include the models used by the migrator benchmark, no db is needed
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "data-hub-api.settings.testing")
+
+    import django
+    django.setup()
+
+    names = sys.argv[1:] or [func.__name__ for func in BENCHMARKS]
+    benchmarks = {func.__name__: func for func in BENCHMARKS}
+    for name in names:
+        if name not in benchmarks:
+            sys.exit('Unknown benchmark {}, choose from: {}'.format(name, ', '.join(sorted(benchmarks))))
+        benchmarks[name]()